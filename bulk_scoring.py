@@ -0,0 +1,195 @@
+"""
+bulk_scoring.py
+Vectorized food security scoring for survey backlogs (Module 1)
+
+Scores thousands of FIES-style household records at once instead of
+replaying the assessment form: regions are encoded with the stored
+region_encoder, deciles come from np.searchsorted over the same thresholds
+as the form, and predictions run in large vectorized batches.
+
+Usage:
+    python bulk_scoring.py --csv households.csv --output scored.csv
+    python bulk_scoring.py --db                 # rows missing ml_predicted_at
+    python bulk_scoring.py --db --exact         # use the forest, not the grid
+
+Input CSV columns: region, household_size, monthly_income
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from food_security import load_predictor, compute_decile, LEVEL_NAMES
+
+DEFAULT_BATCH_SIZE = 100_000
+
+REQUIRED_COLUMNS = ['region', 'household_size', 'monthly_income']
+SKIP_REASON = "unknown region, or missing/invalid household size or income"
+
+
+def score_households(households, predictor=None, batch_size=DEFAULT_BATCH_SIZE, exact=False):
+    """
+    Score a frame of households
+
+    Args:
+        households (pd.DataFrame): Rows with region, household_size, monthly_income
+        predictor (FoodSecurityPredictor): Defaults to the shared registry predictor
+        batch_size (int): Rows per predict call
+        exact (bool): Force the forest instead of the compiled grid
+
+    Returns:
+        pd.DataFrame: Input plus the derived/predicted security_survey columns.
+        Rows with an unknown region, or a missing or out-of-range household
+        size or income, get NaN predictions.
+    """
+    missing = [col for col in REQUIRED_COLUMNS if col not in households.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    predictor = predictor or load_predictor()
+    scored = households.copy()
+
+    household_size = pd.to_numeric(scored['household_size'], errors='coerce').to_numpy(dtype=float)
+    monthly_income = pd.to_numeric(scored['monthly_income'], errors='coerce').to_numpy(dtype=float)
+    # Same ranges as the assessment form; zero income is a real answer
+    valid = (np.isfinite(household_size) & (household_size > 0)
+             & np.isfinite(monthly_income) & (monthly_income >= 0))
+    income_pp = np.where(valid, monthly_income / np.where(valid, household_size, 1), np.nan)
+    scored['income_per_person_monthly'] = income_pp
+    scored['income_per_person_daily'] = income_pp / 30
+    scored['decile'] = pd.array(np.where(valid, compute_decile(np.nan_to_num(income_pp)), None), dtype='Int64')
+
+    # Unknown regions map to -1 instead of raising like LabelEncoder.transform
+    region_codes = {region: code for code, region in enumerate(predictor.region_encoder.classes_)}
+    region_encoded = scored['region'].map(region_codes).fillna(-1).astype(int).to_numpy()
+    known = (region_encoded >= 0) & valid
+
+    levels = np.full(len(scored), -1, dtype=int)
+    confidence = np.full(len(scored), np.nan)
+    rows = np.flatnonzero(known)
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        levels[batch], confidence[batch] = predictor.predict_batch(
+            income_pp[batch], household_size[batch], region_encoded[batch], exact=exact
+        )
+
+    level_names = np.array(LEVEL_NAMES + [None], dtype=object)
+    scored['security_level_num'] = pd.array(np.where(known, levels, None), dtype='Int64')
+    scored['security_level'] = level_names[levels]
+    scored['ml_confidence'] = confidence
+    return scored
+
+
+# ========================================================================
+# DATABASE BACKLOG
+# ========================================================================
+
+def fetch_unscored(conn, after_id=0, limit=DEFAULT_BATCH_SIZE):
+    """security_survey rows that were never scored, in id order"""
+    rows = conn.execute(text("""
+        SELECT id, region, household_size, monthly_income
+        FROM security_survey
+        WHERE ml_predicted_at IS NULL AND id > :after_id
+        ORDER BY id
+        LIMIT :limit
+    """), {"after_id": after_id, "limit": limit}).fetchall()
+    return pd.DataFrame(rows, columns=['id'] + REQUIRED_COLUMNS)
+
+
+def write_scores(conn, scored, predicted_at):
+    """Write one scored batch back with a single UPDATE ... FROM unnest(...)"""
+    scored = scored[scored['security_level_num'].notna()]
+    if scored.empty:
+        return 0
+    result = conn.execute(text("""
+        UPDATE security_survey AS s SET
+            income_per_person_monthly = v.income_pp,
+            income_per_person_daily = v.income_daily,
+            decile = v.decile,
+            security_level_num = v.score,
+            security_level = v.level,
+            ml_confidence = v.confidence,
+            ml_predicted_at = :predicted_at
+        FROM unnest(
+            CAST(:ids AS integer[]), CAST(:income_pp AS float8[]), CAST(:income_daily AS float8[]),
+            CAST(:deciles AS integer[]), CAST(:scores AS integer[]), CAST(:levels AS text[]),
+            CAST(:confidence AS float8[])
+        ) AS v(id, income_pp, income_daily, decile, score, level, confidence)
+        WHERE s.id = v.id
+    """), {
+        "ids": scored['id'].astype(int).tolist(),
+        "income_pp": scored['income_per_person_monthly'].astype(float).tolist(),
+        "income_daily": scored['income_per_person_daily'].astype(float).tolist(),
+        "deciles": scored['decile'].astype(int).tolist(),
+        "scores": scored['security_level_num'].astype(int).tolist(),
+        "levels": scored['security_level'].tolist(),
+        "confidence": scored['ml_confidence'].astype(float).tolist(),
+        "predicted_at": predicted_at,
+    })
+    return result.rowcount
+
+
+def score_database_backlog(batch_size=DEFAULT_BATCH_SIZE, exact=False):
+    """
+    Score every security_survey row missing ml_predicted_at
+
+    Returns:
+        tuple: (rows_scored, rows_skipped)
+    """
+    from db import engine
+
+    predictor = load_predictor()
+    predicted_at = datetime.now()
+    scored_total = skipped_total = 0
+    after_id = 0
+
+    while True:
+        with engine.begin() as conn:
+            batch = fetch_unscored(conn, after_id, batch_size)
+            if batch.empty:
+                break
+            scored = score_households(batch, predictor, batch_size, exact)
+            written = write_scores(conn, scored, predicted_at)
+        scored_total += written
+        skipped_total += len(batch) - written
+        after_id = int(batch['id'].iloc[-1])
+        print(f"  ✅ Scored {scored_total:,} rows (through id {after_id})")
+
+    return scored_total, skipped_total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk food security scoring")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv", help="Household CSV to score")
+    source.add_argument("--db", action="store_true", help="Score security_survey rows missing ml_predicted_at")
+    parser.add_argument("--output", help="Output CSV (default: <input>_scored.csv)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--exact", action="store_true", help="Use the forest instead of the compiled grid")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.csv:
+        print(f"📥 Loading {args.csv}...")
+        households = pd.read_csv(args.csv)
+        scored = score_households(households, batch_size=args.batch_size, exact=args.exact)
+        output = args.output or args.csv.rsplit('.', 1)[0] + "_scored.csv"
+        scored.to_csv(output, index=False)
+        unknown = int(scored['security_level_num'].isna().sum())
+        print(f"✅ Scored {len(scored) - unknown:,} households -> {output}")
+        if unknown:
+            print(f"⚠️ {unknown:,} rows skipped ({SKIP_REASON})")
+    else:
+        print("📥 Scoring security_survey backlog...")
+        scored, skipped = score_database_backlog(args.batch_size, args.exact)
+        print(f"✅ Scored {scored:,} rows" + (f", ⚠️ {skipped:,} skipped ({SKIP_REASON})" if skipped else ""))
+
+    print(f"⏱️ Done in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+cost_table.py
+Batch-precomputed recipe cost predictions (Module 2 RF cost model)
+
+The cost model trained by train_module2.py only ever sees four discrete
+features (region, category, type, serves), so every possible prediction can be
+computed up front in ONE vectorized predict call and stored as a lookup table
+(registry parquet and the recipe_cost_predictions Postgres table), so a
+consumer does a dict or primary-key lookup instead of loading the forest and
+walking 100 trees per query. The meal planner prices plans from the recipe
+CSV's real costs, not from this model; RecipeCostLookup is used at build
+time, by train_module2.py's prediction check.
+
+Usage:
+    python cost_table.py            # predict grid -> registry (parquet) + Postgres
+    python cost_table.py --no-db    # registry only
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from model_registry import load_artifact, publish
+
+# Registry artifact names (see models/manifest.json)
+COST_MODEL_ARTIFACT = "recipe_cost_model"
+ENCODERS_ARTIFACT = "recipe_cost_encoders"
+COST_TABLE_ARTIFACT = "recipe_cost_table"
+
+COST_TABLE_NAME = "recipe_cost_predictions"
+
+# Household sizes covered by the grid (same bounds as the assessment form)
+SERVES_RANGE = range(1, 21)
+
+DEFAULT_RECIPE_REGION = "National Capital region"
+
+
+# ========================================================================
+# BUILD THE GRID
+# ========================================================================
+
+def build_cost_table(model, encoders, serves_range=SERVES_RANGE):
+    """
+    Predict the full (region, category, type, serves) cartesian grid
+
+    Args:
+        model: Fitted RandomForestRegressor from train_module2.py
+        encoders (dict): Encoders saved alongside the model (recipe_cost_encoders)
+        serves_range (iterable): Household sizes to include
+
+    Returns:
+        pd.DataFrame: One row per grid cell with the predicted cost_per_person
+    """
+    regions = encoders['region'].classes_
+    categories = encoders['category'].classes_
+    types = encoders['type'].classes_
+    serves = np.asarray(list(serves_range))
+
+    # Encoded codes are just positions in classes_, so build the grid directly
+    grid = np.stack(np.meshgrid(
+        np.arange(len(regions)),
+        np.arange(len(categories)),
+        np.arange(len(types)),
+        serves,
+        indexing='ij'
+    ), axis=-1).reshape(-1, 4)
+
+    features = pd.DataFrame(grid, columns=['region', 'category', 'type', 'serves'])
+    predictions = model.predict(features)
+
+    return pd.DataFrame({
+        'region': regions[grid[:, 0]],
+        'category': categories[grid[:, 1]],
+        'type': types[grid[:, 2]],
+        'serves': grid[:, 3].astype('int16'),
+        'cost_per_person': predictions.round(2),
+    })
+
+
+def publish_cost_table(table, metadata=None):
+    """Publish the lookup table (parquet) to the registry"""
+    return publish(COST_TABLE_ARTIFACT, table, fmt='parquet', metadata=metadata)
+
+
+def write_cost_table_to_db(table, table_name=COST_TABLE_NAME):
+    """Replace the Postgres copy of the lookup table"""
+    from sqlalchemy import text
+    from db import engine
+
+    with engine.begin() as conn:
+        table.to_sql(table_name, conn, if_exists='replace', index=False,
+                     method='multi', chunksize=5000)
+        conn.execute(text(f"""
+            ALTER TABLE {table_name}
+            ADD PRIMARY KEY (region, category, type, serves)
+        """))
+    return len(table)
+
+
+# ========================================================================
+# LOOKUP
+# ========================================================================
+
+class RecipeCostLookup:
+    """O(1) recipe cost lookups against the precomputed table"""
+
+    def __init__(self, table, region_map=None):
+        self.costs = dict(zip(
+            zip(table['region'], table['category'], table['type'], table['serves'].astype(int)),
+            table['cost_per_person'].astype(float)
+        ))
+        self.regions = set(table['region'])
+        self.region_map = region_map or {}
+
+    @classmethod
+    def from_registry(cls):
+        table = load_artifact(COST_TABLE_ARTIFACT)
+        region_map = load_artifact(ENCODERS_ARTIFACT).get('map_fies_to_recipe', {})
+        return cls(table, region_map)
+
+    def lookup(self, region, category, meal_type, serves):
+        """
+        Predicted cost per person for one recipe profile
+
+        Args:
+            region (str): Recipe region or FIES region (mapped like train_module2.py)
+            category (str): Recipe category, as in the training data
+            meal_type (str): Recipe type, as in the training data
+            serves (int): Household size
+
+        Returns:
+            float or None: Cost per person, None if outside the grid
+        """
+        region = self.region_map.get(region, region)
+        cost = self.costs.get((region, category, meal_type, int(serves)))
+        if cost is None and region not in self.regions:
+            cost = self.costs.get((DEFAULT_RECIPE_REGION, category, meal_type, int(serves)))
+        return cost
+
+
+# ========================================================================
+# BATCH JOB
+# ========================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the recipe cost lookup table")
+    parser.add_argument("--no-db", action="store_true", help="Skip writing the Postgres table")
+    args = parser.parse_args()
+
+    print("📦 Loading cost model and encoders...")
+    model = load_artifact(COST_MODEL_ARTIFACT)
+    encoders = load_artifact(ENCODERS_ARTIFACT)
+
+    print("🤖 Predicting full feature grid...")
+    start = time.perf_counter()
+    table = build_cost_table(model, encoders)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {len(table):,} predictions in {elapsed:.2f}s (one vectorized call)")
+
+    version = publish_cost_table(table)
+    print(f"✅ Published: {COST_TABLE_ARTIFACT} {version}")
+
+    if not args.no_db:
+        rows = write_cost_table_to_db(table)
+        print(f"✅ Wrote {rows:,} rows to {COST_TABLE_NAME}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+data_assets.py
+Columnar cache for the CSV data assets
+
+The dashboards and training scripts read the same CSVs over and over
+(dashboard.py parsed module1_regional_context.csv twice per rerun). On
+first use each CSV is parsed once and written as an uncompressed Arrow IPC
+file under data/.cache/, typed as pandas inferred it. Later loads memory-map
+that file instead of parsing text, and the decoded Arrow table is kept per
+process, so a Streamlit rerun only pays for building the DataFrame.
+
+The cache is keyed by the source's content hash. mtime and size are checked
+first; the file is only re-hashed when they changed, and only re-converted
+when the hash did too (a touched but unchanged CSV keeps its cache file).
+Arrow IPC rather than Parquet because it can be memory-mapped without
+decoding; the columns are the same.
+
+Every call returns a new DataFrame, so callers can add columns freely.
+
+Usage:
+    df = load_csv("data/fies_ml_features.csv")
+    df = load_csv(RECIPES_PATH, columns=['recipe', 'cost_per_person'])
+
+    python data_assets.py            # convert every known asset now
+    python data_assets.py --clear    # drop the cache
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+CACHE_DIR = os.getenv("DATA_ASSET_CACHE", os.path.join("data", ".cache"))
+
+ASSETS = [
+    "data/fies_ml_features.csv",
+    "data/module1_regional_context.csv",
+    "data/module2_recipe_costs_by_region_EXPANDED.csv",
+    "data/wfp_phl_prices_clean.csv",
+    "REAL_RECIPE_COSTS_REALISTIC_2026.csv",
+]
+
+_tables = {}   # abspath -> (mtime_ns, size, pa.Table)
+_lock = threading.Lock()
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_paths(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    # The directory is part of the key so same-named CSVs in different folders don't collide
+    prefix = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:8]
+    base = os.path.join(CACHE_DIR, f"{name}.{prefix}")
+    return base + ".json", base
+
+
+def _convert(path, arrow_base, sha):
+    """Parse the CSV once and write it as an Arrow IPC file; returns the file path"""
+    table = pa.Table.from_pandas(pd.read_csv(path), preserve_index=False)
+    arrow_path = f"{arrow_base}.{sha[:12]}.arrow"
+    tmp = arrow_path + f".{os.getpid()}.tmp"
+    with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, arrow_path)
+    return arrow_path
+
+
+def _cached_file(path, stat):
+    """Arrow file for the CSV's current content, converting if needed"""
+    meta_path, arrow_base = _cache_paths(path)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        meta = {}
+
+    arrow_path = meta.get('arrow')
+    if (meta.get('mtime_ns'), meta.get('size')) == (stat.st_mtime_ns, stat.st_size) \
+            and arrow_path and os.path.exists(arrow_path):
+        return arrow_path
+
+    sha = _file_hash(path)
+    if sha != meta.get('sha256') or not (arrow_path and os.path.exists(arrow_path)):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        stale = arrow_path
+        arrow_path = _convert(path, arrow_base, sha)
+        if stale and stale != arrow_path and os.path.exists(stale):
+            os.remove(stale)
+
+    tmp = meta_path + f".{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump({'source': path, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                   'sha256': sha, 'arrow': arrow_path}, f)
+    os.replace(tmp, meta_path)
+    return arrow_path
+
+
+def load_table(path):
+    """
+    Arrow table for a CSV asset (memory-mapped, cached per process)
+
+    Raises:
+        FileNotFoundError: If the CSV doesn't exist
+    """
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    with _lock:
+        entry = _tables.get(key)
+        if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            return entry[2]
+        arrow_path = _cached_file(path, stat)
+        table = pa.ipc.open_file(pa.memory_map(arrow_path, 'r')).read_all()
+        _tables[key] = (stat.st_mtime_ns, stat.st_size, table)
+        return table
+
+
+def load_csv(path, columns=None):
+    """
+    DataFrame of a CSV asset, as pd.read_csv(path, usecols=columns) would return it
+
+    Raises:
+        FileNotFoundError: If the CSV doesn't exist
+    """
+    table = load_table(path)
+    if columns is not None:
+        table = table.select(list(columns))
+    return table.to_pandas()
+
+
+def clear_cache():
+    with _lock:
+        _tables.clear()
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the CSV data assets to cached Arrow files")
+    parser.add_argument("paths", nargs="*", help="CSV files (default: the known assets)")
+    parser.add_argument("--clear", action="store_true", help="Delete the cache instead")
+    args = parser.parse_args()
+
+    if args.clear:
+        clear_cache()
+        print(f"🗑️ Cleared {CACHE_DIR}")
+        return
+
+    for path in args.paths or ASSETS:
+        if not os.path.exists(path):
+            print(f"⚠️ {path} not found, skipped")
+            continue
+        start = time.perf_counter()
+        pd.read_csv(path)
+        csv_ms = (time.perf_counter() - start) * 1000
+        table = load_table(path)
+        _tables.clear()
+        start = time.perf_counter()
+        load_csv(path)
+        cached_ms = (time.perf_counter() - start) * 1000
+        print(f"✅ {path}: {table.num_rows:,} rows, {table.num_columns} columns "
+              f"(read_csv {csv_ms:.1f} ms, cached {cached_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
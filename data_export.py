@@ -0,0 +1,381 @@
+"""
+data_export.py
+Streaming export of meal plans and assessments for program reporting
+
+The pages only offer per-plan download buttons built in memory. This
+exports every meal_plans or security_survey row matching a region and/or
+created_at range to CSV, JSON Lines or Parquet with constant memory. Rows
+come from a server-side cursor (stream_results: a named cursor on psycopg2,
+a server cursor on psycopg 3) fetched batch_size at a time, and each batch
+is written out before the next is fetched.
+
+Rows are read in id order with a keyset predicate (id > after_id), so an
+export is resumable: after every batch the file is flushed and fsync'ed,
+then the last written id and the file's byte length are saved to
+<output>.cursor. --resume truncates the file back to that length (dropping
+whatever a crash left half-written) and appends from there (CSV and JSON
+Lines). Compressed exports write one gzip member per batch, which readers
+concatenate transparently, so the saved length is always a member boundary.
+Parquet can't be appended to; restart into a new file with --after-id.
+
+Usage:
+    python data_export.py meal_plans plans.csv.gz --region NCR --since 2026-01-01
+    python data_export.py assessments surveys.parquet --until 2026-06-30
+    python data_export.py meal_plans plans.jsonl --with-plan --resume
+
+    rows, last_id = export('assessments', 'surveys.csv', region='NCR')
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from meal_plan_store import load_plan
+
+DEFAULT_BATCH_SIZE = 5_000
+FORMATS = ('csv', 'jsonl', 'parquet')
+
+# Exported columns per kind: (name, type) with type one of int/float/str/date/timestamp/json
+EXPORTS = {
+    'assessments': {
+        'table': 'security_survey',
+        'columns': [
+            ('id', 'int'), ('user_id', 'int'), ('region', 'str'), ('household_size', 'float'),
+            ('monthly_income', 'float'), ('income_per_person_monthly', 'float'),
+            ('income_per_person_daily', 'float'), ('worried_food', 'str'), ('healthy_food', 'str'),
+            ('skip_meals', 'str'), ('decile', 'int'), ('security_level_num', 'int'),
+            ('security_level', 'str'), ('ml_confidence', 'float'), ('ml_predicted_at', 'timestamp'),
+            ('created_at', 'timestamp'),
+        ],
+    },
+    'meal_plans': {
+        'table': 'meal_plans',
+        'columns': [
+            ('id', 'int'), ('user_id', 'int'), ('security_id', 'int'), ('security_level', 'str'),
+            ('region', 'str'), ('household_size', 'float'), ('monthly_income', 'float'),
+            ('week_start', 'date'), ('weekly_budget', 'float'), ('total_weekly_cost', 'float'),
+            ('allergies', 'str'), ('status', 'str'), ('created_at', 'timestamp'),
+        ],
+    },
+}
+PLAN_COLUMN = ('plan', 'json')
+
+
+def export_columns(kind, with_plan=False):
+    columns = list(EXPORTS[kind]['columns'])
+    if with_plan:
+        if kind != 'meal_plans':
+            raise ValueError("with_plan only applies to meal_plans")
+        columns.append(PLAN_COLUMN)
+    return columns
+
+
+def export_query(kind, region=None, since=None, until=None, after_id=0, with_plan=False):
+    """
+    SELECT for one export and its parameters
+
+    Args:
+        since / until (date): created_at range, until exclusive
+        after_id (int): Keyset position; only rows with a greater id
+    """
+    if kind not in EXPORTS:
+        raise ValueError(f"Unknown export '{kind}'. Available: {', '.join(EXPORTS)}")
+    select = [f"t.{name}" for name, _ in EXPORTS[kind]['columns']]
+    joins = ""
+    if with_plan:
+        select.append("b.body AS plan_body")
+        joins = "LEFT JOIN plan_bodies b ON b.hash = t.plan_hash"
+
+    where = ["t.id > :after_id"]
+    params = {"after_id": after_id}
+    if region:
+        where.append("t.region = :region")
+        params["region"] = region
+    if since:
+        where.append("t.created_at >= :since")
+        params["since"] = since
+    if until:
+        where.append("t.created_at < :until")
+        params["until"] = until
+
+    sql = f"""
+        SELECT {', '.join(select)}
+        FROM {EXPORTS[kind]['table']} t {joins}
+        WHERE {' AND '.join(where)}
+        ORDER BY t.id
+    """
+    return sql, params
+
+
+def iter_batches(conn, kind, batch_size=DEFAULT_BATCH_SIZE, with_plan=False, **filters):
+    """
+    Yield lists of row dicts from a server-side cursor, batch_size rows at a time
+
+    Needs an open transaction (server cursors live inside one).
+    """
+    sql, params = export_query(kind, with_plan=with_plan, **filters)
+    result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(text(sql), params)
+    names = [name for name, _ in EXPORTS[kind]['columns']]
+    for partition in result.partitions():
+        batch = []
+        for row in partition:
+            record = dict(zip(names, row))
+            if with_plan:
+                record['plan'] = load_plan(row.plan_body, row) if row.plan_body is not None else None
+            batch.append(record)
+        yield batch
+
+
+# ========================================================================
+# WRITERS
+# ========================================================================
+
+def _plain(value):
+    """JSON/CSV-friendly scalar"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class _Sink:
+    """Output file written a batch at a time; sync() returns a resumable byte offset"""
+
+    def __init__(self, path, offset=None, compress=False):
+        if offset is None:
+            self._file = open(path, 'wb')
+        else:
+            self._file = open(path, 'r+b')
+            self._file.truncate(offset)
+            self._file.seek(offset)
+        self._compress = compress
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        # One complete gzip member per write, so every synced offset ends a member
+        self._file.write(gzip.compress(data) if self._compress else data)
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class CsvExportWriter:
+    def __init__(self, path, columns, offset=None, compress=False):
+        self._sink = _Sink(path, offset, compress)
+        self._json = [name for name, kind in columns if kind == 'json']
+        self._names = [name for name, _ in columns]
+        if offset is None:
+            self._write_rows([self._names])
+
+    def _write_rows(self, rows):
+        buffer = io.StringIO(newline='')
+        csv.writer(buffer).writerows(rows)
+        self._sink.write(buffer.getvalue())
+
+    def write(self, batch):
+        rows = []
+        for record in batch:
+            for name in self._json:
+                if record[name] is not None:
+                    record[name] = json.dumps(record[name], default=str)
+            rows.append([_plain(record[name]) for name in self._names])
+        self._write_rows(rows)
+
+    def flush(self):
+        return self._sink.sync()
+
+    def close(self):
+        self._sink.close()
+
+
+class JsonlExportWriter:
+    def __init__(self, path, columns, offset=None, compress=False):
+        self._sink = _Sink(path, offset, compress)
+
+    def write(self, batch):
+        self._sink.write("".join(
+            json.dumps({key: _plain(value) for key, value in record.items()}, default=str) + "\n"
+            for record in batch
+        ))
+
+    def flush(self):
+        return self._sink.sync()
+
+    def close(self):
+        self._sink.close()
+
+
+class ParquetExportWriter:
+    def __init__(self, path, columns, offset=None, compress=False):
+        if offset is not None:
+            raise ValueError("Parquet exports can't be appended to; export into a new file with --after-id")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {'int': pa.int64(), 'float': pa.float64(), 'str': pa.string(), 'json': pa.string(),
+                 'date': pa.date32(), 'timestamp': pa.timestamp('us')}
+        self._pa = pa
+        self._columns = columns
+        self._schema = pa.schema([(name, types[kind]) for name, kind in columns])
+        self._writer = pq.ParquetWriter(path, self._schema, compression='gzip' if compress else 'snappy')
+
+    def write(self, batch):
+        arrays = {}
+        for name, kind in self._columns:
+            values = [record[name] for record in batch]
+            if kind == 'float':
+                values = [None if value is None else float(value) for value in values]
+            elif kind == 'json':
+                values = [None if value is None else json.dumps(value, default=str) for value in values]
+            arrays[name] = values
+        self._writer.write_table(self._pa.Table.from_pydict(arrays, schema=self._schema))
+
+    def flush(self):
+        return None  # not resumable
+
+    def close(self):
+        self._writer.close()
+
+
+WRITERS = {'csv': CsvExportWriter, 'jsonl': JsonlExportWriter, 'parquet': ParquetExportWriter}
+
+
+def detect_format(path):
+    """Format and gzip flag from an output file name (plans.csv.gz -> ('csv', True))"""
+    name = path[:-3] if path.endswith('.gz') else path
+    fmt = name.rsplit('.', 1)[-1].lower()
+    if fmt == 'json':
+        fmt = 'jsonl'
+    if fmt not in FORMATS:
+        raise ValueError(f"Can't tell the format of '{path}'; use one of: {', '.join(FORMATS)}")
+    return fmt, path.endswith('.gz')
+
+
+# ========================================================================
+# EXPORT
+# ========================================================================
+
+def cursor_path(path):
+    return path + ".cursor"
+
+
+def read_cursor(path):
+    """Keyset position saved by an earlier export into path, or None"""
+    try:
+        with open(cursor_path(path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _save_cursor(path, state):
+    tmp = cursor_path(path) + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, cursor_path(path))
+
+
+def export(kind, path, fmt=None, compress=None, region=None, since=None, until=None,
+           after_id=0, resume=False, with_plan=False, batch_size=DEFAULT_BATCH_SIZE, engine=None):
+    """
+    Stream an export to path
+
+    Args:
+        fmt / compress: Default from the file name (.csv, .jsonl, .parquet, + .gz)
+        resume (bool): Continue a previous export into the same path from its
+            saved cursor (truncates to the last synced batch, then appends)
+
+    Returns:
+        tuple: (rows written by this call, last exported id)
+    """
+    if engine is None:
+        from db import engine
+
+    if fmt is None:
+        fmt, compressed_name = detect_format(path)
+    else:
+        compressed_name = path.endswith('.gz')
+    compress = compressed_name if compress is None else compress
+
+    filters = {'region': region, 'since': since, 'until': until}
+    # Everything that shapes the file's rows; a resume must match all of it
+    export_spec = {'kind': kind, 'filters': {k: v and str(v) for k, v in filters.items()},
+                   'fmt': fmt, 'compress': bool(compress), 'with_plan': bool(with_plan)}
+    rows = 0
+    offset = None
+    if resume:
+        state = read_cursor(path)
+        if state is None:
+            raise FileNotFoundError(f"No export cursor at {cursor_path(path)}")
+        if any(state.get(key) != value for key, value in export_spec.items()):
+            raise ValueError(f"{cursor_path(path)} was saved for a different export "
+                             f"(kind, filters, format, compression and --with-plan must match)")
+        if state.get('complete'):
+            return 0, state['last_id']
+        after_id, rows, offset = state['last_id'], state['rows'], state['offset']
+
+    state = dict(export_spec, last_id=after_id, rows=rows, offset=offset, complete=False)
+    written = 0
+    writer = WRITERS[fmt](path, export_columns(kind, with_plan), offset=offset, compress=compress)
+    try:
+        if fmt != 'parquet':
+            state['offset'] = writer.flush()  # the header (or the truncated resume point)
+            _save_cursor(path, state)
+        with engine.connect() as conn, conn.begin():
+            for batch in iter_batches(conn, kind, batch_size, with_plan, after_id=after_id, **filters):
+                writer.write(batch)
+                written += len(batch)
+                # The cursor may only move once the rows are durably in the file
+                offset = writer.flush()
+                state.update(last_id=batch[-1]['id'], rows=state['rows'] + len(batch), offset=offset)
+                if fmt != 'parquet':
+                    _save_cursor(path, state)
+    finally:
+        writer.close()
+    state['complete'] = True
+    _save_cursor(path, state)
+    return written, state['last_id']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream meal plans or assessments to a file")
+    parser.add_argument("kind", choices=sorted(EXPORTS))
+    parser.add_argument("output", help="Output file (.csv, .jsonl, .parquet, optionally .gz)")
+    parser.add_argument("--format", choices=FORMATS, help="Override the format from the file name")
+    parser.add_argument("--gzip", action="store_true", default=None, help="Compress (default: output ends in .gz)")
+    parser.add_argument("--region")
+    parser.add_argument("--since", type=date.fromisoformat, help="created_at from (YYYY-MM-DD)")
+    parser.add_argument("--until", type=date.fromisoformat, help="created_at before (YYYY-MM-DD)")
+    parser.add_argument("--after-id", type=int, default=0, help="Start after this id")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted export into output")
+    parser.add_argument("--with-plan", action="store_true", help="Include the full plan (meal_plans only)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    print(f"📤 Exporting {args.kind} to {args.output}...")
+    written, last_id = export(
+        args.kind, args.output, fmt=args.format, compress=args.gzip, region=args.region,
+        since=args.since, until=args.until, after_id=args.after_id, resume=args.resume,
+        with_plan=args.with_plan, batch_size=args.batch_size,
+    )
+    print(f"✅ Exported {written:,} rows (through id {last_id})")
+    print(f"⏱️ Done in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,317 @@
+"""
+db.py
+Shared, pooled database layer
+
+One SQLAlchemy engine per process (Streamlit keeps imported modules alive
+across reruns), so pages borrow an already-open connection from the pool
+instead of paying a TCP + auth handshake per query.
+
+Settings come from the environment (or a .env file):
+
+    DATABASE_URL                    full URL; otherwise built from
+    DB_HOST / DB_PORT / DB_NAME / DB_USER / DB_PASSWORD
+    DB_POOL_SIZE       (5)          connections kept open
+    DB_MAX_OVERFLOW    (10)         extra connections under burst load
+    DB_POOL_TIMEOUT    (30)         seconds to wait for a free connection
+    DB_POOL_RECYCLE    (1800)       seconds before a connection is replaced
+
+Connections are checked with pre_ping before use, so a restarted server
+doesn't surface as a failed page load.
+
+Every statement is timed by cursor-execute hooks: duration, row count and
+calling page are aggregated per statement fingerprint (literals and bind
+parameters stripped) into rolling histograms, see query_stats(). Statements
+slower than DB_SLOW_QUERY_MS (200) are appended as JSON lines to
+DB_SLOW_QUERY_LOG (logs/slow_queries.log); with DB_EXPLAIN_SLOW=1 the
+EXPLAIN (ANALYZE, BUFFERS) plan of slow SELECTs is captured alongside
+(at most once per fingerprint every DB_EXPLAIN_INTERVAL seconds).
+
+Usage:
+    with connection() as conn:      # autocommit, one statement at a time
+        conn.execute(text("..."))
+
+    with transaction() as conn:     # commits on success, rolls back on error
+        conn.execute(text("..."))
+"""
+
+import hashlib
+import json
+import logging
 import os
-from sqlalchemy import create_engine, text
-import pandas as pd
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event, text
+
+load_dotenv()
+
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = int(os.getenv("DB_PORT", 5000))
+DB_NAME = os.getenv("DB_NAME", "meal_planner")
+DB_USER = os.getenv("DB_USER", "postgres")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "database1")
+
+DATABASE_URL = os.getenv(
+    "DATABASE_URL", f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", 200))
+SLOW_QUERY_LOG = os.getenv("DB_SLOW_QUERY_LOG", "logs/slow_queries.log")
+EXPLAIN_SLOW = os.getenv("DB_EXPLAIN_SLOW", "0") == "1"
+EXPLAIN_INTERVAL = float(os.getenv("DB_EXPLAIN_INTERVAL", 300))
+
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW,
+    pool_timeout=POOL_TIMEOUT,
+    pool_recycle=POOL_RECYCLE,
+    pool_pre_ping=True,
+    pool_use_lifo=True,  # reuse warm connections; idle extras age out via recycle
+)
+
+# Same pool; statements commit immediately (how the pages have always run)
+autocommit_engine = engine.execution_options(isolation_level="AUTOCOMMIT")
+
+_pool_events = {'connects': 0, 'checkouts': 0, 'invalidations': 0}
+
+
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_conn, conn_record):
+    _pool_events['connects'] += 1
+
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_conn, conn_record, conn_proxy):
+    _pool_events['checkouts'] += 1
+
+
+@event.listens_for(engine, "invalidate")
+def _on_invalidate(dbapi_conn, conn_record, exception):
+    _pool_events['invalidations'] += 1
+
+
+# ========================================================================
+# QUERY TIMING
+# ========================================================================
+
+# Upper bounds (ms) of the duration histogram buckets; the last bucket is open
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+RECENT_SAMPLES = 1000
+
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%\(\w+\)s|%s|(?<!:):\w+")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint_sql(statement):
+    """Statement shape with literals and bind parameters replaced by ?"""
+    shape = _LITERALS.sub("?", statement)
+    shape = _IN_LISTS.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def _calling_page():
+    """First frame outside db.py and site-packages, as 'path:line'"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(_PROJECT_DIR) and filename != __file__
+                and "site-packages" not in filename):
+            return f"{os.path.relpath(filename, _PROJECT_DIR)}:{frame.f_lineno}"
+        frame = frame.f_back
+    return "?"
+
+
+class _QueryStat:
+    __slots__ = ('sql', 'count', 'total_ms', 'max_ms', 'rows', 'buckets', 'recent', 'callers')
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+        self.callers = {}
 
-DB_HOST = "localhost"
-DB_PORT = 5000
-DB_NAME = "meal_planner"
-DB_USER = "postgres"
-DB_PASSWORD = "database1"
+    def add(self, duration_ms, rows, caller):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.rows += max(rows, 0)
+        self.buckets[bisect_left(HISTOGRAM_BUCKETS_MS, duration_ms)] += 1
+        self.recent.append(duration_ms)
+        self.callers[caller] = self.callers.get(caller, 0) + 1
+
+    def summary(self):
+        recent = sorted(self.recent)
+
+        def pct(q):
+            return round(recent[min(len(recent) - 1, int(q * len(recent)))], 3)
+
+        return {
+            'sql': self.sql,
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.count, 3),
+            'p50_ms': pct(0.50),
+            'p95_ms': pct(0.95),
+            'p99_ms': pct(0.99),
+            'max_ms': round(self.max_ms, 3),
+            'rows': self.rows,
+            'histogram': dict(zip([f"<={b}ms" for b in HISTOGRAM_BUCKETS_MS] + ["slower"], self.buckets)),
+            'callers': dict(sorted(self.callers.items(), key=lambda kv: -kv[1])),
+        }
+
+
+_query_stats = {}
+_query_stats_lock = threading.Lock()
+_last_explain = {}
+
+_slow_log = logging.getLogger("db.slow_queries")
+_slow_log.propagate = False
+
+
+def _slow_log_handler():
+    if not _slow_log.handlers:
+        os.makedirs(os.path.dirname(SLOW_QUERY_LOG) or ".", exist_ok=True)
+        handler = logging.FileHandler(SLOW_QUERY_LOG)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _slow_log.addHandler(handler)
+        _slow_log.setLevel(logging.INFO)
+    return _slow_log
+
+
+def _explain(conn, statement, parameters):
+    """EXPLAIN (ANALYZE, BUFFERS) on the raw DBAPI cursor (bypasses these hooks)"""
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters)
+        return "\n".join(row[0] for row in cursor.fetchall())
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+    finally:
+        cursor.close()
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration_ms = (time.perf_counter() - context._query_start) * 1000
+    shape = fingerprint_sql(statement)
+    key = hashlib.sha1(shape.encode()).hexdigest()[:12]
+    caller = _calling_page()
+
+    with _query_stats_lock:
+        stat = _query_stats.get(key)
+        if stat is None:
+            stat = _query_stats[key] = _QueryStat(shape)
+        stat.add(duration_ms, cursor.rowcount, caller)
+
+    if duration_ms < SLOW_QUERY_MS:
+        return
+
+    record = {
+        'at': datetime.now().isoformat(timespec='seconds'),
+        'fingerprint': key,
+        'duration_ms': round(duration_ms, 3),
+        'rows': cursor.rowcount,
+        'caller': caller,
+        'sql': shape,
+    }
+    now = time.monotonic()
+    if (EXPLAIN_SLOW and not executemany and shape.lstrip().upper().startswith("SELECT")
+            and now - _last_explain.get(key, float("-inf")) >= EXPLAIN_INTERVAL):
+        _last_explain[key] = now
+        record['explain'] = _explain(conn, statement, parameters)
+    _slow_log_handler().info(json.dumps(record, default=str))
+
+
+def query_stats(top=20, order_by='total_ms'):
+    """
+    Per-fingerprint query statistics since start (or the last reset)
+
+    Args:
+        top (int): Number of fingerprints returned
+        order_by (str): 'total_ms', 'count', 'p95_ms', 'max_ms'...
+
+    Returns:
+        list[dict]: {'fingerprint', 'sql', 'count', 'mean_ms', 'p95_ms', 'histogram', 'callers', ...}
+    """
+    with _query_stats_lock:
+        summaries = [dict(stat.summary(), fingerprint=key) for key, stat in _query_stats.items()]
+    return sorted(summaries, key=lambda s: -s[order_by])[:top]
+
+
+def reset_query_stats():
+    with _query_stats_lock:
+        _query_stats.clear()
+
+
+# ========================================================================
+# CONNECTIONS
+# ========================================================================
+
+@contextmanager
+def connection():
+    """Pooled autocommit connection, returned to the pool on exit"""
+    with autocommit_engine.connect() as conn:
+        yield conn
+
+
+@contextmanager
+def transaction():
+    """Pooled connection inside a transaction (commit on success, rollback on error)"""
+    with engine.begin() as conn:
+        yield conn
 
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(DATABASE_URL)
 
 def get_connection():
-    conn = engine.connect()
-    conn.execution_options(isolation_level="AUTOCOMMIT")
-    return conn
+    """Pooled autocommit connection; the caller must close() it to return it to the pool"""
+    return autocommit_engine.connect()
+
+
+def pool_stats():
+    """
+    Current pool usage plus lifetime counters
+
+    Returns:
+        dict: size, checked_in, checked_out, overflow, connects, checkouts, invalidations
+    """
+    pool = engine.pool
+    return {
+        'size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': pool.overflow(),
+        **_pool_events,
+    }
+
+
+def ping():
+    """True if the database answers"""
+    try:
+        with connection() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
@@ -0,0 +1,362 @@
+"""
+food_security.py
+Module 1 inference: RandomForest food security classifier + compiled grid mode
+
+The classifier only sees (income_per_person_monthly, household_size,
+region_encoded). Household size and region are effectively discrete for the
+forest (it splits household size at a couple dozen thresholds and there are a
+fixed number of region codes), so the whole model can be "compiled" into a
+probability grid:
+
+- region axis: every class of the region encoder (exact)
+- household size axis: the intervals between the forest's own split
+  thresholds (exact)
+- income axis: fixed ₱-width cells between the lowest and highest income
+  split (the forest is constant outside that range, so those two end cells
+  are exact too)
+
+Predictions are then a single array index. The only approximation is inside
+an income cell that contains a split threshold; agreement_report() measures
+that against the forest, and the forest remains available as the exact path.
+
+Usage:
+    python food_security.py                  # compile grid + agreement report
+    python food_security.py --income-step 50
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_assets import load_csv
+from model_registry import get_registry, load_artifact, publish
+
+# Registry artifact names (see models/manifest.json)
+MODEL_ARTIFACT = "food_security_rf"
+REGION_ENCODER_ARTIFACT = "region_encoder"
+GRID_ARTIFACT = "food_security_grid"
+FEATURES_PATH = "data/fies_ml_features.csv"
+
+FEATURES = ['income_per_person_monthly', 'household_size', 'region_encoded']
+
+LEVELS = ["🟢 Secure", "🟡 Mildly Insecure", "🟠 Moderately Insecure", "🔴 Severely Insecure"]
+LEVEL_NAMES = ["Secure", "Mildly Insecure", "Moderately Insecure", "Severely Insecure"]
+
+DEFAULT_INCOME_STEP = 25.0
+
+# Upper bounds (exclusive) of income-per-person deciles 1-9; decile 10 is above
+DECILE_THRESHOLDS = np.array([1000, 2000, 3000, 4000, 5000, 6000, 7000, 8000, 10000])
+
+
+def compute_decile(income_pp):
+    """Income decile (1-10) from monthly income per person; works on scalars and arrays"""
+    decile = np.searchsorted(DECILE_THRESHOLDS, income_pp, side='right') + 1
+    return int(decile) if np.ndim(decile) == 0 else decile
+
+
+def _split_thresholds(model, feature_idx):
+    """All distinct split thresholds the forest uses for one feature"""
+    return np.unique(np.concatenate([
+        tree.tree_.threshold[tree.tree_.feature == feature_idx]
+        for tree in model.estimators_
+    ]))
+
+
+# ========================================================================
+# COMPILED GRID
+# ========================================================================
+
+class FoodSecurityGrid:
+    """Precomputed class/probability lookup for the food security forest"""
+
+    def __init__(self, income_lo, income_step, n_income_cells, household_thresholds,
+                 proba, classes, model_sha256=""):
+        self.income_lo = float(income_lo)
+        self.income_step = float(income_step)
+        self.n_income_cells = int(n_income_cells)
+        self.household_thresholds = np.asarray(household_thresholds, dtype=np.float64)
+        self.proba = proba          # (regions, household cells, income cells, classes) float16
+        self.classes = classes      # (regions, household cells, income cells) uint8
+        self.model_sha256 = model_sha256
+
+    @property
+    def n_regions(self):
+        return self.proba.shape[0]
+
+    @classmethod
+    def compile(cls, model, n_regions, income_step=DEFAULT_INCOME_STEP, model_sha256=""):
+        """
+        Evaluate the forest once at a representative point of every grid cell
+
+        Args:
+            model: Fitted RandomForestClassifier (features in FEATURES order)
+            n_regions (int): Number of region encoder classes
+            income_step (float): Width of an income cell in ₱
+            model_sha256 (str): Hash of the model file, stored for staleness checks
+
+        Returns:
+            FoodSecurityGrid
+        """
+        income_t = _split_thresholds(model, 0)
+        household_t = _split_thresholds(model, 1)
+
+        income_lo, income_hi = income_t[0], income_t[-1]
+        n_steps = int(np.ceil((income_hi - income_lo) / income_step))
+
+        # Cell 0: income <= lo, cell k: (lo + (k-1)*step, lo + k*step], last: above hi
+        income_points = np.concatenate([
+            [income_lo],
+            income_lo + (np.arange(1, n_steps + 1) - 0.5) * income_step,
+            [income_lo + n_steps * income_step + 1.0],
+        ])
+        # Household cell k covers (t[k-1], t[k]]
+        household_points = np.concatenate([
+            [household_t[0]],
+            (household_t[:-1] + household_t[1:]) / 2,
+            [household_t[-1] + 1.0],
+        ])
+
+        shape = (n_regions, len(household_points), len(income_points))
+        r, h, i = np.indices(shape).reshape(3, -1)
+        features = pd.DataFrame({
+            FEATURES[0]: income_points[i],
+            FEATURES[1]: household_points[h],
+            FEATURES[2]: r,
+        })
+        proba = model.predict_proba(features)
+
+        return cls(
+            income_lo=income_lo,
+            income_step=income_step,
+            n_income_cells=len(income_points),
+            household_thresholds=household_t,
+            proba=proba.reshape(shape + (proba.shape[1],)).astype(np.float16),
+            classes=model.classes_[proba.argmax(axis=1)].reshape(shape).astype(np.uint8),
+            model_sha256=model_sha256,
+        )
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            income_lo=self.income_lo,
+            income_step=self.income_step,
+            n_income_cells=self.n_income_cells,
+            household_thresholds=self.household_thresholds,
+            proba=self.proba,
+            classes=self.classes,
+            model_sha256=self.model_sha256,
+        )
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                income_lo=data['income_lo'],
+                income_step=data['income_step'],
+                n_income_cells=data['n_income_cells'],
+                household_thresholds=data['household_thresholds'],
+                proba=data['proba'],
+                classes=data['classes'],
+                model_sha256=str(data['model_sha256']),
+            )
+
+    def cell_index(self, income_pp, household_size):
+        """
+        Map raw inputs to (household cell, income cell) indices
+
+        Raises:
+            ValueError: If any input is NaN or infinite (it has no cell)
+        """
+        income_pp = np.asarray(income_pp, dtype=np.float64)
+        household_size = np.asarray(household_size, dtype=np.float64)
+        if not (np.isfinite(income_pp).all() and np.isfinite(household_size).all()):
+            raise ValueError("income_pp and household_size must be finite")
+
+        income_idx = np.ceil((income_pp - self.income_lo) / self.income_step)
+        income_idx = np.clip(income_idx, 0, self.n_income_cells - 1).astype(np.intp)
+        household_idx = np.searchsorted(self.household_thresholds, household_size, side='left')
+        return household_idx, income_idx
+
+    def predict_proba(self, income_pp, household_size, region_encoded):
+        h, i = self.cell_index(income_pp, household_size)
+        return self.proba[np.asarray(region_encoded, dtype=np.intp), h, i].astype(np.float32)
+
+    def predict(self, income_pp, household_size, region_encoded):
+        h, i = self.cell_index(income_pp, household_size)
+        return self.classes[np.asarray(region_encoded, dtype=np.intp), h, i]
+
+
+def agreement_report(grid, model, features):
+    """
+    Compare grid predictions against the forest on the same inputs
+
+    Args:
+        grid (FoodSecurityGrid): Compiled grid
+        model: The forest the grid was compiled from
+        features (pd.DataFrame): Rows with the FEATURES columns
+
+    Returns:
+        dict: Class agreement and probability error statistics
+    """
+    exact_proba = model.predict_proba(features[FEATURES])
+    exact_class = model.classes_[exact_proba.argmax(axis=1)]
+
+    grid_proba = grid.predict_proba(*(features[col].to_numpy() for col in FEATURES))
+    grid_class = grid.predict(*(features[col].to_numpy() for col in FEATURES))
+
+    error = np.abs(grid_proba - exact_proba)
+    return {
+        'rows': len(features),
+        'class_agreement': float((grid_class == exact_class).mean()),
+        'mean_abs_proba_error': float(error.mean()),
+        'max_abs_proba_error': float(error.max()),
+    }
+
+
+# ========================================================================
+# PREDICTOR (COMPILED WITH EXACT FALLBACK)
+# ========================================================================
+
+class FoodSecurityPredictor:
+    """
+    Food security prediction for the assessment page and batch scoring
+
+    Uses the compiled grid when one is available and was built from this
+    exact model file; otherwise (or with exact=True) runs the forest.
+    """
+
+    def __init__(self, model, region_encoder, grid=None):
+        self.model = model
+        self.region_encoder = region_encoder
+        self.grid = grid
+        if grid is not None and grid.n_regions != len(region_encoder.classes_):
+            self.grid = None
+
+    def encode_regions(self, regions):
+        return self.region_encoder.transform(np.atleast_1d(regions))
+
+    def predict_proba(self, income_pp, household_size, region_encoded, exact=False):
+        """Class probabilities for encoded rows (vectorized)"""
+        if self.grid is not None and not exact:
+            return self.grid.predict_proba(income_pp, household_size, region_encoded)
+        features = pd.DataFrame({
+            FEATURES[0]: np.atleast_1d(income_pp),
+            FEATURES[1]: np.atleast_1d(household_size),
+            FEATURES[2]: np.atleast_1d(region_encoded),
+        })
+        return self.model.predict_proba(features)
+
+    def predict_batch(self, income_pp, household_size, region_encoded, exact=False):
+        """
+        Vectorized prediction for many encoded rows
+
+        Returns:
+            tuple: (security_level_num array, confidence_percent array)
+        """
+        prob = self.predict_proba(income_pp, household_size, region_encoded, exact=exact)
+        levels = prob.argmax(axis=1)
+        return levels, prob[np.arange(len(levels)), levels] * 100
+
+    def predict_one(self, income_pp, household_size, region, exact=False):
+        """
+        Predict a single household
+
+        Returns:
+            tuple: (security_level_num, confidence_percent)
+
+        Raises:
+            ValueError: If the region is unknown to the encoder
+        """
+        region_encoded = self.encode_regions([region])
+        prob = self.predict_proba([income_pp], [household_size], region_encoded, exact=exact)[0]
+        level = int(np.argmax(prob))
+        return level, float(prob[level] * 100)
+
+
+def artifact_versions():
+    """Current registry versions of the predictor's artifacts (cache key for the pages)"""
+    registry = get_registry()
+    return tuple(registry.current_version(name)
+                 for name in (MODEL_ARTIFACT, REGION_ENCODER_ARTIFACT, GRID_ARTIFACT))
+
+
+def load_predictor():
+    """Build a predictor from the registry's cached forest, encoder and (if current) grid"""
+    registry = get_registry()
+    model = load_artifact(MODEL_ARTIFACT)
+    region_encoder = load_artifact(REGION_ENCODER_ARTIFACT)
+
+    grid = None
+    try:
+        grid = load_artifact(GRID_ARTIFACT, loader=FoodSecurityGrid.load)
+        if grid.model_sha256 != registry.resolve(MODEL_ARTIFACT)['sha256']:
+            grid = None  # compiled from a different forest
+    except FileNotFoundError:
+        pass
+
+    return FoodSecurityPredictor(model, region_encoder, grid)
+
+
+def publish_grid(model, n_regions, income_step=DEFAULT_INCOME_STEP, metadata=None):
+    """Compile the current forest and publish the grid to the registry"""
+    grid = FoodSecurityGrid.compile(model, n_regions, income_step=income_step,
+                                    model_sha256=get_registry().resolve(MODEL_ARTIFACT)['sha256'])
+    version = publish(GRID_ARTIFACT, grid, fmt='npz', writer=lambda obj, path: obj.save(path),
+                      metadata=dict(metadata or {}, income_step=income_step))
+    return grid, version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the food security forest into a lookup grid")
+    parser.add_argument("--income-step", type=float, default=DEFAULT_INCOME_STEP,
+                        help="Income cell width in ₱ (smaller = closer to the forest, bigger grid)")
+    args = parser.parse_args()
+
+    print("📦 Loading model and region encoder...")
+    model = load_artifact(MODEL_ARTIFACT)
+    region_encoder = load_artifact(REGION_ENCODER_ARTIFACT)
+
+    print(f"🤖 Compiling grid (₱{args.income_step:g} income cells)...")
+    start = time.perf_counter()
+    grid, version = publish_grid(model, len(region_encoder.classes_), args.income_step)
+    print(f"✅ Grid {grid.proba.shape[:3]} compiled in {time.perf_counter() - start:.1f}s "
+          f"({grid.proba.nbytes / 1e6:.1f} MB in memory)")
+    print(f"✅ Published: {GRID_ARTIFACT} {version}")
+
+    # Agreement on real training rows and on a uniform sample of form inputs
+    print("\n📈 Agreement vs forest:")
+    fies_ml = load_csv(FEATURES_PATH)
+    fies_ml['region_encoded'] = region_encoder.transform(fies_ml['region'])
+
+    rng = np.random.default_rng(42)
+    n = 20000
+    sample = pd.DataFrame({
+        FEATURES[0]: rng.uniform(0, 15000, n),
+        FEATURES[1]: rng.integers(1, 21, n).astype(float),
+        FEATURES[2]: rng.integers(0, len(region_encoder.classes_), n),
+    })
+
+    for name, rows in [("training rows", fies_ml), ("uniform sample", sample)]:
+        report = agreement_report(grid, model, rows)
+        print(f"  {name}: {report['class_agreement']*100:.2f}% class agreement, "
+              f"mean |Δp| {report['mean_abs_proba_error']:.4f}, "
+              f"max |Δp| {report['max_abs_proba_error']:.3f} ({report['rows']:,} rows)")
+
+    # Latency: single-row forest vs grid
+    one = sample.iloc[:1]
+    start = time.perf_counter()
+    for _ in range(20):
+        model.predict_proba(one[FEATURES])
+    forest_ms = (time.perf_counter() - start) / 20 * 1000
+    start = time.perf_counter()
+    for _ in range(2000):
+        grid.predict_proba(*(one[col].to_numpy() for col in FEATURES))
+    grid_ms = (time.perf_counter() - start) / 2000 * 1000
+    print(f"\n⏱️ Single-row latency: forest {forest_ms:.2f} ms, grid {grid_ms:.4f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+incremental_train.py
+Incremental retraining of the food security classifier (Module 1)
+
+The classifier is trained on data/fies_ml_features.csv, while every saved
+assessment adds a row to security_survey. Instead of retraining over a
+growing table, this pulls only the survey rows scored since the watermark
+recorded on the current model version and either:
+
+    extend  - grows the current forest with warm_start: the new trees are
+              fitted on the new rows plus a replay sample of the base
+              training data (so every class is present), and the oldest
+              trees are dropped once the forest exceeds --max-trees
+    window  - refits from scratch on the base data plus the most recent
+              --window survey rows
+
+Survey labels are the stored security_level_num, i.e. the model's own
+prediction at save time; --min-confidence keeps only confident rows. The
+watermark is a (ml_predicted_at, id) keyset position rather than an id, so
+rows that were imported earlier and scored later (bulk_scoring.py) are
+still picked up. Rows scored in the last WATERMARK_LAG are left for the next
+run, so a scoring transaction that commits late can't land behind it.
+
+The result is published through the model registry (model, region encoder,
+compiled grid) with the new watermark, so the Streamlit pages pick it up
+on their next run. The base version's pipeline fingerprint is carried over,
+so `python train_pipeline.py` keeps the incremental model until the CSV or
+hyperparameters change (or --force is given).
+
+Usage:
+    python incremental_train.py                     # extend with new rows
+    python incremental_train.py --mode window --window 5000
+"""
+
+import argparse
+import copy
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sqlalchemy import text
+
+import module1_train
+from food_security import MODEL_ARTIFACT, REGION_ENCODER_ARTIFACT
+from model_registry import get_registry, load_artifact
+
+DEFAULT_NEW_TREES = 20
+DEFAULT_MAX_TREES = 400
+DEFAULT_WINDOW = 5000
+DEFAULT_REPLAY_ROWS = 1000
+MIN_NEW_ROWS = 50
+WATERMARK_LAG = "5 minutes"  # Postgres interval
+
+
+# ========================================================================
+# NEW SURVEY ROWS
+# ========================================================================
+
+def parse_watermark(value):
+    """
+    Keyset position from a model version's survey_watermark
+
+    Returns:
+        tuple: (ml_predicted_at or None, id); versions published before the
+            keyset watermark stored a bare id, which only bounds the id
+    """
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value['ml_predicted_at']), int(value['id'])
+    return None, int(value or 0)
+
+
+def fetch_survey_rows(conn, after=(None, 0), limit=None, min_confidence=0.0):
+    """
+    Scored security_survey rows past a (ml_predicted_at, id) watermark, in that order
+
+    With limit, returns the most recently scored `limit` rows instead (sliding window).
+    """
+    predicted_at, after_id = after
+    if limit:
+        position = "TRUE"
+    elif predicted_at is None:
+        position = "id > :after_id"
+    else:
+        position = "(ml_predicted_at, id) > (:predicted_at, :after_id)"
+    order = "DESC" if limit else "ASC"
+    rows = conn.execute(text(f"""
+        SELECT id, ml_predicted_at, region, household_size, income_per_person_monthly, security_level_num
+        FROM security_survey
+        WHERE {position}
+          AND ml_predicted_at < now() - interval '{WATERMARK_LAG}'
+          AND security_level_num IS NOT NULL
+          AND COALESCE(ml_confidence, 0) >= :min_confidence
+        ORDER BY ml_predicted_at {order}, id {order}
+        {"LIMIT :limit" if limit else ""}
+    """), {"predicted_at": predicted_at, "after_id": after_id,
+           "min_confidence": min_confidence, "limit": limit}).fetchall()
+    survey = pd.DataFrame(rows, columns=['id', 'ml_predicted_at', 'region', 'household_size',
+                                         'income_per_person_monthly', module1_train.TARGET])
+    return survey.sort_values(['ml_predicted_at', 'id']).reset_index(drop=True)
+
+
+def encode_survey(survey, le):
+    """Add region_encoded; rows with regions the encoder never saw are dropped"""
+    region_codes = {region: code for code, region in enumerate(le.classes_)}
+    survey = survey.assign(region_encoded=survey['region'].map(region_codes))
+    survey = survey.dropna(subset=['region_encoded'])
+    return survey.astype({'region_encoded': int, 'household_size': float,
+                          'income_per_person_monthly': float, module1_train.TARGET: int})
+
+
+# ========================================================================
+# TRAINING MODES
+# ========================================================================
+
+def extend_forest(model, X_new, y_new, n_new_trees=DEFAULT_NEW_TREES, max_trees=DEFAULT_MAX_TREES):
+    """
+    Add n_new_trees fitted on (X_new, y_new) to a copy of a fitted forest
+
+    y_new must contain every class the forest knows, otherwise sklearn
+    re-derives classes_ and the old trees' outputs no longer line up.
+    Once the forest exceeds max_trees the oldest trees are dropped.
+    """
+    missing = set(model.classes_) - set(np.unique(y_new))
+    if missing:
+        raise ValueError(f"New training rows are missing classes {sorted(missing)}")
+
+    model = copy.deepcopy(model)  # the registry copy is shared (and memory-mapped)
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + n_new_trees)
+    model.fit(X_new, y_new)
+
+    if len(model.estimators_) > max_trees:
+        model.estimators_ = model.estimators_[-max_trees:]
+    model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+    return model
+
+
+def replay_sample(X_train, y_train, n_rows, random_state=42):
+    """Stratified sample of the base training data mixed into each increment"""
+    frac = min(1.0, n_rows / len(X_train))
+    sample = y_train.groupby(y_train).sample(frac=frac, random_state=random_state)
+    return X_train.loc[sample.index], sample
+
+
+def run_incremental(mode='extend', n_new_trees=DEFAULT_NEW_TREES, max_trees=DEFAULT_MAX_TREES,
+                    window=DEFAULT_WINDOW, replay_rows=DEFAULT_REPLAY_ROWS,
+                    min_confidence=0.0, min_rows=MIN_NEW_ROWS):
+    """
+    Update the food security model from survey rows past the watermark
+
+    Returns:
+        dict: {'status': 'skipped'|'trained', 'new_rows', 'watermark', 'versions', 'metrics'}
+    """
+    from db import engine
+
+    registry = get_registry()
+    current = registry.resolve(MODEL_ARTIFACT)
+    watermark = current.get('survey_watermark', 0)
+    le = load_artifact(REGION_ENCODER_ARTIFACT)
+
+    with engine.connect() as conn:
+        survey = fetch_survey_rows(conn, parse_watermark(watermark), min_confidence=min_confidence)
+        new_rows = encode_survey(survey, le)
+        if mode == 'window':
+            window_rows = encode_survey(fetch_survey_rows(conn, limit=window, min_confidence=min_confidence), le)
+
+    if survey.empty or len(new_rows) < min_rows:  # nothing new, whatever min_rows is
+        return {'status': 'skipped', 'new_rows': len(new_rows), 'watermark': watermark,
+                'versions': {MODEL_ARTIFACT: current['version']}, 'metrics': {}}
+
+    fies_ml, _ = module1_train.load_data()
+    fies_ml['region_encoded'] = le.transform(fies_ml['region'])
+    X_train, X_test, y_train, y_test = module1_train.split(fies_ml)
+    params = current.get('params', module1_train.PARAMS)
+
+    start = time.perf_counter()
+    if mode == 'extend':
+        X_replay, y_replay = replay_sample(X_train, y_train, replay_rows)
+        X_new = pd.concat([new_rows[module1_train.FEATURES], X_replay], ignore_index=True)
+        y_new = pd.concat([new_rows[module1_train.TARGET], y_replay], ignore_index=True)
+        model = extend_forest(load_artifact(MODEL_ARTIFACT), X_new, y_new, n_new_trees, max_trees)
+    else:
+        X_fit = pd.concat([X_train, window_rows[module1_train.FEATURES]], ignore_index=True)
+        y_fit = pd.concat([y_train, window_rows[module1_train.TARGET]], ignore_index=True)
+        model = RandomForestClassifier(**params).fit(X_fit, y_fit)
+    train_seconds = time.perf_counter() - start
+
+    # From the fetched rows, not new_rows: rows dropped by encode_survey are consumed too
+    last = survey.iloc[-1]
+    new_watermark = {'ml_predicted_at': last['ml_predicted_at'].isoformat(), 'id': int(last['id'])}
+    metrics = {
+        'accuracy': round(float(accuracy_score(y_test, model.predict(X_test))), 4),
+        'train_seconds': round(train_seconds, 3),
+        'n_trees': len(model.estimators_),
+    }
+    metadata = dict(metrics, params=params, survey_watermark=new_watermark,
+                    incremental={'mode': mode, 'new_rows': len(new_rows), 'base_version': current['version']})
+    if 'fingerprint' in current:
+        metadata['fingerprint'] = current['fingerprint']
+
+    versions = module1_train.publish_artifacts(model, le, metadata)
+    return {'status': 'trained', 'new_rows': len(new_rows), 'watermark': new_watermark,
+            'versions': versions, 'metrics': metrics}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally retrain the food security model")
+    parser.add_argument("--mode", choices=["extend", "window"], default="extend")
+    parser.add_argument("--trees", type=int, default=DEFAULT_NEW_TREES, help="Trees added per increment (extend)")
+    parser.add_argument("--max-trees", type=int, default=DEFAULT_MAX_TREES, help="Oldest trees dropped past this (extend)")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="Most recent survey rows used (window)")
+    parser.add_argument("--replay", type=int, default=DEFAULT_REPLAY_ROWS, help="Base rows mixed into each increment")
+    parser.add_argument("--min-confidence", type=float, default=0.0, help="Minimum stored ml_confidence (%%)")
+    parser.add_argument("--min-rows", type=int, default=MIN_NEW_ROWS, help="Skip if fewer new rows")
+    args = parser.parse_args()
+
+    print(f"🔄 Incremental update ({args.mode})...")
+    result = run_incremental(args.mode, args.trees, args.max_trees, args.window,
+                             args.replay, args.min_confidence, args.min_rows)
+    if result['status'] == 'skipped':
+        keeping = result['versions'][MODEL_ARTIFACT]
+        if result['new_rows']:
+            print(f"⏭️ Only {result['new_rows']} new survey rows past {result['watermark']} "
+                  f"(need {args.min_rows}), keeping {keeping}")
+        else:
+            print(f"⏭️ No new survey rows past {result['watermark']}, keeping {keeping}")
+        return
+
+    print(f"✅ {result['new_rows']} new rows, watermark now {result['watermark']}")
+    for artifact, version in result['versions'].items():
+        print(f"✅ Published: {artifact} {version}")
+    for key, value in result['metrics'].items():
+        print(f"   {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
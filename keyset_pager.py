@@ -0,0 +1,135 @@
+"""
+keyset_pager.py
+Keyset (seek) pagination for the history views
+
+OFFSET pagination makes the database read and discard every row before the
+requested page, so deep pages get slower as a history grows. Here a page
+is the next `limit` rows *after the last key shown*, on a (sort column, id)
+pair matching an index, e.g.
+
+    ... WHERE user_id = :uid AND (created_at, id) < (:after_0, :after_1)
+    ORDER BY created_at DESC, id DESC LIMIT :limit
+
+which is an index range scan of page size wherever the page is.
+
+KeysetPager keeps the pages a session has already loaded in
+st.session_state, so "Older" / "Newer" and ordinary reruns don't query
+again. The first page is passed in by the caller (normally from
+query_cache, which writes invalidate); when it changes, i.e. a new record
+was saved, the deeper pages are dropped and browsing starts over.
+
+Usage:
+    pager = KeysetPager(st.session_state, "assessment_history", load_page, keys=('created_at', 'id'))
+    pager.sync(first_page)
+    rows = pager.rows()
+    if pager.has_older() and st.button("Older"): pager.older()
+"""
+
+from sqlalchemy import text
+
+PAGE_SIZE = 10
+
+
+def seek_page(conn, query, keys, after=None, limit=PAGE_SIZE, params=None):
+    """
+    One page of a query, newest first, after a key
+
+    Args:
+        query (str): SELECT ... FROM ... WHERE ... without ORDER BY / LIMIT;
+            the key columns must be selected under their own names
+        keys (tuple): Sort column and tie-breaker, e.g. ('m.week_start', 'm.id')
+        after (tuple): Key of the last row of the previous page (None: first page)
+
+    Returns:
+        list[Row]: Up to limit + 1 rows; the extra row only signals another page
+    """
+    params = dict(params or {}, limit=limit + 1)
+    seek = ""
+    if after is not None:
+        seek = f" AND ({', '.join(keys)}) < ({', '.join(f':after_{i}' for i in range(len(keys)))})"
+        params.update({f"after_{i}": value for i, value in enumerate(after)})
+    order = ", ".join(f"{key} DESC" for key in keys)
+    return conn.execute(text(f"{query}{seek} ORDER BY {order} LIMIT :limit"), params).fetchall()
+
+
+class KeysetPager:
+    """Session-cached pages of one keyset query"""
+
+    def __init__(self, state, name, load_page, keys, page_size=PAGE_SIZE, load_details=None):
+        """
+        Args:
+            state: st.session_state (any dict-like)
+            name (str): Session key for this view's pages
+            load_page: load_page(after_key, limit) -> rows, e.g. a seek_page call
+            keys (tuple): Row attributes that form the key (bare column names)
+            load_details: Optional load_details(rows) -> per-page data cached with the page
+        """
+        self.load_page = load_page
+        self.load_details = load_details
+        self.keys = tuple(key.rsplit('.', 1)[-1] for key in keys)
+        self.page_size = page_size
+        self._state = state.setdefault(f"pages_{name}", {'pages': [], 'current': 0})
+
+    def _key(self, row):
+        return tuple(getattr(row, key) for key in self.keys)
+
+    def _store(self, rows, details=None):
+        page = list(rows[:self.page_size])
+        if details is None and self.load_details is not None and page:
+            details = self.load_details(page)
+        self._state['pages'].append({'rows': page, 'more': len(rows) > self.page_size, 'details': details})
+
+    def sync(self, first_rows, details=None):
+        """
+        Use first_rows (limit + 1 rows, see seek_page) as page 1; start over if it changed
+
+        details: page 1's load_details result, if the caller has it cached too
+        """
+        pages = self._state['pages']
+        if pages and [self._key(row) for row in pages[0]['rows']] == \
+                [self._key(row) for row in first_rows[:self.page_size]]:
+            if details is not None:
+                pages[0]['details'] = details
+            return
+        self.reset()
+        self._store(first_rows, details)
+
+    def reset(self):
+        self._state['pages'] = []
+        self._state['current'] = 0
+
+    @property
+    def current(self):
+        """0-based index of the page shown"""
+        return self._state['current']
+
+    def rows(self):
+        pages = self._state['pages']
+        if not pages:
+            self._store(self.load_page(None, self.page_size))
+        return pages[self._state['current']]['rows']
+
+    def details(self):
+        """load_details result for the page shown"""
+        self.rows()
+        return self._state['pages'][self._state['current']]['details']
+
+    def has_older(self):
+        return bool(self._state['pages']) and self._state['pages'][self._state['current']]['more']
+
+    def has_newer(self):
+        return self._state['current'] > 0
+
+    def older(self):
+        """Move to the next page, loading it once (seek from the last key shown)"""
+        pages = self._state['pages']
+        if not self.has_older():
+            return
+        if self._state['current'] + 1 == len(pages):
+            last = pages[self._state['current']]['rows'][-1]
+            self._store(self.load_page(self._key(last), self.page_size))
+        self._state['current'] += 1
+
+    def newer(self):
+        if self.has_newer():
+            self._state['current'] -= 1
@@ -0,0 +1,696 @@
+"""
+load_test.py
+Load generator for capacity planning: concurrent planners and dashboard users
+
+Replays a weighted mix of what real sessions do:
+
+    login        the users lookup from main.py
+    assessment   predict + INSERT into security_survey (dashboard_assessment.py)
+    plan         plan generation with a random budget, household and allergy set,
+                 queued for saving through plan_writer (dashboard_meal_planner.py)
+    dashboard    quick stats, first plan page with daily totals and assessment
+                 history (dashboard_main.py / dashboard_assessment.py), through
+                 query_cache as the pages do unless --no-cache
+
+against one of two targets:
+
+    direct   everything in this process, threads as Streamlit sessions: the
+             planner runs on the request thread, so this is what one
+             Streamlit box sustains (plan generation holds the GIL)
+    api      plan generation and scoring go to planning_service.py over HTTP;
+             login, inserts and dashboard reads still hit the database from here
+
+Load is closed-loop by default (--concurrency virtual users back to back).
+With --rate, requests are scheduled at that rate (--arrival poisson or
+constant) and latency is measured from the scheduled start, so a saturated
+system shows up as growing latency rather than as a lower request rate.
+
+The report has per-operation throughput, latency percentiles and error
+rates, plus database pool saturation sampled during the run (checked-out
+connections against pool size + overflow, pool timeouts), the query_cache
+hit rate, the busiest statements from db.query_stats() and, for the api
+target, the service's worker pool and plan writer counters.
+
+Virtual users are real rows: --users accounts named loadtest_NNNN are
+created if missing (password "loadtest") and each gets one assessment before
+the run, so plans have a security_id to be saved against. Point it at a
+scratch database.
+
+Usage:
+    python load_test.py --concurrency 20 --duration 60
+    python load_test.py --target api --url http://127.0.0.1:8000 --rate 15 --duration 120
+    python load_test.py --mix plan=60,dashboard=40 --users 200 --json report.json
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+OPERATIONS = ('login', 'assessment', 'plan', 'dashboard')
+DEFAULT_MIX = {'login': 10, 'assessment': 15, 'plan': 25, 'dashboard': 50}
+DEFAULT_USERS = 50
+USER_PREFIX = "loadtest_"
+USER_PASSWORD = "loadtest"
+POOL_SAMPLE_INTERVAL = 0.1  # seconds
+PROGRESS_INTERVAL = 5.0     # seconds
+
+# How many allergies a household picks, and how often
+ALLERGY_COUNT_WEIGHTS = {0: 60, 1: 25, 2: 10, 3: 5}
+
+
+# ========================================================================
+# INPUTS
+# ========================================================================
+
+class VirtualUser:
+    __slots__ = ('id', 'username', 'security_id', 'region', 'household_size', 'monthly_income')
+
+    def __init__(self, user_id, username):
+        self.id = user_id
+        self.username = username
+        self.security_id = None
+        self.region = None
+        self.household_size = None
+        self.monthly_income = None
+
+
+def random_household(rng, regions):
+    return {
+        'region': rng.choice(regions),
+        'household_size': rng.choices(range(1, 9), weights=[6, 14, 18, 22, 16, 11, 8, 5])[0],
+        'monthly_income': round(rng.uniform(5_000, 60_000), 2),
+    }
+
+
+def random_plan_inputs(rng, user, allergens):
+    """Weekly budget around the planner's 25%-of-income default, plus an allergy set"""
+    default_budget = user.monthly_income * 0.25 / 4.33
+    count = rng.choices(list(ALLERGY_COUNT_WEIGHTS), weights=list(ALLERGY_COUNT_WEIGHTS.values()))[0]
+    return {
+        'weekly_budget': round(default_budget * rng.uniform(0.6, 1.4), 2),
+        'allergies': rng.sample(allergens, count),
+    }
+
+
+def parse_mix(spec):
+    """'plan=60,dashboard=40' -> {'plan': 60, 'dashboard': 40}"""
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}'. Available: {', '.join(OPERATIONS)}")
+        mix[name] = float(weight)
+    if not any(mix.values()):
+        raise ValueError("The mix needs at least one operation with a positive weight")
+    return mix
+
+
+# ========================================================================
+# TARGETS
+# ========================================================================
+
+class DirectTarget:
+    """Runs every operation in this process, as the Streamlit pages do"""
+
+    name = 'direct'
+
+    def __init__(self, use_cache=True):
+        from food_security import LEVEL_NAMES, compute_decile, load_predictor
+        from module2_meal_planner_optimized import ALLERGENS
+
+        self.use_cache = use_cache
+        self.allergens = ALLERGENS
+        self.level_names = LEVEL_NAMES
+        self.compute_decile = compute_decile
+        self.predictor = load_predictor()
+        self.regions = [str(region) for region in self.predictor.region_encoder.classes_]
+        self._planner = None
+        self._planner_lock = threading.Lock()
+
+    def setup(self):
+        with self._planner_lock:
+            if self._planner is None:
+                with contextlib.redirect_stdout(open(os.devnull, 'w')):
+                    from module2_meal_planner_optimized import AIWeeklyMealPlannerWithML
+                    self._planner = AIWeeklyMealPlannerWithML()
+
+    # -- operations ------------------------------------------------------
+
+    def login(self, user, rng):
+        from db import connection
+
+        with connection() as conn:
+            row = conn.execute(
+                text("SELECT id, username FROM users WHERE username=:u AND password_hash=:p"),
+                {"u": user.username, "p": hashlib.sha256(USER_PASSWORD.encode()).hexdigest()}
+            ).fetchone()
+        if row is None:
+            raise LookupError(f"login failed for {user.username}")
+
+    def score(self, user):
+        """(level, confidence) for the user's household"""
+        return self.predictor.predict_one(user.monthly_income / user.household_size,
+                                          user.household_size, user.region)
+
+    def assessment(self, user, rng):
+        from db import connection
+        from query_cache import ASSESSMENT_QUERIES, invalidate
+
+        for key, value in random_household(rng, self.regions).items():
+            setattr(user, key, value)
+        level, confidence = self.score(user)
+        income_pp = user.monthly_income / user.household_size
+        with connection() as conn:
+            user.security_id = conn.execute(text("""
+                INSERT INTO security_survey (
+                    user_id, region, household_size, monthly_income,
+                    income_per_person_monthly, income_per_person_daily,
+                    worried_food, healthy_food, skip_meals, decile,
+                    security_level_num, security_level,
+                    ml_confidence, ml_predicted_at
+                ) VALUES (
+                    :uid, :region, :size, :income, :income_pp, :income_daily,
+                    :worried, :healthy, :skip, :decile,
+                    :score, :level,
+                    :confidence, now()
+                )
+                RETURNING id
+            """), {
+                "uid": user.id, "region": user.region, "size": float(user.household_size),
+                "income": user.monthly_income, "income_pp": income_pp, "income_daily": income_pp / 30,
+                "worried": rng.choice(["No", "Yes"]), "healthy": rng.choice(["No", "Yes"]),
+                "skip": rng.choice(["No", "Yes"]), "decile": self.compute_decile(income_pp),
+                "score": int(level), "level": self.level_names[level], "confidence": confidence,
+            }).scalar()
+        invalidate(user.id, *ASSESSMENT_QUERIES)
+
+    def generate_plan(self, user, inputs):
+        from plan_catalog import plan_for
+
+        user_data = {'income': user.monthly_income, 'family_size': user.household_size,
+                     'region': user.region, 'security_level': 'Unknown'}
+        return plan_for(self._planner, user_data, custom_weekly_budget=inputs['weekly_budget'],
+                        allergies=inputs['allergies'])
+
+    def plan(self, user, rng):
+        from plan_writer import submit
+
+        inputs = random_plan_inputs(rng, user, self.allergens)
+        plan = self.generate_plan(user, inputs)
+        if 'error' in plan:
+            raise RuntimeError(plan['error'])
+        submit(
+            security_id=user.security_id, security_level='Unknown', region=user.region,
+            household_size=user.household_size, monthly_income=user.monthly_income,
+            weekly_budget=inputs['weekly_budget'], total_weekly_cost=plan['summary']['total_cost'],
+            allergies=inputs['allergies'], meal_plan_data=plan, user_id=user.id
+        )
+
+    def dashboard(self, user, rng):
+        from db import connection
+        from keyset_pager import seek_page
+        from meal_plan_store import daily_totals
+        from query_cache import ASSESSMENT_HISTORY, QUICK_STATS, RECENT_PLANS, cached
+
+        def quick_stats():
+            with connection() as conn:
+                return conn.execute(text("""
+                    SELECT assessments, meal_plans,
+                           income_pp_sum / NULLIF(income_pp_count, 0) AS avg_income_pp, secure_count
+                    FROM user_stats
+                    WHERE user_id = :uid
+                """), {"uid": user.id}).fetchone()
+
+        def recent_plans():
+            with connection() as conn:
+                plans = seek_page(conn, """
+                    SELECT m.id, m.week_start, m.region, m.household_size, m.monthly_income,
+                           m.security_level, m.weekly_budget, m.total_weekly_cost,
+                           b.body AS plan_body, m.created_at
+                    FROM meal_plans m
+                    LEFT JOIN plan_bodies b ON b.hash = m.plan_hash
+                    WHERE m.user_id = :uid
+                """, ('m.week_start', 'm.id'), None, 3, {"uid": user.id})
+                return plans, daily_totals(conn, [plan.id for plan in plans[:3]]) if plans else []
+
+        def assessment_history():
+            with connection() as conn:
+                return seek_page(conn, """
+                    SELECT id, security_level, region, income_per_person_monthly, household_size,
+                           decile, ml_predicted_at, created_at
+                    FROM security_survey
+                    WHERE user_id = :uid
+                """, ('created_at', 'id'), None, 10, {"uid": user.id})
+
+        for name, loader in ((QUICK_STATS, quick_stats), (RECENT_PLANS, recent_plans),
+                             (ASSESSMENT_HISTORY, assessment_history)):
+            if self.use_cache:
+                cached(user.id, name, loader)
+            else:
+                loader()
+
+    def service_stats(self):
+        from plan_writer import writer_stats
+        return {'plan_writer': writer_stats()}
+
+    def close(self):
+        pass
+
+
+class ApiTarget(DirectTarget):
+    """Plan generation and scoring through planning_service.py"""
+
+    name = 'api'
+
+    def __init__(self, url, use_cache=True, timeout=60.0):
+        import httpx
+
+        super().__init__(use_cache)
+        self.url = url.rstrip('/')
+        self._client = httpx.Client(base_url=self.url, timeout=timeout,
+                                    limits=httpx.Limits(max_connections=1000))
+
+    def setup(self):
+        response = self._client.get("/health")
+        response.raise_for_status()
+
+    def _post(self, path, payload):
+        response = self._client.post(path, json=payload)
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    def score(self, user):
+        result = self._post("/assessments/score", {
+            'region': user.region, 'household_size': user.household_size,
+            'monthly_income': user.monthly_income})
+        return result['security_level_num'], result['ml_confidence']
+
+    def plan(self, user, rng):
+        inputs = random_plan_inputs(rng, user, self.allergens)
+        self._post("/plans", {
+            'income': user.monthly_income, 'family_size': user.household_size, 'region': user.region,
+            'weekly_budget': inputs['weekly_budget'], 'allergies': inputs['allergies'],
+            'save': True, 'security_id': user.security_id, 'user_id': user.id})
+
+    def service_stats(self):
+        health = self._client.get("/health").json()
+        return {'service': health}
+
+    def close(self):
+        self._client.close()
+
+
+def ensure_users(count):
+    """Create (if missing) and return the load test's user accounts"""
+    from db import transaction
+
+    usernames = [f"{USER_PREFIX}{i:04d}" for i in range(count)]
+    password_hash = hashlib.sha256(USER_PASSWORD.encode()).hexdigest()
+    with transaction() as conn:
+        conn.execute(text("""
+            INSERT INTO users (username, email, password_hash)
+            SELECT u, u || '@loadtest.invalid', :h FROM unnest(CAST(:usernames AS text[])) AS u
+            ON CONFLICT DO NOTHING
+        """), {"usernames": usernames, "h": password_hash})
+        rows = conn.execute(text("""
+            SELECT id, username FROM users WHERE username = ANY(CAST(:usernames AS text[])) ORDER BY username
+        """), {"usernames": usernames}).fetchall()
+    return [VirtualUser(row.id, row.username) for row in rows]
+
+
+# ========================================================================
+# MEASUREMENT
+# ========================================================================
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class Recorder:
+    """Per-operation latencies and errors"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {op: [] for op in OPERATIONS}
+        self.errors = {op: Counter() for op in OPERATIONS}
+        self.error_samples = {}
+        self.pool_timeouts = 0
+
+    def record(self, op, latency_ms, error=None):
+        with self._lock:
+            self.latencies[op].append(latency_ms)
+            if error is not None:
+                kind = type(error).__name__
+                self.errors[op][kind] += 1
+                self.error_samples.setdefault(f"{op}: {kind}", str(error)[:300])
+                if isinstance(error, PoolTimeout):
+                    self.pool_timeouts += 1
+
+    def summary(self, elapsed):
+        operations = {}
+        with self._lock:
+            for op in OPERATIONS:
+                values = sorted(self.latencies[op])
+                if not values:
+                    continue
+                errors = sum(self.errors[op].values())
+                operations[op] = {
+                    'count': len(values),
+                    'errors': errors,
+                    'error_pct': round(errors / len(values) * 100, 2),
+                    'rps': round(len(values) / elapsed, 2),
+                    'p50_ms': round(percentile(values, 0.50), 1),
+                    'p90_ms': round(percentile(values, 0.90), 1),
+                    'p95_ms': round(percentile(values, 0.95), 1),
+                    'p99_ms': round(percentile(values, 0.99), 1),
+                    'max_ms': round(values[-1], 1),
+                    'error_types': dict(self.errors[op]),
+                }
+            everything = sorted(v for values in self.latencies.values() for v in values)
+            total_errors = sum(sum(c.values()) for c in self.errors.values())
+        total = {
+            'count': len(everything),
+            'errors': total_errors,
+            'error_pct': round(total_errors / len(everything) * 100, 2) if everything else 0.0,
+            'rps': round(len(everything) / elapsed, 2),
+            'p50_ms': round(percentile(everything, 0.50), 1) if everything else None,
+            'p95_ms': round(percentile(everything, 0.95), 1) if everything else None,
+            'p99_ms': round(percentile(everything, 0.99), 1) if everything else None,
+        }
+        return operations, total
+
+
+class PoolSampler(threading.Thread):
+    """Samples db.pool_stats() in the background"""
+
+    def __init__(self, interval=POOL_SAMPLE_INTERVAL):
+        super().__init__(name="pool-sampler", daemon=True)
+        from db import MAX_OVERFLOW, POOL_SIZE
+
+        self.interval = interval
+        self.capacity = POOL_SIZE + MAX_OVERFLOW
+        self.pool_size = POOL_SIZE
+        self.samples = []
+        self._stopped = threading.Event()
+        self._start_counters = None
+
+    def run(self):
+        from db import pool_stats
+
+        self._start_counters = pool_stats()
+        while not self._stopped.wait(self.interval):
+            self.samples.append(pool_stats()['checked_out'])
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def summary(self):
+        from db import pool_stats
+
+        end = pool_stats()
+        samples = self.samples or [0]
+        start = self._start_counters or end
+        return {
+            'pool_size': self.pool_size,
+            'capacity': self.capacity,
+            'checked_out_mean': round(sum(samples) / len(samples), 2),
+            'checked_out_p95': percentile(sorted(samples), 0.95),
+            'checked_out_max': max(samples),
+            'above_pool_size_pct': round(sum(s > self.pool_size for s in samples) / len(samples) * 100, 1),
+            'saturated_pct': round(sum(s >= self.capacity for s in samples) / len(samples) * 100, 1),
+            'new_connections': end['connects'] - start['connects'],
+            'checkouts': end['checkouts'] - start['checkouts'],
+            'invalidations': end['invalidations'] - start['invalidations'],
+        }
+
+
+# ========================================================================
+# RUNNER
+# ========================================================================
+
+def run_load(target, users, mix, concurrency=10, rate=None, arrival='poisson', duration=60.0,
+             requests=None, warmup=0.0, seed=None, progress=True):
+    """
+    Drive the target with the operation mix
+
+    Args:
+        rate (float): Requests per second (open loop); None runs closed loop
+        duration (float): Seconds of measured load (after warmup)
+        requests (int): Stop after this many measured requests instead
+
+    Returns:
+        dict: The report (see format_report)
+    """
+    from db import reset_query_stats
+    from query_cache import cache_stats
+
+    ops, weights = zip(*[(op, weight) for op, weight in mix.items() if weight > 0])
+    master = random.Random(seed)
+    recorder = Recorder()
+    sampler = PoolSampler()
+    cache_start = cache_stats()
+    start = time.monotonic()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+    stop = threading.Event()
+    issued = Counter()
+    issued_lock = threading.Lock()
+
+    def claim(scheduled):
+        """
+        Reserve a measured request slot for a request starting at scheduled
+
+        False when the run is over or every slot is taken; the request that
+        completes the last slot stops the run.
+        """
+        if stop.is_set():
+            return False
+        if requests is None or scheduled < measure_from:
+            return True  # unlimited, or a warmup request
+        with issued_lock:
+            if issued['reserved'] >= requests:
+                return False
+            issued['reserved'] += 1
+            return True
+
+    def execute(rng, scheduled):
+        op = rng.choices(ops, weights=weights)[0]
+        user = rng.choice(users)
+        error = None
+        try:
+            getattr(target, op)(user, rng)
+        except Exception as e:
+            error = e
+        finished = time.monotonic()
+        if scheduled >= measure_from:
+            recorder.record(op, (finished - scheduled) * 1000, error)
+            with issued_lock:
+                issued['measured'] += 1
+        if finished >= deadline or (requests is not None and issued['measured'] >= requests):
+            stop.set()
+
+    schedule = queue.Queue()
+
+    def closed_loop_worker(worker_seed):
+        rng = random.Random(worker_seed)
+        while True:
+            scheduled = time.monotonic()
+            if not claim(scheduled):
+                return
+            execute(rng, scheduled)
+
+    def open_loop_worker(worker_seed):
+        rng = random.Random(worker_seed)
+        while True:
+            scheduled = schedule.get()
+            if scheduled is None:
+                return
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            execute(rng, scheduled)
+
+    def dispatcher():
+        rng = random.Random(master.random())
+        next_at = time.monotonic()
+        while claim(next_at):
+            schedule.put(next_at)
+            next_at += rng.expovariate(rate) if arrival == 'poisson' else 1.0 / rate
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                stop.wait(delay)
+        for _ in range(concurrency):
+            schedule.put(None)
+
+    reset_query_stats()
+    sampler.start()
+    workers = [threading.Thread(target=open_loop_worker if rate else closed_loop_worker,
+                                args=(master.random(),), name=f"vu-{i}", daemon=True)
+               for i in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    if rate:
+        threading.Thread(target=dispatcher, name="dispatcher", daemon=True).start()
+
+    last_progress = start
+    while not stop.wait(0.5):
+        now = time.monotonic()
+        if now >= deadline:
+            stop.set()
+        elif progress and now - last_progress >= PROGRESS_INTERVAL:
+            last_progress = now
+            _, total = recorder.summary(max(now - measure_from, 1e-9))
+            backlog = f", {schedule.qsize()} queued" if rate else ""
+            print(f"  ⏱️ {now - start:5.0f}s  {total['count']:,} requests, {total['errors']:,} errors, "
+                  f"p95 {total['p95_ms']} ms{backlog}", file=sys.stderr)
+    if rate:
+        # Anything still queued past the deadline wasn't run; drop it
+        with schedule.mutex:
+            unsent = len(schedule.queue)
+            schedule.queue.clear()
+        for _ in range(concurrency):
+            schedule.put(None)
+    else:
+        unsent = 0
+    for worker in workers:
+        worker.join()
+    elapsed = max(time.monotonic() - measure_from, 1e-9)
+    sampler.stop()
+
+    operations, total = recorder.summary(elapsed)
+    cache_end = cache_stats()
+    cache = {key: cache_end[key] - cache_start[key]
+             for key in ('hits', 'misses', 'invalidations', 'evictions')}
+    lookups = cache['hits'] + cache['misses']
+    cache.update(entries=cache_end['entries'],
+                 hit_rate=round(cache['hits'] / lookups, 4) if lookups else 0.0)
+    return {
+        'target': target.name,
+        'concurrency': concurrency,
+        'rate': rate,
+        'arrival': arrival if rate else 'closed',
+        'elapsed_s': round(elapsed, 2),
+        'unsent': unsent,
+        'operations': operations,
+        'total': total,
+        'pool': dict(sampler.summary(), timeouts=recorder.pool_timeouts),
+        'query_cache': cache,
+        'error_samples': recorder.error_samples,
+    }
+
+
+def format_report(report, top_queries=()):
+    mode = f"{report['rate']}/s {report['arrival']}" if report['rate'] else "closed loop"
+    lines = [
+        f"\n📊 {report['target']} target, {report['concurrency']} virtual users, {mode}, "
+        f"{report['elapsed_s']}s measured",
+        f"{'operation':<12}{'count':>8}{'errors':>8}{'err%':>7}{'req/s':>8}"
+        f"{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)",
+    ]
+    for op, s in report['operations'].items():
+        lines.append(f"{op:<12}{s['count']:>8,}{s['errors']:>8,}{s['error_pct']:>7.1f}{s['rps']:>8.2f}"
+                     f"{s['p50_ms']:>9.1f}{s['p90_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}"
+                     f"{s['max_ms']:>9.1f}")
+    t = report['total']
+    lines.append(f"{'total':<12}{t['count']:>8,}{t['errors']:>8,}{t['error_pct']:>7.1f}{t['rps']:>8.2f}"
+                 + (f"{t['p50_ms']:>9.1f}{'':>9}{t['p95_ms']:>9.1f}{t['p99_ms']:>9.1f}" if t['count'] else ""))
+    if report['unsent']:
+        lines.append(f"⚠️ {report['unsent']:,} scheduled requests never started (the target fell behind the rate)")
+
+    p = report['pool']
+    lines.append(
+        f"\n🔌 DB pool: size {p['pool_size']} + overflow = {p['capacity']}; checked out mean "
+        f"{p['checked_out_mean']}, p95 {p['checked_out_p95']}, max {p['checked_out_max']}; "
+        f"over pool size {p['above_pool_size_pct']}% of the time, saturated {p['saturated_pct']}%; "
+        f"{p['timeouts']} checkout timeouts, {p['new_connections']} new connections, "
+        f"{p['invalidations']} invalidations"
+    )
+    c = report['query_cache']
+    if c['hits'] or c['misses']:
+        lines.append(
+            f"🗃️ Query cache: hit rate {c['hit_rate'] * 100:.1f}% ({c['hits']:,} hits, {c['misses']:,} misses), "
+            f"{c['invalidations']:,} invalidations, {c['evictions']:,} evictions, {c['entries']:,} entries"
+        )
+    for sample, message in report['error_samples'].items():
+        lines.append(f"⚠️ {sample}: {message}")
+    if top_queries:
+        lines.append("\n🐢 Busiest statements")
+        for q in top_queries:
+            lines.append(f"  {q['total_ms']:>10.0f} ms total  {q['count']:>7,}x  p95 {q['p95_ms']:>8.1f} ms  "
+                         f"{' '.join(q['sql'].split())[:90]}")
+    service = report.get('service_stats') or {}
+    if 'service' in service:
+        health = service['service']
+        lines.append(f"\n🧮 Service: planner {health.get('planner')}, plan writer {health.get('plan_writer')}")
+    elif 'plan_writer' in service:
+        lines.append(f"\n🧮 Plan writer: {service['plan_writer']}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the planner and dashboards")
+    parser.add_argument("--target", choices=('direct', 'api'), default='direct')
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="planning_service URL (api target)")
+    parser.add_argument("--concurrency", type=int, default=10, help="Virtual users running at once")
+    parser.add_argument("--rate", type=float, help="Requests per second (default: closed loop)")
+    parser.add_argument("--arrival", choices=('poisson', 'constant'), default='poisson')
+    parser.add_argument("--duration", type=float, default=60.0, help="Measured seconds")
+    parser.add_argument("--requests", type=int, help="Stop after this many measured requests")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds first")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Operation weights, e.g. plan=25,dashboard=50,login=10,assessment=15")
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS, help="Distinct accounts to spread load over")
+    parser.add_argument("--no-cache", action="store_true", help="Dashboard reads bypass query_cache")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    from db import query_stats
+    from plan_writer import flush
+
+    print(f"🧪 Preparing {args.target} target...")
+    target = (ApiTarget(args.url, use_cache=not args.no_cache) if args.target == 'api'
+              else DirectTarget(use_cache=not args.no_cache))
+    target.setup()
+    users = ensure_users(args.users)
+    rng = random.Random(args.seed)
+    for user in users:
+        target.assessment(user, rng)  # every user starts with a household and a security_id
+    print(f"✅ {len(users)} virtual users ready")
+
+    print(f"🚀 Running {dict(args.mix)}...")
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):  # the planner prints every step
+        report = run_load(target, users, args.mix, concurrency=args.concurrency, rate=args.rate,
+                          arrival=args.arrival, duration=args.duration, requests=args.requests,
+                          warmup=args.warmup, seed=args.seed)
+    flush(timeout=30)
+    report['service_stats'] = target.service_stats()
+    top = query_stats(top=5)
+    report['top_queries'] = [{key: q[key] for key in ('sql', 'count', 'total_ms', 'p95_ms')} for q in top]
+    target.close()
+
+    print(format_report(report, top))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"\n💾 Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,22 @@
 import streamlit as st
 import hashlib
 from sqlalchemy import text
-from db import get_connection
+from db import connection
+from food_security import load_predictor
 
 st.set_page_config(page_title="NutriScopePH", layout="wide", page_icon="")
 
+
+# Warm up the shared model registry when the server starts serving
+@st.cache_resource(show_spinner=False)
+def warm_up_models():
+    try:
+        return load_predictor()
+    except FileNotFoundError:
+        return None
+
+warm_up_models()
+
 st.markdown("""
 <div style='text-align:center; padding:4rem'>
     <h1 style='color:#4a90e2'>NutriScopePH</h1>
@@ -22,12 +34,11 @@ with col1:
     if st.button("Login", use_container_width=True):
         if username and password:
             try:
-                conn = get_connection()
-                result = conn.execute(
-                    text("SELECT id, username FROM users WHERE username=:u AND password_hash=:p"),
-                    {"u": username, "p": hashlib.sha256(password.encode()).hexdigest()}
-                ).fetchone()
-                conn.close()
+                with connection() as conn:
+                    result = conn.execute(
+                        text("SELECT id, username FROM users WHERE username=:u AND password_hash=:p"),
+                        {"u": username, "p": hashlib.sha256(password.encode()).hexdigest()}
+                    ).fetchone()
                 
                 if result:
                     st.session_state.logged_in = True
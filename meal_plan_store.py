@@ -0,0 +1,201 @@
+"""
+meal_plan_store.py
+Persistence of generated meal plans (Module 2)
+
+A plan is stored twice in one transaction: the compact plan encoding (see
+plan_codec.py) as JSONB, which decode_plan() turns back into the full dict
+the detail views and exports render, and one meal_plan_items row per
+planned meal (plan_id, day, slot, recipe, cost) so daily totals, recipe
+popularity and cost trends are SQL aggregates instead of Python-side JSON
+parsing. Plans and items are written with INSERT ... SELECT FROM unnest(...),
+whatever the plan or batch size (insert_meal_plans; plan_writer.py batches
+the page's saves).
+
+The encoded body is content-addressed: it lives once in plan_bodies under
+sha256 of its canonical jsonb text, without the household header, and
+meal_plans rows point at it by plan_hash. Saving a plan another household
+already got is an INSERT ... ON CONFLICT DO NOTHING on the body plus the
+small meal_plans row.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import text
+
+from plan_codec import DAYS, NOT_PLANNED, SLOTS, decode_plan, dumps, household_header
+
+
+def plan_items(meal_plan_data):
+    """
+    Flatten a generated plan into item rows
+
+    Slots the planner left empty (NOT_PLANNED, cost 0) are skipped.
+
+    Returns:
+        list[tuple]: (day 1-7, slot, recipe name, cost_per_person)
+    """
+    items = []
+    for day_name, day_plan in (meal_plan_data.get('meal_plan') or {}).items():
+        if day_name not in DAYS:
+            continue
+        for slot in SLOTS:
+            meal = day_plan.get(slot)
+            if meal and meal.get('name') != NOT_PLANNED and float(meal.get('cost', 0)) > 0:
+                items.append((DAYS.index(day_name) + 1, slot, meal['name'], round(float(meal['cost']), 2)))
+    return items
+
+
+def insert_meal_plan(conn, security_id, security_level, region, household_size,
+                     monthly_income, weekly_budget, total_weekly_cost, allergies, meal_plan_data,
+                     user_id=None, week_start=None):
+    """
+    Insert one plan and its items on an open connection (caller owns the transaction)
+
+    Returns:
+        int: The new meal_plans.id
+    """
+    return insert_meal_plans(conn, [dict(
+        security_id=security_id, security_level=security_level, region=region,
+        household_size=household_size, monthly_income=monthly_income, weekly_budget=weekly_budget,
+        total_weekly_cost=total_weekly_cost, allergies=allergies, meal_plan_data=meal_plan_data,
+        user_id=user_id, week_start=week_start,
+    )])[0]
+
+
+def insert_meal_plans(conn, plans):
+    """
+    Insert a batch of plans and their items with three statements, whatever the batch size
+
+    Ids are drawn from the meal_plans sequence up front so items can be
+    matched to their plan without relying on RETURNING order.
+
+    Args:
+        plans (list[dict]): insert_meal_plan keyword arguments, one dict per plan
+
+    Returns:
+        list[int]: The new meal_plans.id of each plan, in order
+    """
+    plan_ids = conn.execute(text("""
+        SELECT nextval(pg_get_serial_sequence('meal_plans', 'id')) FROM generate_series(1, :n)
+    """), {"n": len(plans)}).scalars().all()
+
+    rows = {key: [] for key in ("uid", "sid", "level", "region", "size", "income",
+                                "week_start", "budget", "cost", "allergies", "plan")}
+    items = []
+    today = datetime.now().strftime('%Y-%m-%d')
+    for plan_id, plan in zip(plan_ids, plans):
+        household = household_header(plan['monthly_income'], plan['household_size'], plan['region'],
+                                     plan['security_level'], plan['weekly_budget'])
+        allergies = plan.get('allergies')
+        for key, value in (
+            ("uid", plan.get('user_id')), ("sid", plan['security_id']), ("level", plan['security_level']),
+            ("region", plan['region']), ("size", plan['household_size']),
+            ("income", float(plan['monthly_income'])), ("week_start", plan.get('week_start') or today),
+            ("budget", float(plan['weekly_budget'])), ("cost", float(plan['total_weekly_cost'])),
+            ("allergies", ', '.join(allergies) if allergies else None),
+            ("plan", dumps(plan['meal_plan_data'], household)),
+        ):
+            rows[key].append(value)
+        items += [(plan_id, *item) for item in plan_items(plan['meal_plan_data'])]
+
+    conn.execute(text("""
+        WITH body AS (
+            SELECT p.*, sha256(convert_to(p.b::text, 'UTF8')) AS hash
+            FROM unnest(
+                CAST(:ids AS integer[]), CAST(:uid AS integer[]), CAST(:sid AS integer[]),
+                CAST(:level AS text[]), CAST(:region AS text[]), CAST(:size AS double precision[]),
+                CAST(:income AS numeric[]), CAST(:week_start AS date[]), CAST(:budget AS numeric[]),
+                CAST(:cost AS numeric[]), CAST(:allergies AS text[]), CAST(:plan AS jsonb[])
+            ) AS p(id, uid, sid, level, region, size, income, week_start, budget, cost, allergies, b)
+        ), stored AS (
+            INSERT INTO plan_bodies (hash, body)
+            SELECT DISTINCT ON (hash) hash, b FROM body
+            ON CONFLICT (hash) DO NOTHING
+        )
+        INSERT INTO meal_plans
+        (id, user_id, security_id, security_level, region, household_size, monthly_income,
+         week_start, weekly_budget, total_weekly_cost, allergies, plan_hash, status)
+        -- Owner from the survey when not given, so per-user reads can filter on user_id
+        SELECT id, COALESCE(uid, (SELECT s.user_id FROM security_survey s WHERE s.id = sid)), sid,
+               level, region, size, income, week_start, budget, cost, allergies, hash, 'Generated'
+        FROM body
+    """), {"ids": plan_ids, **rows})
+
+    if items:
+        ids, days, slots, recipes, costs = zip(*items)
+        conn.execute(text("""
+            INSERT INTO meal_plan_items (plan_id, day, slot, recipe_id, recipe, cost_per_person)
+            SELECT i.plan_id, i.day, i.slot,
+                   (SELECT r.id FROM recipes r WHERE r.recipe = i.recipe LIMIT 1),
+                   i.recipe, i.cost
+            FROM unnest(
+                CAST(:ids AS integer[]), CAST(:days AS smallint[]), CAST(:slots AS text[]),
+                CAST(:recipes AS text[]), CAST(:costs AS numeric[])
+            ) AS i(plan_id, day, slot, recipe, cost)
+        """), {"ids": list(ids), "days": list(days), "slots": list(slots),
+               "recipes": list(recipes), "costs": list(costs)})
+    return plan_ids
+
+
+def load_plan(plan_body, plan_row=None):
+    """
+    Full plan dict from a plan_bodies.body value (compact or legacy)
+
+    Args:
+        plan_row: The meal_plans row (monthly_income, household_size, region,
+            security_level, weekly_budget) for bodies stored without a household header
+    """
+    household = None
+    if plan_row is not None:
+        household = household_header(plan_row.monthly_income, plan_row.household_size, plan_row.region,
+                                     plan_row.security_level, plan_row.weekly_budget)
+    return decode_plan(plan_body, household)
+
+
+# ========================================================================
+# AGGREGATES (read side)
+# ========================================================================
+
+def daily_totals(conn, plan_ids):
+    """Per-day cost per person, per family and budget % for the given plans"""
+    return conn.execute(text("""
+        SELECT i.plan_id, i.day,
+               SUM(i.cost_per_person) AS cost_per_person,
+               SUM(i.cost_per_person) * m.household_size AS cost_family,
+               SUM(i.cost_per_person)
+                   / NULLIF(m.weekly_budget / 7 / NULLIF(m.household_size, 0), 0) * 100 AS budget_pct
+        FROM meal_plan_items i
+        JOIN meal_plans m ON m.id = i.plan_id
+        WHERE i.plan_id = ANY(CAST(:ids AS integer[]))
+        GROUP BY i.plan_id, i.day, m.household_size, m.weekly_budget
+        ORDER BY i.plan_id, i.day
+    """), {"ids": list(plan_ids)}).fetchall()
+
+
+def recipe_popularity(conn, user_id, limit=10):
+    """Most planned recipes across a user's plans"""
+    return conn.execute(text("""
+        SELECT i.recipe, COUNT(*) AS times_planned, AVG(i.cost_per_person) AS avg_cost
+        FROM meal_plan_items i
+        JOIN meal_plans m ON m.id = i.plan_id
+        WHERE m.user_id = :uid
+        GROUP BY i.recipe
+        ORDER BY times_planned DESC, i.recipe
+        LIMIT :limit
+    """), {"uid": user_id, "limit": limit}).fetchall()
+
+
+def cost_trend(conn, user_id, limit=12):
+    """Weekly budget vs planned cost over a user's most recent plans"""
+    return conn.execute(text("""
+        SELECT week_start, SUM(weekly_budget) AS weekly_budget, SUM(total_weekly_cost) AS total_cost
+        FROM (
+            SELECT m.week_start, m.weekly_budget, m.total_weekly_cost
+            FROM meal_plans m
+            WHERE m.user_id = :uid
+            ORDER BY m.week_start DESC, m.id DESC
+            LIMIT :limit
+        ) recent
+        GROUP BY week_start
+        ORDER BY week_start
+    """), {"uid": user_id, "limit": limit}).fetchall()
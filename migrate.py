@@ -0,0 +1,132 @@
+"""
+migrate.py
+Versioned schema migrations
+
+Migrations are plain SQL files in migrations/ named NNNN_description.sql and
+applied in version order. Each one runs in its own transaction and is
+recorded in schema_migrations with its checksum; editing an already-applied
+file is reported instead of silently re-run. A transaction-level advisory
+lock keeps two app instances from migrating at the same time.
+
+Usage:
+    python migrate.py              # apply pending migrations
+    python migrate.py status       # show applied / pending
+    python migrate.py --to 1       # apply up to a version
+"""
+
+import argparse
+import hashlib
+import os
+import re
+
+from sqlalchemy import text
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_LOCK_ID = 72_406_001  # arbitrary, shared by every runner
+
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+
+class Migration:
+    __slots__ = ('version', 'name', 'path', 'sql', 'checksum')
+
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path) as f:
+            self.sql = f.read()
+        self.checksum = hashlib.sha256(self.sql.encode()).hexdigest()
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """Migration files in version order"""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def _ensure_table(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version     INTEGER PRIMARY KEY,
+            name        TEXT NOT NULL,
+            checksum    TEXT NOT NULL,
+            applied_at  TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """))
+
+
+def applied(conn):
+    """{version: checksum} of applied migrations"""
+    _ensure_table(conn)
+    return dict(conn.execute(text("SELECT version, checksum FROM schema_migrations")).fetchall())
+
+
+def migrate(engine=None, target=None, directory=MIGRATIONS_DIR):
+    """
+    Apply pending migrations up to target (default: all)
+
+    Args:
+        engine: SQLAlchemy engine to migrate (default: db.engine)
+        target (int): Highest version to apply
+
+    Returns:
+        list[int]: Versions applied by this call
+    """
+    if engine is None:
+        from db import engine
+
+    done = []
+    for migration in discover(directory):
+        if target is not None and migration.version > target:
+            break
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(:lock)"), {"lock": MIGRATION_LOCK_ID})
+            applied_checksums = applied(conn)
+            if migration.version in applied_checksums:
+                if applied_checksums[migration.version] != migration.checksum:
+                    print(f"⚠️ {migration.version:04d}_{migration.name} changed after it was applied")
+                continue
+            # no_parameters: the SQL goes to the driver verbatim (no %-interpolation)
+            conn.exec_driver_sql(migration.sql, execution_options={"no_parameters": True})
+            conn.execute(text(
+                "INSERT INTO schema_migrations (version, name, checksum) VALUES (:v, :n, :c)"
+            ), {"v": migration.version, "n": migration.name, "c": migration.checksum})
+        done.append(migration.version)
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply schema migrations")
+    parser.add_argument("command", nargs="?", default="up", choices=["up", "status"])
+    parser.add_argument("--to", type=int, help="Highest version to apply")
+    args = parser.parse_args()
+
+    from db import engine
+
+    if args.command == "status":
+        with engine.begin() as conn:
+            done = applied(conn)
+        for migration in discover():
+            state = "✅ applied" if migration.version in done else "⏳ pending"
+            if done.get(migration.version, migration.checksum) != migration.checksum:
+                state = "⚠️ changed"
+            print(f"{migration.version:04d}_{migration.name:32s} {state}")
+        return
+
+    versions = migrate(engine, args.to)
+    if versions:
+        print(f"✅ Applied: {', '.join(f'{v:04d}' for v in versions)}")
+    else:
+        print("✅ Schema up to date")
+
+
+if __name__ == "__main__":
+    main()
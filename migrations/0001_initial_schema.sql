@@ -0,0 +1,58 @@
+-- Tables the Streamlit pages and training scripts expect.
+-- IF NOT EXISTS so an existing hand-made database can be brought under migrations.
+
+CREATE TABLE IF NOT EXISTS users (
+    id              SERIAL PRIMARY KEY,
+    username        TEXT NOT NULL,
+    email           TEXT NOT NULL,
+    password_hash   TEXT NOT NULL,
+    created_at      TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS security_survey (
+    id                          SERIAL PRIMARY KEY,
+    user_id                     INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    region                      TEXT NOT NULL,
+    household_size              DOUBLE PRECISION NOT NULL,
+    monthly_income              NUMERIC(12, 2) NOT NULL,
+    income_per_person_monthly   DOUBLE PRECISION,
+    income_per_person_daily     DOUBLE PRECISION,
+    worried_food                TEXT,
+    healthy_food                TEXT,
+    skip_meals                  TEXT,
+    decile                      INTEGER,
+    security_level_num          INTEGER,
+    security_level              TEXT,
+    ml_confidence               DOUBLE PRECISION,
+    ml_predicted_at             TIMESTAMP,
+    created_at                  TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS meal_plans (
+    id                  SERIAL PRIMARY KEY,
+    user_id             INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    security_id         INTEGER REFERENCES security_survey(id) ON DELETE CASCADE,
+    security_level      TEXT,
+    region              TEXT,
+    household_size      DOUBLE PRECISION,
+    monthly_income      NUMERIC(12, 2),
+    week_start          DATE NOT NULL,
+    weekly_budget       NUMERIC(12, 2),
+    total_weekly_cost   NUMERIC(12, 2),
+    allergies           TEXT,
+    plan_data           TEXT,
+    status              TEXT,
+    created_at          TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS recipes (
+    id                  SERIAL PRIMARY KEY,
+    recipe              TEXT NOT NULL,
+    meal_name           TEXT,
+    total_cost          NUMERIC(12, 2),
+    cost_per_person     NUMERIC(12, 2),
+    servings            INTEGER,
+    ingredients_used    TEXT,
+    ingredients         TEXT,
+    data_source         TEXT
+);
@@ -0,0 +1,44 @@
+-- One index per hot access path of the pages.
+
+-- main.py login (username = :u) and register.py duplicate check (username = :u OR email = :e)
+-- Databases from before the register.py check can hold duplicates; stop with a list
+-- of them instead of the bare unique violation, so they can be merged first.
+DO $$
+DECLARE
+    v_usernames TEXT;
+    v_emails TEXT;
+BEGIN
+    SELECT string_agg(format('%L (ids %s)', username, ids), ', ') INTO v_usernames
+    FROM (SELECT username, string_agg(id::text, ',' ORDER BY id) AS ids
+          FROM users WHERE username IS NOT NULL GROUP BY username HAVING COUNT(*) > 1) d;
+    SELECT string_agg(format('%L (ids %s)', email, ids), ', ') INTO v_emails
+    FROM (SELECT email, string_agg(id::text, ',' ORDER BY id) AS ids
+          FROM users WHERE email IS NOT NULL GROUP BY email HAVING COUNT(*) > 1) d;
+    IF v_usernames IS NOT NULL OR v_emails IS NOT NULL THEN
+        RAISE EXCEPTION 'users has duplicate usernames/emails; merge or rename them before migrating'
+            USING DETAIL = concat_ws(E'\n', 'usernames: ' || v_usernames, 'emails: ' || v_emails);
+    END IF;
+END $$;
+CREATE UNIQUE INDEX IF NOT EXISTS users_username_key ON users (username);
+CREATE UNIQUE INDEX IF NOT EXISTS users_email_key ON users (email);
+
+-- dashboard_assessment.py history (user_id = :uid ORDER BY created_at DESC LIMIT 10) and
+-- dashboard.py per-user aggregates / GROUP BY region, security_level.
+-- INCLUDE covers the selected columns so both can be answered index-only.
+CREATE INDEX IF NOT EXISTS security_survey_user_created_idx
+    ON security_survey (user_id, created_at DESC)
+    INCLUDE (security_level, region, income_per_person_monthly, household_size, decile, ml_predicted_at);
+
+-- bulk_scoring.py backlog (ml_predicted_at IS NULL AND id > :after_id ORDER BY id)
+CREATE INDEX IF NOT EXISTS security_survey_unscored_idx
+    ON security_survey (id) WHERE ml_predicted_at IS NULL;
+
+-- dashboard_main.py recent plans (security_id IN (...) ORDER BY week_start DESC)
+CREATE INDEX IF NOT EXISTS meal_plans_security_week_idx
+    ON meal_plans (security_id, week_start DESC);
+
+-- dashboard_main.py quick stats (LEFT JOIN meal_plans m ON s.user_id = m.user_id)
+CREATE INDEX IF NOT EXISTS meal_plans_user_idx ON meal_plans (user_id);
+
+-- models/meal_planner_engine*.py (ORDER BY cost_per_person)
+CREATE INDEX IF NOT EXISTS recipes_cost_per_person_idx ON recipes (cost_per_person);
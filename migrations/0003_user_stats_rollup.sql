@@ -0,0 +1,133 @@
+-- Per-user rollup read by the dashboards' quick stats (one row per user instead of
+-- aggregating security_survey / joining meal_plans on every rerun).
+-- Kept current by triggers; security_survey rows can be re-scored (bulk_scoring.py),
+-- so updates move the row between level counters.
+
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id                 INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    assessments             INTEGER NOT NULL DEFAULT 0,
+    secure_count            INTEGER NOT NULL DEFAULT 0,
+    mildly_count            INTEGER NOT NULL DEFAULT 0,
+    moderately_count        INTEGER NOT NULL DEFAULT 0,
+    severely_count          INTEGER NOT NULL DEFAULT 0,
+    income_pp_sum           DOUBLE PRECISION NOT NULL DEFAULT 0,
+    income_pp_count         INTEGER NOT NULL DEFAULT 0,
+    last_security_id        INTEGER,
+    meal_plans              INTEGER NOT NULL DEFAULT 0,
+    last_plan_id            INTEGER,
+    last_plan_week_start    DATE,
+    updated_at              TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION user_stats_apply_survey(
+    p_user_id INTEGER, p_sign INTEGER, p_id INTEGER, p_level TEXT, p_income DOUBLE PRECISION
+) RETURNS VOID AS $$
+BEGIN
+    IF p_user_id IS NULL THEN
+        RETURN;
+    END IF;
+    INSERT INTO user_stats (user_id) VALUES (p_user_id) ON CONFLICT (user_id) DO NOTHING;
+    UPDATE user_stats SET
+        assessments      = assessments + p_sign,
+        secure_count     = secure_count     + CASE WHEN p_level = 'Secure'              THEN p_sign ELSE 0 END,
+        mildly_count     = mildly_count     + CASE WHEN p_level = 'Mildly Insecure'     THEN p_sign ELSE 0 END,
+        moderately_count = moderately_count + CASE WHEN p_level = 'Moderately Insecure' THEN p_sign ELSE 0 END,
+        severely_count   = severely_count   + CASE WHEN p_level = 'Severely Insecure'   THEN p_sign ELSE 0 END,
+        income_pp_sum    = income_pp_sum    + p_sign * COALESCE(p_income, 0),
+        income_pp_count  = income_pp_count  + CASE WHEN p_income IS NULL THEN 0 ELSE p_sign END,
+        last_security_id = CASE WHEN p_sign > 0 THEN GREATEST(last_security_id, p_id) ELSE last_security_id END,
+        updated_at       = now()
+    WHERE user_id = p_user_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION user_stats_survey_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM user_stats_apply_survey(OLD.user_id, -1, OLD.id, OLD.security_level, OLD.income_per_person_monthly);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM user_stats_apply_survey(NEW.user_id, 1, NEW.id, NEW.security_level, NEW.income_per_person_monthly);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS security_survey_user_stats ON security_survey;
+CREATE TRIGGER security_survey_user_stats
+    AFTER INSERT OR DELETE OR UPDATE OF user_id, security_level, income_per_person_monthly
+    ON security_survey
+    FOR EACH ROW EXECUTE FUNCTION user_stats_survey_trigger();
+
+-- meal_plans rows are saved with security_id only; the owner comes from the survey
+CREATE OR REPLACE FUNCTION user_stats_meal_plan_trigger() RETURNS TRIGGER AS $$
+DECLARE
+    v_user_id INTEGER;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        v_user_id := COALESCE(NEW.user_id, (SELECT user_id FROM security_survey WHERE id = NEW.security_id));
+        IF v_user_id IS NULL THEN
+            RETURN NULL;
+        END IF;
+        INSERT INTO user_stats (user_id) VALUES (v_user_id) ON CONFLICT (user_id) DO NOTHING;
+        UPDATE user_stats SET
+            meal_plans = meal_plans + 1,
+            last_plan_id = CASE WHEN last_plan_week_start IS NULL OR NEW.week_start >= last_plan_week_start
+                                THEN NEW.id ELSE last_plan_id END,
+            last_plan_week_start = GREATEST(last_plan_week_start, NEW.week_start),
+            updated_at = now()
+        WHERE user_id = v_user_id;
+    ELSE
+        v_user_id := COALESCE(OLD.user_id, (SELECT user_id FROM security_survey WHERE id = OLD.security_id));
+        UPDATE user_stats SET meal_plans = meal_plans - 1, updated_at = now()
+        WHERE user_id = v_user_id;
+        -- Re-point at the newest remaining plan if the deleted one was the latest
+        UPDATE user_stats us SET (last_plan_id, last_plan_week_start) = (
+            SELECT m.id, m.week_start FROM meal_plans m
+            JOIN security_survey s ON s.id = m.security_id
+            WHERE s.user_id = us.user_id
+            ORDER BY m.week_start DESC, m.id DESC LIMIT 1
+        )
+        WHERE us.user_id = v_user_id AND us.last_plan_id = OLD.id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS meal_plans_user_stats ON meal_plans;
+CREATE TRIGGER meal_plans_user_stats
+    AFTER INSERT OR DELETE ON meal_plans
+    FOR EACH ROW EXECUTE FUNCTION user_stats_meal_plan_trigger();
+
+-- Backfill from existing history
+INSERT INTO user_stats (user_id, assessments, secure_count, mildly_count, moderately_count,
+                        severely_count, income_pp_sum, income_pp_count, last_security_id)
+SELECT user_id,
+       COUNT(*),
+       COUNT(*) FILTER (WHERE security_level = 'Secure'),
+       COUNT(*) FILTER (WHERE security_level = 'Mildly Insecure'),
+       COUNT(*) FILTER (WHERE security_level = 'Moderately Insecure'),
+       COUNT(*) FILTER (WHERE security_level = 'Severely Insecure'),
+       COALESCE(SUM(income_per_person_monthly), 0),
+       COUNT(income_per_person_monthly),
+       MAX(id)
+FROM security_survey
+WHERE user_id IS NOT NULL
+GROUP BY user_id
+ON CONFLICT (user_id) DO NOTHING;
+
+UPDATE user_stats us SET
+    meal_plans = p.plans,
+    last_plan_id = p.last_id,
+    last_plan_week_start = p.last_week
+FROM (
+    SELECT DISTINCT ON (owner) owner, COUNT(*) OVER (PARTITION BY owner) AS plans,
+           id AS last_id, week_start AS last_week
+    FROM (
+        SELECT m.id, m.week_start, COALESCE(m.user_id, s.user_id) AS owner
+        FROM meal_plans m LEFT JOIN security_survey s ON s.id = m.security_id
+    ) owned
+    WHERE owner IS NOT NULL
+    ORDER BY owner, week_start DESC, id DESC
+) p
+WHERE us.user_id = p.owner;
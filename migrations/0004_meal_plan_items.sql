@@ -0,0 +1,33 @@
+-- plan_data becomes JSONB, and each planned meal is also stored as a row so the
+-- dashboards can aggregate in SQL instead of parsing plan JSON in Python.
+
+ALTER TABLE meal_plans ALTER COLUMN plan_data TYPE JSONB USING plan_data::jsonb;
+
+CREATE TABLE IF NOT EXISTS meal_plan_items (
+    plan_id             INTEGER NOT NULL REFERENCES meal_plans(id) ON DELETE CASCADE,
+    day                 SMALLINT NOT NULL CHECK (day BETWEEN 1 AND 7),   -- 1 = Monday
+    slot                TEXT NOT NULL CHECK (slot IN ('breakfast', 'lunch', 'dinner')),
+    recipe_id           INTEGER REFERENCES recipes(id),
+    recipe              TEXT NOT NULL,
+    cost_per_person     NUMERIC(10, 2) NOT NULL,
+    PRIMARY KEY (plan_id, day, slot)
+);
+
+CREATE INDEX IF NOT EXISTS meal_plan_items_recipe_idx ON meal_plan_items (recipe);
+
+-- Backfill from existing plan_data (slots the planner skipped are not items)
+INSERT INTO meal_plan_items (plan_id, day, slot, recipe_id, recipe, cost_per_person)
+SELECT m.id,
+       array_position(ARRAY['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'], d.key),
+       s.slot,
+       r.id,
+       d.value -> s.slot ->> 'name',
+       (d.value -> s.slot ->> 'cost')::numeric
+FROM meal_plans m
+CROSS JOIN LATERAL jsonb_each(m.plan_data -> 'meal_plan') d
+CROSS JOIN (VALUES ('breakfast'), ('lunch'), ('dinner')) s(slot)
+LEFT JOIN LATERAL (SELECT id FROM recipes WHERE recipe = d.value -> s.slot ->> 'name' LIMIT 1) r ON TRUE
+WHERE d.value ? s.slot
+  AND (d.value -> s.slot ->> 'cost')::numeric > 0
+  AND d.key IN ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+ON CONFLICT DO NOTHING;
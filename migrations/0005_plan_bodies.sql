@@ -0,0 +1,30 @@
+-- Plan bodies are stored once, keyed by a content hash. Households with the same
+-- budget bucket and allergies get identical plans from the optimized planner, so
+-- meal_plans keeps only the household columns plus plan_hash. The hash is computed
+-- in SQL over jsonb's canonical text, so equal bodies hash equally whatever the
+-- key order or whitespace they were sent with.
+
+CREATE TABLE IF NOT EXISTS plan_bodies (
+    hash                BYTEA PRIMARY KEY,                  -- sha256(body::text)
+    body                JSONB NOT NULL,
+    created_at          TIMESTAMP NOT NULL DEFAULT now()
+);
+
+ALTER TABLE meal_plans ADD COLUMN IF NOT EXISTS plan_hash BYTEA;
+
+-- Move existing plan_data into plan_bodies (equal plans collapse to one body)
+INSERT INTO plan_bodies (hash, body)
+SELECT DISTINCT ON (hash) hash, plan_data
+FROM (
+    SELECT sha256(convert_to(plan_data::text, 'UTF8')) AS hash, plan_data
+    FROM meal_plans WHERE plan_data IS NOT NULL
+) p
+ON CONFLICT (hash) DO NOTHING;
+
+UPDATE meal_plans SET plan_hash = sha256(convert_to(plan_data::text, 'UTF8'))
+WHERE plan_data IS NOT NULL;
+
+ALTER TABLE meal_plans
+    ADD CONSTRAINT meal_plans_plan_hash_fkey FOREIGN KEY (plan_hash) REFERENCES plan_bodies(hash);
+
+ALTER TABLE meal_plans DROP COLUMN plan_data;
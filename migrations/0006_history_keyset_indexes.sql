@@ -0,0 +1,21 @@
+-- Keyset pagination of the history views (keyset_pager.py): each seek is
+-- (sort column, id) < (last shown) on an index in the same order, so a page
+-- is an index range scan of page size however deep the user browses.
+
+-- dashboard_assessment.py history: user_id = :uid AND (created_at, id) < (...)
+-- Supersedes security_survey_user_created_idx (same prefix, same INCLUDE).
+CREATE INDEX IF NOT EXISTS security_survey_user_created_id_idx
+    ON security_survey (user_id, created_at DESC, id DESC)
+    INCLUDE (security_level, region, income_per_person_monthly, household_size, decile, ml_predicted_at);
+DROP INDEX IF EXISTS security_survey_user_created_idx;
+
+-- dashboard_main.py plans are paged by owner. Plans saved before user_id was
+-- filled in take it from their survey, as the user_stats trigger already does.
+UPDATE meal_plans m SET user_id = s.user_id
+FROM security_survey s
+WHERE s.id = m.security_id AND m.user_id IS NULL AND s.user_id IS NOT NULL;
+
+-- user_id = :uid AND (week_start, id) < (...); supersedes meal_plans_user_idx
+CREATE INDEX IF NOT EXISTS meal_plans_user_week_idx
+    ON meal_plans (user_id, week_start DESC, id DESC);
+DROP INDEX IF EXISTS meal_plans_user_idx;
@@ -0,0 +1,93 @@
+-- Fixes to the user_stats triggers from 0003 (replaced here rather than edited there,
+-- since 0003 is already applied).
+--
+-- * A removal (sign -1) no longer inserts an empty user_stats row to subtract from;
+--   a user without a row has nothing to take back.
+-- * Deleting a plan takes its owner from meal_plans.user_id first and does nothing
+--   when no owner can be found; when the survey was deleted too (the cascade), the
+--   survey lookup alone would miss.
+-- * last_plan_id is re-pointed among all the owner's plans, including those whose
+--   survey is gone or was never set, the same ownership rule as the INSERT branch.
+
+CREATE OR REPLACE FUNCTION user_stats_apply_survey(
+    p_user_id INTEGER, p_sign INTEGER, p_id INTEGER, p_level TEXT, p_income DOUBLE PRECISION
+) RETURNS VOID AS $$
+BEGIN
+    IF p_user_id IS NULL THEN
+        RETURN;
+    END IF;
+    IF p_sign > 0 THEN
+        INSERT INTO user_stats (user_id) VALUES (p_user_id) ON CONFLICT (user_id) DO NOTHING;
+    END IF;
+    UPDATE user_stats SET
+        assessments      = assessments + p_sign,
+        secure_count     = secure_count     + CASE WHEN p_level = 'Secure'              THEN p_sign ELSE 0 END,
+        mildly_count     = mildly_count     + CASE WHEN p_level = 'Mildly Insecure'     THEN p_sign ELSE 0 END,
+        moderately_count = moderately_count + CASE WHEN p_level = 'Moderately Insecure' THEN p_sign ELSE 0 END,
+        severely_count   = severely_count   + CASE WHEN p_level = 'Severely Insecure'   THEN p_sign ELSE 0 END,
+        income_pp_sum    = income_pp_sum    + p_sign * COALESCE(p_income, 0),
+        income_pp_count  = income_pp_count  + CASE WHEN p_income IS NULL THEN 0 ELSE p_sign END,
+        last_security_id = CASE WHEN p_sign > 0 THEN GREATEST(last_security_id, p_id) ELSE last_security_id END,
+        updated_at       = now()
+    WHERE user_id = p_user_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION user_stats_meal_plan_trigger() RETURNS TRIGGER AS $$
+DECLARE
+    v_user_id INTEGER;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        v_user_id := COALESCE(NEW.user_id, (SELECT user_id FROM security_survey WHERE id = NEW.security_id));
+        IF v_user_id IS NULL THEN
+            RETURN NULL;
+        END IF;
+        INSERT INTO user_stats (user_id) VALUES (v_user_id) ON CONFLICT (user_id) DO NOTHING;
+        UPDATE user_stats SET
+            meal_plans = meal_plans + 1,
+            last_plan_id = CASE WHEN last_plan_week_start IS NULL OR NEW.week_start >= last_plan_week_start
+                                THEN NEW.id ELSE last_plan_id END,
+            last_plan_week_start = GREATEST(last_plan_week_start, NEW.week_start),
+            updated_at = now()
+        WHERE user_id = v_user_id;
+    ELSE
+        v_user_id := OLD.user_id;
+        IF v_user_id IS NULL THEN
+            v_user_id := (SELECT user_id FROM security_survey WHERE id = OLD.security_id);
+        END IF;
+        IF v_user_id IS NULL THEN
+            RETURN NULL;
+        END IF;
+        UPDATE user_stats SET meal_plans = meal_plans - 1, updated_at = now()
+        WHERE user_id = v_user_id;
+        -- Re-point at the newest remaining plan if the deleted one was the latest
+        UPDATE user_stats us SET (last_plan_id, last_plan_week_start) = (
+            SELECT m.id, m.week_start FROM meal_plans m
+            LEFT JOIN security_survey s ON s.id = m.security_id
+            WHERE COALESCE(m.user_id, s.user_id) = us.user_id
+            ORDER BY m.week_start DESC, m.id DESC LIMIT 1
+        )
+        WHERE us.user_id = v_user_id AND us.last_plan_id = OLD.id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recount the plan columns, which the old DELETE branch could leave behind
+UPDATE user_stats us SET
+    meal_plans = COALESCE(p.plans, 0),
+    last_plan_id = p.last_id,
+    last_plan_week_start = p.last_week
+FROM user_stats u
+LEFT JOIN (
+    SELECT DISTINCT ON (owner) owner, COUNT(*) OVER (PARTITION BY owner) AS plans,
+           id AS last_id, week_start AS last_week
+    FROM (
+        SELECT m.id, m.week_start, COALESCE(m.user_id, s.user_id) AS owner
+        FROM meal_plans m LEFT JOIN security_survey s ON s.id = m.security_id
+    ) owned
+    WHERE owner IS NOT NULL
+    ORDER BY owner, week_start DESC, id DESC
+) p ON p.owner = u.user_id
+WHERE us.user_id = u.user_id
+  AND (us.meal_plans, us.last_plan_id) IS DISTINCT FROM (COALESCE(p.plans, 0), p.last_id);
@@ -0,0 +1,48 @@
+-- Inserts into security_survey update user_stats once per statement instead of once per row.
+-- A bulk INSERT ... SELECT (survey_import.py merges 50k rows per statement, often all for
+-- one --user-id) otherwise updated the same user_stats row once for every imported row,
+-- serializing the import behind that row lock and leaving a long chain of dead versions.
+-- The new rows are aggregated per user from the transition table and applied in one upsert.
+-- Updates and deletes stay row-level: they touch one survey row at a time.
+
+CREATE OR REPLACE FUNCTION user_stats_survey_insert_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO user_stats AS us (user_id, assessments, secure_count, mildly_count, moderately_count,
+                                  severely_count, income_pp_sum, income_pp_count, last_security_id)
+    SELECT user_id,
+           COUNT(*),
+           COUNT(*) FILTER (WHERE security_level = 'Secure'),
+           COUNT(*) FILTER (WHERE security_level = 'Mildly Insecure'),
+           COUNT(*) FILTER (WHERE security_level = 'Moderately Insecure'),
+           COUNT(*) FILTER (WHERE security_level = 'Severely Insecure'),
+           COALESCE(SUM(income_per_person_monthly), 0),
+           COUNT(income_per_person_monthly),
+           MAX(id)
+    FROM new_surveys
+    WHERE user_id IS NOT NULL
+    GROUP BY user_id
+    ON CONFLICT (user_id) DO UPDATE SET
+        assessments      = us.assessments      + EXCLUDED.assessments,
+        secure_count     = us.secure_count     + EXCLUDED.secure_count,
+        mildly_count     = us.mildly_count     + EXCLUDED.mildly_count,
+        moderately_count = us.moderately_count + EXCLUDED.moderately_count,
+        severely_count   = us.severely_count   + EXCLUDED.severely_count,
+        income_pp_sum    = us.income_pp_sum    + EXCLUDED.income_pp_sum,
+        income_pp_count  = us.income_pp_count  + EXCLUDED.income_pp_count,
+        last_security_id = GREATEST(us.last_security_id, EXCLUDED.last_security_id),
+        updated_at       = now();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS security_survey_user_stats ON security_survey;
+CREATE TRIGGER security_survey_user_stats
+    AFTER DELETE OR UPDATE OF user_id, security_level, income_per_person_monthly
+    ON security_survey
+    FOR EACH ROW EXECUTE FUNCTION user_stats_survey_trigger();
+
+DROP TRIGGER IF EXISTS security_survey_user_stats_insert ON security_survey;
+CREATE TRIGGER security_survey_user_stats_insert
+    AFTER INSERT ON security_survey
+    REFERENCING NEW TABLE AS new_surveys
+    FOR EACH STATEMENT EXECUTE FUNCTION user_stats_survey_insert_trigger();
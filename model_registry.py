@@ -0,0 +1,390 @@
+"""
+model_registry.py
+Manifest-driven, content-addressed registry for trained model artifacts
+
+Every artifact is stored once under its content hash:
+
+    models/store/<name>/<sha12>.<ext>
+
+and models/manifest.json maps each logical name to its current version plus
+the history of published versions. Training scripts publish() new versions;
+everything else loads artifacts by name.
+
+Loading is cached per server process (Streamlit re-executes page scripts on
+every widget change, but imported modules live for the whole process), so
+an artifact is deserialized at most once per content hash and shared by all
+sessions. joblib artifacts are opened with mmap_mode='r', so large numpy
+arrays are backed by the OS page cache and shared between processes instead
+of copied into each one.
+
+Usage:
+    python model_registry.py list
+    python model_registry.py register <name> <file> [--format joblib|json|npz|parquet]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: registering stays single-writer
+    fcntl = None
+
+MANIFEST_PATH = "models/manifest.json"
+STORE_DIR = "models/store"
+
+FORMAT_EXTENSIONS = {
+    'joblib': 'pkl',
+    'json': 'json',
+    'npz': 'npz',
+    'parquet': 'parquet',
+}
+
+
+def file_sha256(path):
+    """Content hash of an artifact file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_joblib(path):
+    return joblib.load(path, mmap_mode='r')
+
+
+def _load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _load_npz(path):
+    # Read every array up front: the lazy NpzFile keeps the archive open and
+    # isn't safe to share between threads (mmap_mode only applies to .npy members)
+    with np.load(path, mmap_mode='r') as data:
+        return {key: data[key] for key in data.files}
+
+
+def _load_parquet(path):
+    import pandas as pd
+    return pd.read_parquet(path, memory_map=True)
+
+
+def _write_joblib(obj, path):
+    joblib.dump(obj, path)  # uncompressed so it can be memory-mapped
+
+
+def _write_json(obj, path):
+    with open(path, 'w') as f:
+        json.dump(obj, f, indent=2)
+
+
+def _write_npz(obj, path):
+    np.savez_compressed(path, **obj)
+
+
+def _write_parquet(obj, path):
+    obj.to_parquet(path, index=False)
+
+
+DEFAULT_LOADERS = {
+    'joblib': _load_joblib,
+    'json': _load_json,
+    'npz': _load_npz,
+    'parquet': _load_parquet,
+}
+
+DEFAULT_WRITERS = {
+    'joblib': _write_joblib,
+    'json': _write_json,
+    'npz': _write_npz,
+    'parquet': _write_parquet,
+}
+
+
+class _Entry:
+    __slots__ = ('obj', 'checksum', 'stat_key')
+
+    def __init__(self, obj, checksum, stat_key):
+        self.obj = obj
+        self.checksum = checksum
+        self.stat_key = stat_key
+
+
+class ModelRegistry:
+    """Thread-safe artifact registry with a per-process load cache"""
+
+    def __init__(self, manifest_path=MANIFEST_PATH, store_dir=STORE_DIR):
+        self.manifest_path = manifest_path
+        self.store_dir = store_dir
+        self._entries = {}
+        self._checksums = {}
+        self._manifest = {}
+        self._manifest_key = None
+        self._lock = threading.RLock()
+        self.loads = 0
+        self.hits = 0
+
+    @staticmethod
+    def _stat_key(path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    # ====================================================================
+    # MANIFEST
+    # ====================================================================
+
+    def manifest(self):
+        """Current manifest (re-read only when the file changes)"""
+        try:
+            key = self._stat_key(self.manifest_path)
+        except FileNotFoundError:
+            return {}
+        if key != self._manifest_key:
+            self._manifest = _load_json(self.manifest_path)
+            self._manifest_key = key
+        return self._manifest
+
+    @contextlib.contextmanager
+    def _manifest_lock(self):
+        """Exclusive lock on manifest.json.lock, held across read-modify-replace"""
+        directory = os.path.dirname(self.manifest_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with self._lock, open(self.manifest_path + ".lock", 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _write_manifest(self, manifest):
+        directory = os.path.dirname(self.manifest_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".json")
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+            f.write("\n")
+        os.replace(tmp_path, self.manifest_path)
+
+    def resolve(self, name, version=None):
+        """
+        Manifest record for one artifact version
+
+        Args:
+            name (str): Logical artifact name (e.g. 'food_security_rf')
+            version (str): Version id; defaults to the current one
+
+        Returns:
+            dict: {'version', 'file', 'sha256', 'format', 'bytes', 'created_at', ...}
+
+        Raises:
+            FileNotFoundError: If the name or version is not registered
+        """
+        artifact = self.manifest().get(name)
+        if artifact is None:
+            raise FileNotFoundError(f"Artifact '{name}' is not registered in {self.manifest_path}")
+        version = version or artifact['current']
+        record = artifact['versions'].get(version)
+        if record is None:
+            raise FileNotFoundError(f"Artifact '{name}' has no version '{version}'")
+        return dict(record, version=version)
+
+    def current_version(self, name):
+        artifact = self.manifest().get(name)
+        return artifact['current'] if artifact else None
+
+    # ====================================================================
+    # LOADING
+    # ====================================================================
+
+    def checksum(self, path):
+        """sha256 of a file, recomputed only when its mtime/size changes"""
+        stat_key = self._stat_key(path)
+        cached = self._checksums.get(path)
+        if cached and cached[0] == stat_key:
+            return cached[1]
+        checksum = file_sha256(path)
+        self._checksums[path] = (stat_key, checksum)
+        return checksum
+
+    def load(self, path, loader=_load_joblib):
+        """
+        Return the artifact at path, loading it at most once per content hash
+
+        Args:
+            path (str): Artifact file
+            loader (callable): Function that deserializes the file
+
+        Returns:
+            The loaded artifact (shared, do not mutate)
+
+        Raises:
+            FileNotFoundError: If the artifact does not exist
+        """
+        stat_key = self._stat_key(path)
+        entry = self._entries.get(path)
+        if entry is not None and entry.stat_key == stat_key:
+            self.hits += 1
+            return entry.obj
+
+        with self._lock:
+            entry = self._entries.get(path)
+            checksum = self.checksum(path)
+            if entry is not None and entry.checksum == checksum:
+                # Touched but not changed: keep the loaded object
+                entry.stat_key = stat_key
+                self.hits += 1
+                return entry.obj
+
+            obj = loader(path)
+            self._entries[path] = _Entry(obj, checksum, stat_key)
+            self.loads += 1
+            return obj
+
+    def load_artifact(self, name, version=None, loader=None):
+        """
+        Load a registered artifact by name
+
+        Args:
+            name (str): Logical artifact name
+            version (str): Specific version (default: current)
+            loader (callable): Override the format's default loader
+
+        Returns:
+            The loaded artifact (shared, do not mutate)
+        """
+        record = self.resolve(name, version)
+        return self.load(record['file'], loader or DEFAULT_LOADERS[record['format']])
+
+    # ====================================================================
+    # PUBLISHING
+    # ====================================================================
+
+    def register_file(self, name, source_path, fmt='joblib', metadata=None, move=False, set_current=True):
+        """
+        Add an existing file to the store under its content hash
+
+        Returns:
+            str: The version id (first 12 hex chars of the sha256)
+        """
+        sha256 = file_sha256(source_path)
+        version = sha256[:12]
+        target_dir = os.path.join(self.store_dir, name)
+        target = os.path.join(target_dir, f"{version}.{FORMAT_EXTENSIONS[fmt]}")
+        os.makedirs(target_dir, exist_ok=True)
+
+        if os.path.exists(target):
+            if move:
+                os.remove(source_path)
+        elif move:
+            shutil.move(source_path, target)
+        else:
+            shutil.copyfile(source_path, target)
+
+        # Another process may have registered since our last read: re-read under the lock
+        with self._manifest_lock():
+            try:
+                manifest = _load_json(self.manifest_path)
+            except FileNotFoundError:
+                manifest = {}
+            artifact = manifest.setdefault(name, {'current': version, 'versions': {}})
+            record = artifact['versions'].setdefault(version, {
+                'file': target.replace(os.sep, '/'),
+                'sha256': sha256,
+                'format': fmt,
+                'bytes': os.path.getsize(target),
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+            })
+            record.update(metadata or {})
+            if set_current:
+                artifact['current'] = version
+            self._write_manifest(manifest)
+        return version
+
+    def publish(self, name, obj, fmt='joblib', writer=None, metadata=None, set_current=True):
+        """
+        Serialize obj and register it as a new version of name
+
+        Args:
+            name (str): Logical artifact name
+            obj: Object to store
+            fmt (str): 'joblib', 'json', 'npz' or 'parquet'
+            writer (callable): writer(obj, path); required for formats without a default
+            metadata (dict): Extra fields recorded in the manifest (metrics, params...)
+            set_current (bool): Point the name at the new version
+
+        Returns:
+            str: The version id
+        """
+        writer = writer or DEFAULT_WRITERS[fmt]
+        os.makedirs(self.store_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, suffix=f".tmp.{FORMAT_EXTENSIONS[fmt]}")
+        os.close(fd)
+        try:
+            writer(obj, tmp_path)
+            return self.register_file(name, tmp_path, fmt, metadata, move=True, set_current=set_current)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def stats(self):
+        return {
+            'artifacts': {path: entry.checksum[:12] for path, entry in self._entries.items()},
+            'loads': self.loads,
+            'hits': self.hits,
+        }
+
+
+_registry = ModelRegistry()
+
+
+def get_registry():
+    """The process-wide registry"""
+    return _registry
+
+
+def load_artifact(name, version=None, loader=None):
+    return _registry.load_artifact(name, version, loader)
+
+
+def publish(name, obj, fmt='joblib', writer=None, metadata=None, set_current=True):
+    return _registry.publish(name, obj, fmt, writer, metadata, set_current)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model artifact registry")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="Show registered artifacts")
+    register = sub.add_parser("register", help="Add a file to the store")
+    register.add_argument("name")
+    register.add_argument("file")
+    register.add_argument("--format", default="joblib", choices=sorted(FORMAT_EXTENSIONS))
+    register.add_argument("--move", action="store_true", help="Move instead of copy")
+    args = parser.parse_args()
+
+    if args.command == "register":
+        version = _registry.register_file(args.name, args.file, args.format, move=args.move)
+        print(f"✅ {args.name} -> {version}")
+        return
+
+    for name, artifact in sorted(_registry.manifest().items()):
+        record = artifact['versions'][artifact['current']]
+        print(f"{name:24s} {artifact['current']}  {record['bytes'] / 1024:8.1f} KB  "
+              f"{record['file']}  ({len(artifact['versions'])} version(s))")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+model_search.py
+Hyperparameter search that weighs accuracy against model size and latency
+
+module1_train.py hard-codes a 200-tree forest and train_module2.py a
+100-tree depth-15 forest. This search cross-validates a grid of forest
+sizes and depths in parallel and reports, for each candidate, the CV score
+next to the pickled artifact size and single-row / batch predict latency.
+The Pareto front (no other candidate is at least as good on all three and
+better on one) is highlighted. With --promote, the smallest candidate
+whose score is within --tolerance of the best one is trained and published
+through train_pipeline.
+
+Usage:
+    python model_search.py food_security
+    python model_search.py recipe_cost --promote --tolerance 0.02
+"""
+
+import argparse
+import itertools
+import pickle
+
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.model_selection import KFold, StratifiedKFold, cross_val_score
+
+import module1_train
+import train_module2
+from train_pipeline import JOBS, measure_latency, run_job
+
+
+def _food_security_data():
+    fies_ml, _ = module1_train.load_data()
+    return fies_ml[module1_train.FEATURES], fies_ml[module1_train.TARGET]
+
+
+def _recipe_cost_data():
+    _, X, y, _ = train_module2.load_data()
+    return X, y
+
+
+SEARCH_SPACES = {
+    'food_security': {
+        'estimator': RandomForestClassifier(random_state=42),
+        'data': _food_security_data,
+        'scoring': 'accuracy',
+        'splitter': StratifiedKFold,
+        'grid': {
+            'n_estimators': [10, 25, 50, 100, 200],
+            'max_depth': [3, 4, 6, 8, None],
+        },
+    },
+    'recipe_cost': {
+        'estimator': RandomForestRegressor(min_samples_split=5, min_samples_leaf=2, random_state=42),
+        'data': _recipe_cost_data,
+        'scoring': 'r2',
+        'splitter': KFold,
+        'grid': {
+            'n_estimators': [10, 25, 50, 100],
+            'max_depth': [4, 8, 15, None],
+        },
+    },
+}
+
+
+def evaluate_candidate(estimator, params, X, y, scoring, cv):
+    """
+    Cross-validate one configuration and measure its footprint
+
+    Returns:
+        dict: params, CV score mean/std, artifact bytes and predict latency
+    """
+    model = clone(estimator).set_params(n_jobs=1, **params)
+    scores = cross_val_score(model, X, y, scoring=scoring, cv=cv, n_jobs=1)
+    model.fit(X, y)
+    return dict(
+        params,
+        score=round(float(scores.mean()), 4),
+        score_std=round(float(scores.std()), 4),
+        artifact_bytes=len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+        **measure_latency(model, X, single_runs=20),
+    )
+
+
+def pareto_front(results):
+    """Mark candidates not dominated on (score up, bytes down, single-row latency down)"""
+    keys = [('score', 1), ('artifact_bytes', -1), ('predict_ms_single', -1)]
+
+    def dominates(a, b):
+        at_least = all(sign * a[k] >= sign * b[k] for k, sign in keys)
+        better = any(sign * a[k] > sign * b[k] for k, sign in keys)
+        return at_least and better
+
+    return [not any(dominates(other, row) for other in results) for row in results]
+
+
+def search(job_name, cv=5, n_jobs=-1):
+    """
+    Evaluate every grid configuration of a job in parallel
+
+    Returns:
+        pd.DataFrame: One row per configuration, sorted by score
+    """
+    space = SEARCH_SPACES[job_name]
+    X, y = space['data']()
+    # Training CSVs are grouped by region/category, so folds must be shuffled
+    splitter = space['splitter'](n_splits=cv, shuffle=True, random_state=42)
+    names = list(space['grid'])
+    candidates = [dict(zip(names, values)) for values in itertools.product(*space['grid'].values())]
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(evaluate_candidate)(space['estimator'], params, X, y, space['scoring'], splitter)
+        for params in candidates
+    )
+    table = pd.DataFrame(results)
+    table['max_depth'] = pd.Series([None if pd.isna(d) else int(d) for d in table['max_depth']], dtype=object)
+    table['pareto'] = pareto_front(results)
+    return table.sort_values(['score', 'artifact_bytes'], ascending=[False, True]).reset_index(drop=True)
+
+
+def pick_smallest_within(table, tolerance):
+    """Smallest artifact whose score is within tolerance of the best score"""
+    eligible = table[table['score'] >= table['score'].max() - tolerance]
+    return eligible.sort_values(['artifact_bytes', 'predict_ms_single']).iloc[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forest size/depth search (accuracy vs bytes vs latency)")
+    parser.add_argument("job", choices=sorted(SEARCH_SPACES))
+    parser.add_argument("--cv", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Parallel candidate evaluations")
+    parser.add_argument("--promote", action="store_true",
+                        help="Train + publish the smallest model within --tolerance of the best score; "
+                             "train_pipeline.py keeps its params until --default-params")
+    parser.add_argument("--tolerance", type=float, default=0.01)
+    args = parser.parse_args()
+
+    print(f"🔎 Searching {args.job} ({args.cv}-fold CV)...")
+    table = search(args.job, cv=args.cv, n_jobs=args.n_jobs)
+
+    with pd.option_context('display.max_rows', None, 'display.width', 140):
+        print(table.to_string(index=False))
+
+    print("\n⭐ Pareto front (score / bytes / single-row latency):")
+    front = table[table['pareto']].sort_values('artifact_bytes')
+    for _, row in front.iterrows():
+        print(f"  n_estimators={row['n_estimators']:<4} max_depth={str(row['max_depth']):<5} "
+              f"score={row['score']:.4f}  {row['artifact_bytes'] / 1024:8.1f} KB  "
+              f"{row['predict_ms_single']:.2f} ms/row single, {row['predict_us_per_row_batch']:.1f} µs/row batch")
+
+    choice = pick_smallest_within(table, args.tolerance)
+    best = table.iloc[0]
+    print(f"\n✅ Smallest within {args.tolerance} of best ({best['score']:.4f}): "
+          f"n_estimators={choice['n_estimators']}, max_depth={choice['max_depth']} "
+          f"(score {choice['score']:.4f}, {choice['artifact_bytes'] / 1024:.1f} KB)")
+
+    if args.promote:
+        max_depth = choice['max_depth']
+        params = dict(JOBS[args.job]['params'],
+                      n_estimators=int(choice['n_estimators']),
+                      max_depth=None if max_depth is None else int(max_depth))
+        search_info = {'cv_score': float(choice['score']), 'best_cv_score': float(best['score']),
+                       'tolerance': args.tolerance, 'candidates': len(table)}
+        result = run_job(args.job, params=params, metadata={'search': search_info})
+        print(f"🚀 Promoted ({result['status']}): {result['versions']}")
+
+
+if __name__ == "__main__":
+    main()
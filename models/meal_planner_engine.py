@@ -6,7 +6,8 @@ Core engine for generating personalized meal plans with proper meal categorizati
 
 import pandas as pd
 import random
-from db import get_connection
+from sqlalchemy import text
+from db import connection
 
 
 class MealPlannerEngine:
@@ -37,15 +38,14 @@ class MealPlannerEngine:
     def load_recipes(self):
         """Load all recipes from PostgreSQL database with meal categorization"""
         try:
-            conn = get_connection()
-            query = """
+            query = text("""
                 SELECT id, recipe, meal_name, total_cost, cost_per_person, 
                        servings, ingredients_used, ingredients, data_source
                 FROM recipes
                 ORDER BY cost_per_person ASC
-            """
-            self.recipes_df = pd.read_sql_query(query, conn)
-            conn.close()
+            """)
+            with connection() as conn:
+                self.recipes_df = pd.read_sql_query(query, conn)
             
             # Add meal_category based on meal_name (for better filtering)
             self.recipes_df['meal_category'] = self.recipes_df['meal_name'].str.lower().apply(self._categorize_meal)
@@ -1,84 +1,119 @@
-import pandas as pd
+import time
+
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import classification_report, accuracy_score
-import joblib
-import os
-
-# Create models folder
-os.makedirs("models", exist_ok=True)
-
-print("="*60)
-print("MODULE 1: FIES RandomForest Training (With Region)")
-print("="*60)
-
-# 1. Load ML features
-print("\n📥 Loading data/fies_ml_features.csv...")
-try:
-    fies_ml = pd.read_csv("data/fies_ml_features.csv")
-    print(f"✅ Loaded {len(fies_ml)} rows")
-    print(f"Columns: {list(fies_ml.columns)}")
-except FileNotFoundError:
-    print("❌ File not found!")
-    exit()
-
-# 2. Encode region (convert text to numbers)
-print("\n🔤 Encoding regions...")
-le = LabelEncoder()
-fies_ml['region_encoded'] = le.fit_transform(fies_ml['region'])
-print(f"✅ Regions: {list(le.classes_)}")
-
-# 3. Define features (X) and target (y)
-print("\n📊 Preparing features...")
-X = fies_ml[['income_per_person_monthly', 'household_size', 'region_encoded']]
-y = fies_ml['security_level_num']  # 0=Secure, 1=Mildly, 2=Moderately, 3=Severely
-print(f"✅ Features: {list(X.columns)}")
-print(f"✅ Target: security_level_num (0-3)")
-print(f"   Class distribution:\n{y.value_counts().sort_index()}")
-
-# 4. Train-test split
-print("\n🔀 Splitting data (80-20)...")
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
-print(f"✅ Train: {len(X_train)}, Test: {len(X_test)}")
-
-# 5. Train RandomForest
-print("\n🤖 Training RandomForest...")
-model = RandomForestClassifier(
-    n_estimators=200,
-    max_depth=6,
-    random_state=42,
-    n_jobs=-1
-)
-model.fit(X_train, y_train)
-print("✅ Model trained!")
-
-# 6. Evaluate
-print("\n📈 Evaluating...")
-y_pred = model.predict(X_test)
-acc = accuracy_score(y_test, y_pred)
-print(f"Accuracy: {acc:.4f} ({acc*100:.1f}%)")
-print("\nClassification Report:")
-print(classification_report(y_test, y_pred, 
-    target_names=["🟢 Secure", "🟡 Mildly", "🟠 Moderately", "🔴 Severely"]))
-
-# 7. Save model
-print("\n💾 Saving model...")
-joblib.dump(model, "models/food_security_rf.pkl")
-print("✅ Model saved: models/food_security_rf.pkl")
-
-# 8. Save label encoder (for region encoding in Streamlit)
-print("\n💾 Saving region encoder...")
-joblib.dump(le, "models/region_encoder.pkl")
-print("✅ Encoder saved: models/region_encoder.pkl")
-
-# 9. Feature importance
-print("\n📊 Feature Importance:")
-for feat, imp in zip(X.columns, model.feature_importances_):
-    print(f"  {feat}: {imp:.4f}")
-
-print("\n" + "="*60)
-print("✅ Module 1 Training Complete!")
-print("="*60)
+from data_assets import load_csv
+from model_registry import publish
+from food_security import publish_grid, MODEL_ARTIFACT, REGION_ENCODER_ARTIFACT, GRID_ARTIFACT
+
+DATA_PATH = "data/fies_ml_features.csv"
+
+FEATURES = ['income_per_person_monthly', 'household_size', 'region_encoded']
+TARGET = 'security_level_num'  # 0=Secure, 1=Mildly, 2=Moderately, 3=Severely
+
+PARAMS = {
+    'n_estimators': 200,
+    'max_depth': 6,
+    'random_state': 42,
+    'n_jobs': -1,
+}
+
+
+def load_data(path=DATA_PATH):
+    """Load ML features and encode region (convert text to numbers)"""
+    fies_ml = load_csv(path)
+    le = LabelEncoder()
+    fies_ml['region_encoded'] = le.fit_transform(fies_ml['region'])
+    return fies_ml, le
+
+
+def split(fies_ml):
+    """80-20 stratified train-test split"""
+    return train_test_split(
+        fies_ml[FEATURES], fies_ml[TARGET], test_size=0.2, random_state=42, stratify=fies_ml[TARGET]
+    )
+
+
+def train(fies_ml, params=PARAMS):
+    """
+    Train and evaluate the food security RandomForest
+
+    Returns:
+        tuple: (model, metrics dict, (X_test, y_test))
+    """
+    X_train, X_test, y_train, y_test = split(fies_ml)
+    model = RandomForestClassifier(**params)
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    train_seconds = time.perf_counter() - start
+
+    acc = accuracy_score(y_test, model.predict(X_test))
+    metrics = {'accuracy': round(float(acc), 4), 'train_seconds': round(train_seconds, 3)}
+    return model, metrics, (X_test, y_test)
+
+
+def publish_artifacts(model, le, metadata=None):
+    """Publish model, region encoder and compiled grid to the registry"""
+    versions = {
+        MODEL_ARTIFACT: publish(MODEL_ARTIFACT, model, metadata=metadata),
+        REGION_ENCODER_ARTIFACT: publish(REGION_ENCODER_ARTIFACT, le),
+    }
+    versions[GRID_ARTIFACT] = publish_grid(model, len(le.classes_))[1]
+    return versions
+
+
+def main():
+    print("="*60)
+    print("MODULE 1: FIES RandomForest Training (With Region)")
+    print("="*60)
+
+    # 1-2. Load ML features + encode region
+    print(f"\n📥 Loading {DATA_PATH}...")
+    try:
+        fies_ml, le = load_data()
+        print(f"✅ Loaded {len(fies_ml)} rows")
+        print(f"Columns: {list(fies_ml.columns)}")
+    except FileNotFoundError:
+        print("❌ File not found!")
+        exit()
+    print(f"✅ Regions: {list(le.classes_)}")
+
+    # 3. Define features (X) and target (y)
+    print("\n📊 Preparing features...")
+    print(f"✅ Features: {FEATURES}")
+    print(f"✅ Target: {TARGET} (0-3)")
+    print(f"   Class distribution:\n{fies_ml[TARGET].value_counts().sort_index()}")
+
+    # 4-5. Split (80-20) and train RandomForest
+    print("\n🤖 Training RandomForest...")
+    model, metrics, (X_test, y_test) = train(fies_ml)
+    print(f"✅ Model trained in {metrics['train_seconds']:.2f}s!")
+
+    # 6. Evaluate
+    print("\n📈 Evaluating...")
+    acc = metrics['accuracy']
+    print(f"Accuracy: {acc:.4f} ({acc*100:.1f}%)")
+    print("\nClassification Report:")
+    print(classification_report(y_test, model.predict(X_test),
+        target_names=["🟢 Secure", "🟡 Mildly", "🟠 Moderately", "🔴 Severely"]))
+
+    # 7-8. Publish model, region encoder (for region encoding in Streamlit) and compiled grid
+    print("\n💾 Publishing artifacts...")
+    for name, version in publish_artifacts(model, le, metadata=metrics).items():
+        print(f"✅ Published: {name} {version}")
+
+    # 9. Feature importance
+    print("\n📊 Feature Importance:")
+    for feat, imp in zip(FEATURES, model.feature_importances_):
+        print(f"  {feat}: {imp:.4f}")
+
+    print("\n" + "="*60)
+    print("✅ Module 1 Training Complete!")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
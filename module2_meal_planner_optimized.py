@@ -17,15 +17,19 @@ FEATURE: Smart combination-based selection optimized for 85-90% budget utilizati
 Works with ANY budget - picks combinations CLOSEST to optimal spending!
 """
 
-import pandas as pd
 import numpy as np
-import pickle
 import json
 import os
 from sklearn.preprocessing import LabelEncoder, StandardScaler
+from data_assets import load_csv
+from model_registry import load_artifact
 import warnings
 warnings.filterwarnings('ignore')
 
+# Allergies and restrictions offered by the meal planner page
+ALLERGENS = ["Peanuts", "Tree nuts", "Dairy", "Eggs", "Fish",
+             "Shellfish", "Soy", "Wheat", "Sesame", "Gluten"]
+
 class AIWeeklyMealPlannerWithML:
     """
     Generates personalized weekly meal plans using:
@@ -46,9 +50,9 @@ class AIWeeklyMealPlannerWithML:
         # Load trained model artifacts
         print("📦 Loading trained ML model...")
         try:
-            self.model = pickle.load(open('models/recipecostmodel.pkl', 'rb'))
-            self.scaler = pickle.load(open('models/featurescaler.pkl', 'rb'))
-            self.encoders = pickle.load(open('models/encodersmapping.pkl', 'rb'))
+            self.model = load_artifact('planner_cost_model')
+            self.scaler = load_artifact('planner_feature_scaler')
+            self.encoders = load_artifact('planner_encoders')
             print("✅ Model loaded successfully!")
         except Exception as e:
             print(f"⚠️ Model files not found: {e}")
@@ -56,7 +60,7 @@ class AIWeeklyMealPlannerWithML:
         
         # Load recipe database
         print("📥 Loading recipe database...")
-        self.recipes_db = pd.read_csv('REAL_RECIPE_COSTS_REALISTIC_2026.csv')
+        self.recipes_db = load_csv('REAL_RECIPE_COSTS_REALISTIC_2026.csv')
         print(f"✅ Loaded {len(self.recipes_db)} AUTHENTIC RECIPES")
         print(f"   Price range: ₱{self.recipes_db['cost_per_person'].min():.2f} - ₱{self.recipes_db['cost_per_person'].max():.2f}")
     
@@ -398,9 +402,119 @@ class AIWeeklyMealPlannerWithML:
         print(f"\n{'='*70}")
         print(f"✅ MEAL PLAN READY!")
         print(f"{'='*70}")
-        
+
         return result
 
+    def swap_meal(self, plan, day, slot, allergies=[]):
+        """
+        Replace one meal of a generated plan, keeping the day within budget
+
+        Picks a recipe not used elsewhere in the week that fits the daily
+        budget left by the day's other meals, closest in cost to the meal it
+        replaces (or to the 87.5% target for an unplanned slot).
+
+        Returns:
+            dict: A new plan with the day, budget and summary recomputed
+
+        Raises:
+            ValueError: If nothing fits
+        """
+        if day not in plan['meal_plan']:
+            raise ValueError(f"{day} has no meals planned")
+
+        daily_budget = plan['budget']['daily_per_person']
+        family_size = plan['user_profile']['family_size']
+        day_plan = plan['meal_plan'][day]
+        current = day_plan[slot]
+        others = sum(day_plan[s]['cost'] for s in ('breakfast', 'lunch', 'dinner') if s != slot)
+        room = daily_budget - others
+        target = current['cost'] if current['cost'] > 0 else daily_budget * 0.875 - others
+
+        recipes = self.get_recipes(allergies)
+        if recipes is None or len(recipes) == 0:
+            raise ValueError("No recipes available")
+        used = {name for d in plan['meal_plan'].values() for name in d['recipes_used']}
+        candidates = recipes[~recipes['recipe'].isin(used) & (recipes['cost_per_person'] <= room)]
+        if len(candidates) == 0:
+            # Week exhausted: allow repeats from other days, never within the day
+            candidates = recipes[~recipes['recipe'].isin(day_plan['recipes_used'])
+                                 & (recipes['cost_per_person'] <= room)]
+        if len(candidates) == 0:
+            raise ValueError(f"No recipe fits the ₱{room:.2f} left for {day} {slot}")
+
+        choice = candidates.loc[(candidates['cost_per_person'] - target).abs().idxmin()]
+
+        new_day = {s: dict(day_plan[s]) for s in ('breakfast', 'lunch', 'dinner')}
+        new_day[slot] = {'name': choice['recipe'], 'cost': choice['cost_per_person']}
+        planned = [new_day[s] for s in ('breakfast', 'lunch', 'dinner') if new_day[s]['cost'] > 0]
+        day_total = sum(meal['cost'] for meal in planned)
+        new_day.update({
+            'day_total_per_person': day_total,
+            'day_total_family': day_total * family_size,
+            'recipes_used': [meal['name'] for meal in planned],
+            'meal_count': len(planned),
+            'budget_utilization_percent': (day_total / daily_budget) * 100
+        })
+
+        meal_plan = dict(plan['meal_plan'])
+        meal_plan[day] = new_day
+        total_weekly_cost = sum(d['day_total_family'] for d in meal_plan.values())
+        meal_count_distribution = {'3_meals': 0, '2_meals': 0, '1_meal': 0}
+        for d in meal_plan.values():
+            meal_count_distribution[{3: '3_meals', 2: '2_meals'}.get(d['meal_count'], '1_meal')] += 1
+        weekly_budget = plan['budget']['weekly']
+
+        return {
+            **plan,
+            'budget': {
+                **plan['budget'],
+                'actual_spent': total_weekly_cost,
+                'utilization_percent': (total_weekly_cost / weekly_budget) * 100 if weekly_budget > 0 else 0
+            },
+            'meal_plan': meal_plan,
+            'summary': {
+                **plan['summary'],
+                'total_meals': sum(d['meal_count'] for d in meal_plan.values()),
+                'total_cost': total_weekly_cost,
+                'avg_cost_per_day': total_weekly_cost / 7 if len(meal_plan) > 0 else 0,
+                'meal_distribution': meal_count_distribution
+            }
+        }
+
+    def check_feasibility(self, weekly_budget, family_size, allergies=[]):
+        """
+        How many meals a day a budget can cover, without generating a plan
+
+        Uses the cheapest allergy-safe recipes, i.e. the best case for
+        select_meals_for_day.
+
+        Returns:
+            dict: meals_per_day (0-3), daily budget, recipes available and the
+                  weekly budget needed for 1, 2 and 3 meals a day
+        """
+        daily_budget = self.calculate_daily_budget(weekly_budget, family_size)
+        recipes = self.get_recipes(allergies)
+        costs = sorted(recipes['cost_per_person']) if recipes is not None else []
+
+        min_weekly_budget = {}
+        meals_per_day = 0
+        for meals in (1, 2, 3):
+            if len(costs) < meals:
+                break
+            cheapest_day = sum(costs[:meals])
+            min_weekly_budget[meals] = cheapest_day * 7 * family_size
+            if cheapest_day <= daily_budget:
+                meals_per_day = meals
+
+        return {
+            'feasible': meals_per_day > 0,
+            'meals_per_day': meals_per_day,
+            'daily_per_person': daily_budget,
+            'recipes_available': len(costs),
+            'cheapest_meal': costs[0] if costs else None,
+            'min_weekly_budget': min_weekly_budget
+        }
+
 
 # EXAMPLE USAGE
 if __name__ == "__main__":
@@ -1,8 +1,9 @@
 import streamlit as st
 from sqlalchemy import text
-from db import get_connection
+from regional_context import regional_view
+from db import connection
+from query_cache import cached, USER_STATS, USER_REGIONS
 import pandas as pd
-import altair as alt
 
 
 if "logged_in" not in st.session_state:
@@ -55,23 +56,25 @@ with tab1:
     st.markdown("<h3>Your Personal Statistics</h3>", unsafe_allow_html=True)
     
     try:
-        conn = get_connection()
-        stats = conn.execute(text("""
-            SELECT 
-                COUNT(*) as total_assessments,
-                COUNT(CASE WHEN security_level = 'Secure' THEN 1 END)::float / NULLIF(COUNT(*), 0) * 100 as secure_pct,
-                AVG(income_per_person_monthly) as avg_income
-            FROM security_survey WHERE user_id = :uid
-        """), {"uid": st.session_state.user['id']}).fetchone()
-        conn.close()
+        def load_user_stats():
+            # One row from the trigger-maintained rollup (migrations/0003_user_stats_rollup.sql)
+            with connection() as conn:
+                return conn.execute(text("""
+                    SELECT 
+                        assessments as total_assessments,
+                        secure_count::float / NULLIF(assessments, 0) * 100 as secure_pct,
+                        income_pp_sum / NULLIF(income_pp_count, 0) as avg_income
+                    FROM user_stats WHERE user_id = :uid
+                """), {"uid": st.session_state.user['id']}).fetchone()
+        stats = cached(st.session_state.user['id'], USER_STATS, load_user_stats)
         
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Assessments", stats.total_assessments or 0)
+            st.metric("Assessments", stats.total_assessments if stats else 0)
         with col2:
-            st.metric("Secure %", f"{stats.secure_pct:.0f}%" if stats.total_assessments else "0%")
+            st.metric("Secure %", f"{stats.secure_pct:.0f}%" if stats and stats.total_assessments else "0%")
         with col3:
-            st.metric("Avg Income/Person", f"₱{stats.avg_income:,.0f}" if stats.avg_income else "N/A")
+            st.metric("Avg Income/Person", f"₱{stats.avg_income:,.0f}" if stats and stats.avg_income else "N/A")
     except:
         st.info("Complete assessments to see personalized stats")
 
@@ -79,19 +82,20 @@ with tab1:
     # Your regional results
     st.markdown("<h4>Your Assessment Results by Region</h4>", unsafe_allow_html=True)
     try:
-        conn = get_connection()
-        user_regions = conn.execute(text("""
-            SELECT 
-                region, 
-                COUNT(*) as count,
-                ROUND(AVG(income_per_person_monthly)::numeric, 2) as avg_income,
-                security_level
-            FROM security_survey 
-            WHERE user_id = :uid
-            GROUP BY region, security_level
-            ORDER BY count DESC
-        """), {"uid": st.session_state.user['id']}).fetchall()
-        conn.close()
+        def load_user_regions():
+            with connection() as conn:
+                return conn.execute(text("""
+                    SELECT 
+                        region, 
+                        COUNT(*) as count,
+                        ROUND(AVG(income_per_person_monthly)::numeric, 2) as avg_income,
+                        security_level
+                    FROM security_survey 
+                    WHERE user_id = :uid
+                    GROUP BY region, security_level
+                    ORDER BY count DESC
+                """), {"uid": st.session_state.user['id']}).fetchall()
+        user_regions = cached(st.session_state.user['id'], USER_REGIONS, load_user_regions)
         
         if user_regions:
             df_user = pd.DataFrame(user_regions, columns=["Region", "Count", "Avg Income", "Level"])
@@ -116,26 +120,12 @@ with tab2:
     """)
     
     try:
-        # Load regional context data
-        regional_data = pd.read_csv("data/module1_regional_context.csv")
+        # Regional context sorted by poverty DESCENDING, with its chart spec (cached per process)
+        poverty_view = regional_view('poverty_pct')
+        regional_sorted = poverty_view.sorted
         
-        # Sort by poverty DESCENDING (highest first)
-        regional_sorted = regional_data.sort_values('poverty_pct', ascending=False)
-        
-        # Create horizontal bar chart
-        chart = alt.Chart(regional_sorted).mark_bar().encode(
-            y=alt.Y('region:N', title='Region', sort='-x'),
-            x=alt.X('poverty_pct:Q', title='Poverty Rate (%)'),
-            color=alt.Color('poverty_pct:Q', 
-                           scale=alt.Scale(scheme='reds'),
-                           title='Poverty %'),
-            tooltip=['region:N', alt.Tooltip('poverty_pct:Q', format='.1f')]
-        ).properties(
-            height=500,
-            width=800
-        )
-        
-        st.altair_chart(chart, use_container_width=True)
+        # Horizontal bar chart
+        st.vega_lite_chart(poverty_view.chart_spec, use_container_width=True)
         
         # Key Insights
         st.markdown("### Key Insights")
@@ -159,7 +149,7 @@ with tab2:
             st.metric(
                 "National Average", 
                 f"Across all regions",
-                f"{regional_data['poverty_pct'].mean():.1f}%"
+                f"{poverty_view.mean:.1f}%"
             )
         
         # Detailed insights
@@ -172,9 +162,7 @@ with tab2:
         
         # Detailed Table
         st.markdown("###  Complete Data")
-        display_df = regional_data.sort_values('poverty_pct', ascending=False)[['region', 'poverty_pct']]
-        display_df.columns = ['Region', 'Poverty Rate (%)']
-        st.dataframe(display_df, use_container_width=True, hide_index=True)
+        st.dataframe(poverty_view.table, use_container_width=True, hide_index=True)
         
     except FileNotFoundError:
         st.error(" Regional data file not found: data/module1_regional_context.csv")
@@ -195,26 +183,12 @@ with tab3:
     """)
     
     try:
-        # Load regional context data
-        regional_data = pd.read_csv("data/module1_regional_context.csv")
-        
-        # Sort by CPI DESCENDING (highest first)
-        regional_sorted = regional_data.sort_values('food_cpi_ave', ascending=False)
-        
-        # Create horizontal bar chart
-        chart = alt.Chart(regional_sorted).mark_bar().encode(
-            y=alt.Y('region:N', title='Region', sort='-x'),
-            x=alt.X('food_cpi_ave:Q', title='Food Price Index (CPI)'),
-            color=alt.Color('food_cpi_ave:Q', 
-                           scale=alt.Scale(scheme='oranges'),
-                           title='CPI'),
-            tooltip=['region:N', alt.Tooltip('food_cpi_ave:Q', format='.1f')]
-        ).properties(
-            height=500,
-            width=800
-        )
+        # Regional context sorted by CPI DESCENDING, with its chart spec (cached per process)
+        cpi_view = regional_view('food_cpi_ave')
+        regional_sorted = cpi_view.sorted
         
-        st.altair_chart(chart, use_container_width=True)
+        # Horizontal bar chart
+        st.vega_lite_chart(cpi_view.chart_spec, use_container_width=True)
         
         # Key Insights
         st.markdown("###  Key Insights")
@@ -253,9 +227,7 @@ with tab3:
         
         # Detailed Table
         st.markdown("### Complete Data")
-        display_df = regional_data.sort_values('food_cpi_ave', ascending=False)[['region', 'food_cpi_ave']]
-        display_df.columns = ['Region', 'Food CPI']
-        st.dataframe(display_df, use_container_width=True, hide_index=True)
+        st.dataframe(cpi_view.table, use_container_width=True, hide_index=True)
         
     except FileNotFoundError:
         st.error(" Regional data file not found: data/module1_regional_context.csv")
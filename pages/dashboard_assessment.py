@@ -1,10 +1,12 @@
 import streamlit as st
-import joblib
-import numpy as np
 import pandas as pd
 from sqlalchemy import text
-from db import get_connection
+from data_assets import load_csv
+from db import connection
+from keyset_pager import KeysetPager, seek_page
+from query_cache import cached, invalidate, ASSESSMENT_HISTORY, ASSESSMENT_QUERIES
 from datetime import datetime
+from food_security import load_predictor, artifact_versions, compute_decile, LEVELS, LEVEL_NAMES
 
 if "logged_in" not in st.session_state:
     st.switch_page("main.py")
@@ -32,27 +34,29 @@ with cols[2]:
     if st.button("Meal Planner", use_container_width=True): st.switch_page("pages/dashboard_meal_planner.py")
 with cols[3]:
     if st.button("Meal Planner Overview", use_container_width=True): st.switch_page("pages/dashboard_main.py")
-# Load Models
+# Load Models (once per server process; reloaded only when a new artifact version is published)
+@st.cache_resource(max_entries=1, show_spinner="Loading ML models...")
+def get_predictor(versions):
+    return load_predictor()
+
 st.sidebar.markdown("### ML Models")
 try:
-    model = joblib.load("models/food_security_rf.pkl")
+    predictor = get_predictor(artifact_versions())
     st.sidebar.success("Main Model Ready")
-except FileNotFoundError:
-    st.sidebar.error("Run: python module1_train.py first!")
-    model = None
-
-try:
-    region_encoder = joblib.load("models/region_encoder.pkl")
     st.sidebar.success("Region Encoder Ready")
+    if predictor.grid is not None:
+        st.sidebar.success("Compiled Grid Ready")
+    else:
+        st.sidebar.info("Exact mode (run: python food_security.py to compile)")
 except FileNotFoundError:
-    st.sidebar.error("Region encoder missing!")
-    region_encoder = None
+    st.sidebar.error("Run: python module1_train.py first!")
+    predictor = None
 
 # Load regions from CSV
 @st.cache_data
 def load_regions():
     try:
-        regions_df = pd.read_csv("data/fies_ml_features.csv")
+        regions_df = load_csv("data/fies_ml_features.csv", columns=['region'])
         return sorted(regions_df['region'].unique().tolist())
     except FileNotFoundError:
         return ["NCR I", "Region III", "Region IV", "Region VI"]
@@ -88,48 +92,21 @@ st.markdown("</div>", unsafe_allow_html=True)
 
 # Predict Button
 if st.button("AI Predict Security Level", use_container_width=True):
-    if model and region_encoder:
-        # Encode region
+    if predictor:
+        # ML Prediction (income_pp + household_size + region_encoded)
         try:
-            region_encoded = region_encoder.transform([region])[0]
-        except:
+            prediction, confidence = predictor.predict_one(income_per_person, household_size, region)
+        except ValueError:
             st.error(f"Region '{region}' not recognized")
-            region_encoded = None
+            prediction = None
         
-        if region_encoded is not None:
-            # ML Prediction (income_pp + household_size + region_encoded)
-            features = np.array([[income_per_person, household_size, region_encoded]]).reshape(1, -1)
-            prediction = model.predict(features)[0]
-            prob = model.predict_proba(features)[0]
-            
-            levels = ["🟢 Secure", "🟡 Mildly Insecure", "🟠 Moderately Insecure", "🔴 Severely Insecure"]
-            level_names = ["Secure", "Mildly Insecure", "Moderately Insecure", "Severely Insecure"]
-            level_display = levels[int(prediction)]
-            level_name = level_names[int(prediction)]
-            confidence = float(prob[int(prediction)] * 100)
+        if prediction is not None:
+            level_display = LEVELS[prediction]
+            level_name = LEVEL_NAMES[prediction]
             ml_predicted_at = datetime.now()
             
             # Calculate Decile (1-10 based on income_per_person_monthly)
-            if income_per_person < 1000:
-                decile = 1
-            elif income_per_person < 2000:
-                decile = 2
-            elif income_per_person < 3000:
-                decile = 3
-            elif income_per_person < 4000:
-                decile = 4
-            elif income_per_person < 5000:
-                decile = 5
-            elif income_per_person < 6000:
-                decile = 6
-            elif income_per_person < 7000:
-                decile = 7
-            elif income_per_person < 8000:
-                decile = 8
-            elif income_per_person < 10000:
-                decile = 9
-            else:
-                decile = 10
+            decile = compute_decile(income_per_person)
             
             # Display Results
             st.markdown("### AI Prediction Result")
@@ -139,63 +116,66 @@ if st.button("AI Predict Security Level", use_container_width=True):
             
             # Save to DB
             try:
-                conn = get_connection()
-                conn.execute(text("""
-                    INSERT INTO security_survey (
-                        user_id, region, household_size, monthly_income, 
-                        income_per_person_monthly, income_per_person_daily,
-                        worried_food, healthy_food, skip_meals, decile,
-                        security_level_num, security_level,
-                        ml_confidence, ml_predicted_at
-                    ) VALUES (
-                        :uid, :region, :size, :income, :income_pp, :income_daily,
-                        :worried, :healthy, :skip, :decile,
-                        :score, :level,
-                        :confidence, :ml_predicted_at
-                    )
-                """), {
-                    "uid": st.session_state.user['id'],
-                    "region": region,
-                    "size": float(household_size),
-                    "income": float(monthly_income),
-                    "income_pp": float(income_per_person),
-                    "income_daily": float(income_per_person / 30),
-                    "worried": worried_food,
-                    "healthy": healthy_food,
-                    "skip": skip_meals,
-                    "decile": decile,
-                    "score": int(prediction),
-                    "level": level_name,
-                    "confidence": confidence,
-                    "ml_predicted_at": ml_predicted_at
-                })
+                with connection() as conn:
+                    conn.execute(text("""
+                        INSERT INTO security_survey (
+                            user_id, region, household_size, monthly_income, 
+                            income_per_person_monthly, income_per_person_daily,
+                            worried_food, healthy_food, skip_meals, decile,
+                            security_level_num, security_level,
+                            ml_confidence, ml_predicted_at
+                        ) VALUES (
+                            :uid, :region, :size, :income, :income_pp, :income_daily,
+                            :worried, :healthy, :skip, :decile,
+                            :score, :level,
+                            :confidence, :ml_predicted_at
+                        )
+                    """), {
+                        "uid": st.session_state.user['id'],
+                        "region": region,
+                        "size": float(household_size),
+                        "income": float(monthly_income),
+                        "income_pp": float(income_per_person),
+                        "income_daily": float(income_per_person / 30),
+                        "worried": worried_food,
+                        "healthy": healthy_food,
+                        "skip": skip_meals,
+                        "decile": decile,
+                        "score": int(prediction),
+                        "level": level_name,
+                        "confidence": confidence,
+                        "ml_predicted_at": ml_predicted_at
+                    })
+                invalidate(st.session_state.user['id'], *ASSESSMENT_QUERIES)
                 st.success(f"Assessment saved! You are {level_display}, in Region({region})")
             except Exception as e:
                 st.error(f"Save error: {e}")
-            finally:
-                if 'conn' in locals(): 
-                    conn.close()
     else:
         st.error("Models not loaded. Run: python module1_train.py")
 
 # Previous Results
 st.markdown("<h3 style='margin-top:3rem'>Previous Assessments</h3>", unsafe_allow_html=True)
 try:
-    conn = get_connection()
-    history = conn.execute(text("""
-        SELECT 
-            security_level, 
-            region, 
-            income_per_person_monthly, 
-            household_size, 
-            decile, 
-            ml_predicted_at, 
-            created_at
-        FROM security_survey 
-        WHERE user_id = :uid 
-        ORDER BY created_at DESC LIMIT 10
-    """), {"uid": st.session_state.user['id']}).fetchall()
-    conn.close()
+    # Keyset pages on (created_at, id); page 1 is shared via the query cache, older pages live in the session
+    def load_history_page(after, limit):
+        with connection() as conn:
+            return seek_page(conn, """
+                SELECT 
+                    id,
+                    security_level, 
+                    region, 
+                    income_per_person_monthly, 
+                    household_size, 
+                    decile, 
+                    ml_predicted_at, 
+                    created_at
+                FROM security_survey 
+                WHERE user_id = :uid
+            """, ('created_at', 'id'), after, limit, {"uid": st.session_state.user['id']})
+    history_pager = KeysetPager(st.session_state, "assessment_history", load_history_page, ('created_at', 'id'))
+    history_pager.sync(cached(st.session_state.user['id'], ASSESSMENT_HISTORY,
+                              lambda: load_history_page(None, history_pager.page_size)))
+    history = [row[1:] for row in history_pager.rows()]
     
     if history:
         df = pd.DataFrame(history, columns=[
@@ -208,6 +188,18 @@ try:
             "Created"
         ])
         st.dataframe(df, use_container_width=True, hide_index=True)
+        
+        nav_newer, nav_page, nav_older = st.columns([1, 2, 1])
+        with nav_newer:
+            if st.button("← Newer", disabled=not history_pager.has_newer(), use_container_width=True, key="history_newer"):
+                history_pager.newer()
+                st.rerun()
+        with nav_page:
+            st.caption(f"Page {history_pager.current + 1}")
+        with nav_older:
+            if st.button("Older →", disabled=not history_pager.has_older(), use_container_width=True, key="history_older"):
+                history_pager.older()
+                st.rerun()
     else:
         st.info("Your first assessment will appear here")
 except Exception as e:
@@ -1,8 +1,10 @@
 import streamlit as st
 from sqlalchemy import text
-from db import get_connection
+from db import connection
+from keyset_pager import KeysetPager, seek_page
+from meal_plan_store import DAYS, daily_totals, load_plan, recipe_popularity, cost_trend
+from query_cache import cached, QUICK_STATS, RECENT_PLANS, PLAN_TRENDS
 import pandas as pd
-import json
 import altair as alt
 
 
@@ -56,24 +58,25 @@ with col2:
 # Key Metrics (DB-driven)
 st.markdown("<h3> Quick Stats</h3>", unsafe_allow_html=True)
 try:
-    conn = get_connection()
-    metrics = conn.execute(text("""
-        SELECT 
-            COUNT(DISTINCT s.id) as assessments,
-            COUNT(DISTINCT m.id) as meal_plans,
-            AVG(s.income_per_person_monthly) as avg_income_pp,
-            COUNT(CASE WHEN s.security_level = 'Secure' THEN 1 END) as secure_count
-        FROM security_survey s 
-        LEFT JOIN meal_plans m ON s.user_id = m.user_id 
-        WHERE s.user_id = :uid
-    """), {"uid": st.session_state.user['id']}).fetchone()
-    conn.close()
+    def load_quick_stats():
+        # One row from the trigger-maintained rollup (migrations/0003_user_stats_rollup.sql)
+        with connection() as conn:
+            return conn.execute(text("""
+                SELECT 
+                    assessments,
+                    meal_plans,
+                    income_pp_sum / NULLIF(income_pp_count, 0) as avg_income_pp,
+                    secure_count
+                FROM user_stats
+                WHERE user_id = :uid
+            """), {"uid": st.session_state.user['id']}).fetchone()
+    metrics = cached(st.session_state.user['id'], QUICK_STATS, load_quick_stats)
     
     col1, col2, col3, col4 = st.columns(4)
-    with col1: st.metric("Assessments", metrics.assessments or 0)
-    with col2: st.metric("Meal Plans", metrics.meal_plans or 0)
-    with col3: st.metric("Avg Income/Person", f"₱{metrics.avg_income_pp:,.0f}" if metrics.avg_income_pp else "N/A")
-    with col4: st.metric("Secure Results", metrics.secure_count or 0)
+    with col1: st.metric("Assessments", metrics.assessments if metrics else 0)
+    with col2: st.metric("Meal Plans", metrics.meal_plans if metrics else 0)
+    with col3: st.metric("Avg Income/Person", f"₱{metrics.avg_income_pp:,.0f}" if metrics and metrics.avg_income_pp else "N/A")
+    with col4: st.metric("Secure Results", metrics.secure_count if metrics else 0)
 except:
     st.columns(4)[0].info(" Data appears after first assessment")
 
@@ -85,31 +88,52 @@ except:
 st.markdown("<h3> Recent Meal Plans</h3>", unsafe_allow_html=True)
 
 try:
-    conn = get_connection()
-    
-    # Get latest meal plans with plan_data
-    recent_plans = conn.execute(text("""
-        SELECT id, week_start, region, household_size, weekly_budget, 
-               total_weekly_cost, plan_data, created_at
-        FROM meal_plans 
-        WHERE security_id IN (
-            SELECT id FROM security_survey WHERE user_id = :uid
-        )
-        ORDER BY week_start DESC 
-        LIMIT 3
-    """), {"uid": st.session_state.user['id']}).fetchall()
-    
-    conn.close()
+    # Meal plans with their (shared) plan bodies, keyset-paged on (week_start, id), 3 per page
+    def load_plan_page(after, limit):
+        with connection() as conn:
+            return seek_page(conn, """
+                SELECT m.id, m.week_start, m.region, m.household_size, m.monthly_income,
+                       m.security_level, m.weekly_budget, m.total_weekly_cost,
+                       b.body AS plan_body, m.created_at
+                FROM meal_plans m
+                LEFT JOIN plan_bodies b ON b.hash = m.plan_hash
+                WHERE m.user_id = :uid
+            """, ('m.week_start', 'm.id'), after, limit, {"uid": st.session_state.user['id']})
+
+    def load_plan_totals(plans):
+        with connection() as conn:
+            return daily_totals(conn, [plan.id for plan in plans])
+
+    def load_recent_plans():
+        plans = load_plan_page(None, 3)
+        return plans, load_plan_totals(plans[:3]) if plans else []
+    plan_pager = KeysetPager(st.session_state, "meal_plans", load_plan_page, ('m.week_start', 'm.id'),
+                             page_size=3, load_details=load_plan_totals)
+    plan_pager.sync(*cached(st.session_state.user['id'], RECENT_PLANS, load_recent_plans))
+    recent_plans, plan_daily_totals = plan_pager.rows(), plan_pager.details() or []
     
     if recent_plans:
+        nav_newer, nav_page, nav_older = st.columns([1, 2, 1])
+        with nav_newer:
+            if st.button("← Newer plans", disabled=not plan_pager.has_newer(), use_container_width=True):
+                plan_pager.newer()
+                st.rerun()
+        with nav_page:
+            st.caption(f"Page {plan_pager.current + 1}")
+        with nav_older:
+            if st.button("Older plans →", disabled=not plan_pager.has_older(), use_container_width=True):
+                plan_pager.older()
+                st.rerun()
+        
         # Tabs for each meal plan
-        plan_tabs = st.tabs([f"Plan {i+1} - {plan.week_start}" for i, plan in enumerate(recent_plans)])
+        first_number = plan_pager.current * plan_pager.page_size + 1
+        plan_tabs = st.tabs([f"Plan {first_number + i} - {plan.week_start}" for i, plan in enumerate(recent_plans)])
         
         for tab_idx, (tab, plan) in enumerate(zip(plan_tabs, recent_plans)):
             with tab:
-                # Parse JSON plan_data
+                # plan_body is the compact encoding (plan_codec.py); legacy full dicts pass through
                 try:
-                    plan_data = json.loads(plan.plan_data) if isinstance(plan.plan_data, str) else plan.plan_data
+                    plan_data = load_plan(plan.plan_body, plan)
                 except:
                     st.error(f" Error parsing meal plan data")
                     continue
@@ -139,18 +163,15 @@ try:
                 st.subheader(" Daily Cost Trends")
                 
                 meal_plan = plan_data.get('meal_plan', {})
-                days_order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+                days_order = DAYS
                 
-                daily_data = []
-                for day in days_order:
-                    if day in meal_plan:
-                        day_info = meal_plan[day]
-                        daily_data.append({
-                            'Day': day,
-                            'Cost Per Person': day_info.get('day_total_per_person', 0),
-                            'Cost Family': day_info.get('day_total_family', 0),
-                            'Budget %': day_info.get('budget_utilization_percent', 0)
-                        })
+                # Daily totals are aggregated in SQL from meal_plan_items
+                daily_data = [{
+                    'Day': DAYS[row.day - 1],
+                    'Cost Per Person': float(row.cost_per_person),
+                    'Cost Family': float(row.cost_family),
+                    'Budget %': float(row.budget_pct or 0)
+                } for row in plan_daily_totals if row.plan_id == plan.id]
                 
                 if daily_data:
                     df_daily = pd.DataFrame(daily_data)
@@ -232,6 +253,39 @@ except Exception as e:
     st.info("Make sure your meal plans table has the correct structure")
 
 
+# =====================================================================
+# PLAN TRENDS (SQL aggregates over meal_plan_items / meal_plans)
+# =====================================================================
+
+st.markdown("<h3> Plan Trends</h3>", unsafe_allow_html=True)
+
+try:
+    def load_plan_trends():
+        with connection() as conn:
+            return (recipe_popularity(conn, st.session_state.user['id']),
+                    cost_trend(conn, st.session_state.user['id']))
+    popular, trend = cached(st.session_state.user['id'], PLAN_TRENDS, load_plan_trends)
+    
+    if trend:
+        trend_col, popular_col = st.columns(2)
+        with trend_col:
+            st.markdown("**Weekly Cost vs Budget**")
+            df_trend = pd.DataFrame(trend, columns=["Week", "Budget", "Planned Cost"])
+            df_trend["Week"] = df_trend["Week"].astype(str)
+            df_trend[["Budget", "Planned Cost"]] = df_trend[["Budget", "Planned Cost"]].astype(float)
+            trend_chart = alt.Chart(df_trend.melt("Week", var_name="Series", value_name="₱")).mark_line(point=True).encode(
+                x=alt.X('Week:N'), y=alt.Y('₱:Q'), color='Series:N', tooltip=['Week', 'Series', '₱']
+            ).properties(height=300)
+            st.altair_chart(trend_chart, use_container_width=True)
+        with popular_col:
+            st.markdown("**Most Planned Recipes**")
+            df_popular = pd.DataFrame(popular, columns=["Recipe", "Times Planned", "Avg Cost/Person"])
+            df_popular["Avg Cost/Person"] = df_popular["Avg Cost/Person"].astype(float).round(2)
+            st.dataframe(df_popular, use_container_width=True, hide_index=True)
+except Exception:
+    st.info(" Plan trends appear after your first saved meal plan")
+
+
 # Logout
 st.markdown("---")
 if st.button("Logout", type="secondary", use_container_width=True):
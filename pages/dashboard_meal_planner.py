@@ -1,122 +1,56 @@
 import streamlit as st
 import pandas as pd
 import json
-import psycopg2
-from psycopg2.extras import RealDictCursor
 from datetime import datetime, timedelta
-from decimal import Decimal
 
-from module2_meal_planner_optimized import AIWeeklyMealPlannerWithML
+from sqlalchemy import text
 
-DB_CONFIG = {
-    "host": "localhost",
-    "port": 5000,
-    "database": "meal_planner",
-    "user": "postgres",
-    "password": "database1"
-}
-
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        return conn
-    except Exception as e:
-        st.error(f"Database connection failed: {e}")
-        return None
+from db import connection
+from plan_catalog import plan_for
+from plan_writer import status as plan_status, submit
+from module2_meal_planner_optimized import AIWeeklyMealPlannerWithML, ALLERGENS
 
 def get_latest_security_id():
     """Get the latest/most recent security_id from security_survey table"""
-    conn = get_db_connection()
-    if conn is None:
-        return None
-    
     try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("""
-            SELECT id FROM security_survey
-            ORDER BY id DESC
-            LIMIT 1
-        """)
-        
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        
-        if result:
-            return result['id']
-        return None
+        with connection() as conn:
+            return conn.execute(text("""
+                SELECT id FROM security_survey
+                ORDER BY id DESC
+                LIMIT 1
+            """)).scalar()
     except Exception as e:
         st.error(f"Error loading latest security ID: {e}")
-        if conn:
-            conn.close()
         return None
 
 def get_security_data(security_id):
-    conn = get_db_connection()
-    if conn is None:
-        return None
-    
     try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("""
-            SELECT id, region, household_size, monthly_income, security_level
-            FROM security_survey
-            WHERE id = %s
-        """, (security_id,))
-        
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        with connection() as conn:
+            result = conn.execute(text("""
+                SELECT id, region, household_size, monthly_income, security_level
+                FROM security_survey
+                WHERE id = :sid
+            """), {"sid": security_id}).mappings().fetchone()
         
         if result:
             return dict(result)
         return None
     except Exception as e:
         st.error(f"Error loading security data: {e}")
-        if conn:
-            conn.close()
         return None
 
 def save_meal_plan(security_id, security_level, region, household_size,
                    monthly_income, weekly_budget, total_weekly_cost, allergies, meal_plan_data):
-    conn = get_db_connection()
-    if conn is None:
-        return None
-    
+    """Queue the plan for the background writer (plan_writer.py); returns a provisional id"""
     try:
-        cursor = conn.cursor()
-        
-        today = datetime.now()
-        week_start = today.strftime('%Y-%m-%d')
-        
-        plan_json = json.dumps(meal_plan_data, default=str)
-        allergies_str = ', '.join(allergies) if allergies else None
-        
-        monthly_income = float(monthly_income) if isinstance(monthly_income, Decimal) else float(monthly_income)
-        weekly_budget = float(weekly_budget) if isinstance(weekly_budget, Decimal) else float(weekly_budget)
-        total_weekly_cost = float(total_weekly_cost) if isinstance(total_weekly_cost, Decimal) else float(total_weekly_cost)
-        
-        cursor.execute("""
-            INSERT INTO meal_plans
-            (security_id, security_level, region, household_size, monthly_income,
-             week_start, weekly_budget, total_weekly_cost, allergies, plan_data, status)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id
-        """, (
-            security_id, security_level, region, household_size, monthly_income,
-            week_start, weekly_budget, total_weekly_cost, allergies_str, plan_json, 'Generated'
-        ))
-        
-        plan_id = cursor.fetchone()[0]
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        return plan_id
-        
+        user_id = st.session_state.user['id'] if 'user' in st.session_state else None
+        return submit(
+            security_id=security_id, security_level=security_level, region=region,
+            household_size=household_size, monthly_income=monthly_income, weekly_budget=weekly_budget,
+            total_weekly_cost=total_weekly_cost, allergies=allergies, meal_plan_data=meal_plan_data,
+            user_id=user_id
+        )
     except Exception as e:
-        if conn:
-            conn.close()
         st.error(f"Error saving to database: {str(e)}")
         return None
 
@@ -217,18 +151,7 @@ if latest_security_id:
         st.subheader("Allergies & Restrictions")
         allergies = st.multiselect(
             "Select any allergies or restrictions",
-            [
-                "Peanuts",
-                "Tree nuts",
-                "Dairy",
-                "Eggs",
-                "Fish",
-                "Shellfish",
-                "Soy",
-                "Wheat",
-                "Sesame",
-                "Gluten"
-            ],
+            ALLERGENS,
             help="Select all allergies that apply - we'll avoid these in your meal plan"
         )
         
@@ -250,7 +173,9 @@ if latest_security_id:
                             'security_level': security_level
                         }
                         
-                        meal_plan = meal_planner.generate_weekly_meal_plan(
+                        # Precomputed when the catalog covers it (plan_catalog.py), else generated now
+                        meal_plan = plan_for(
+                            meal_planner,
                             user_data,
                             custom_weekly_budget=weekly_budget,
                             allergies=allergies
@@ -274,7 +199,7 @@ if latest_security_id:
                         )
                         
                         st.session_state.plan_id = plan_id
-                        st.success(f"Meal plan generated and saved! (Plan ID: {plan_id})")
+                        st.success(f"Meal plan generated and queued for saving! (Plan ID: {plan_id})")
                         
                     except Exception as e:
                         st.error(f"Error: {str(e)}")
@@ -386,7 +311,16 @@ if latest_security_id:
                 )
             
             with col3:
-                st.info(f"Plan ID: {st.session_state.plan_id}\nSaved to database successfully!")
+                save_status = plan_status(st.session_state.plan_id) if st.session_state.plan_id else {'state': 'failed'}
+                if save_status['state'] == 'saved':
+                    st.info(f"Plan ID: {save_status['id']}\nSaved to database successfully!")
+                elif save_status['state'] == 'pending':
+                    st.info(f"Plan ID: {st.session_state.plan_id}\nSaving to database...")
+                elif save_status['state'] == 'failed':
+                    st.error(f"This plan could not be saved to the database. Please generate it again."
+                             + (f"\n\n{save_status['error']}" if save_status.get('error') else ""))
+                else:
+                    st.warning(f"Plan ID: {st.session_state.plan_id}\nSave status is no longer available.")
         
         else:
             st.info("**INSTRUCTIONS:**\n\n1️ Review your information above\n\n2️ Adjust budget & select allergies\n\n3️ Click ' Generate Meal Plan'\n\nYour meal plan will be automatically saved!")
@@ -1,7 +1,7 @@
 import streamlit as st
 import hashlib
 from sqlalchemy import text
-from db import get_connection
+from db import connection
 
 
 st.set_page_config(page_title="Register", layout="wide", page_icon="")
@@ -37,25 +37,26 @@ with col1:
                 st.error("Password too short (min 6 chars)")
             else:
                 try:
-                    conn = get_connection()
                     pw_hash = hashlib.sha256(password.encode()).hexdigest()
                     
-                    # Check duplicate
-                    exists = conn.execute(
-                        text("SELECT 1 FROM users WHERE username=:u OR email=:e"),
-                        {"u": username, "e": email}
-                    ).fetchone()
+                    with connection() as conn:
+                        # Check duplicate
+                        exists = conn.execute(
+                            text("SELECT 1 FROM users WHERE username=:u OR email=:e"),
+                            {"u": username, "e": email}
+                        ).fetchone()
+                        
+                        if not exists:
+                            conn.execute(
+                                text("INSERT INTO users (username, email, password_hash) VALUES (:u, :e, :h)"),
+                                {"u": username, "e": email, "h": pw_hash}
+                            )
                     
                     if exists:
                         st.error("Username or email already taken")
                     else:
-                        conn.execute(
-                            text("INSERT INTO users (username, email, password_hash) VALUES (:u, :e, :h)"),
-                            {"u": username, "e": email, "h": pw_hash}
-                        )
                         st.success("Registered! Please login.")
                         st.switch_page("main.py")
-                    conn.close()
                 except Exception as e:
                     st.error(f"Error: {e}")
 
@@ -0,0 +1,423 @@
+"""
+plan_catalog.py
+Offline catalog of precomputed weekly plans (Module 2)
+
+generate_weekly_meal_plan's result depends only on two things: the daily
+per-person budget (weekly budget / 7 / family size) and the recipes left
+after the allergy filter. Family size only scales the family totals, which
+plan_codec.decode_plan() recomputes from the household header anyway. And
+the ten allergens offered by the page only ever produce a handful of
+distinct recipe pools (most allergens match no recipe), so every allergy
+set maps onto one of a few pools.
+
+The build job maps all 2^10 allergy sets to their pools, runs the planner
+for each pool across a geometric grid of daily budgets (in parallel worker
+processes), and publishes the compact day rows ("d" of plan_codec) to the
+model registry as the 'plan_catalog' JSON artifact. An artifact is tied to
+the recipe catalog version its rows reference and to the recipe CSV's
+hash; if either changes it is ignored until rebuilt.
+
+Serving looks up the nearest grid budget at or below the request's
+(bisect), so a served plan never costs more than the real budget, and
+decodes it for the household. It's a dict lookup plus decode, well under a
+millisecond. Anything the catalog can't answer (a budget below or well above
+the grid, an allergy outside the ten, a missing or stale catalog) falls
+back to generating on demand.
+
+Compared with a plan generated at the exact budget, a served plan can be
+up to one grid step (--step-pct) cheaper, with up to that much lower
+utilization.
+
+Usage:
+    python plan_catalog.py build                       # all pools, default grid
+    python plan_catalog.py build --max 150 --step-pct 1 --workers 8
+    python plan_catalog.py build --allergy-sets 20     # pools of the 20 most requested sets only
+    python plan_catalog.py info
+
+    plan = plan_for(planner, user_data, custom_weekly_budget=2000, allergies=['Fish'])
+"""
+
+import argparse
+import contextlib
+import hashlib
+import itertools
+import json
+import math
+import os
+import sys
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from model_registry import file_sha256, get_registry, publish
+from plan_codec import CODEC_VERSION, decode_plan, encode_plan, household_header
+from recipe_catalog import CATALOG_ARTIFACT, RECIPES_PATH, get_catalog
+
+PLAN_CATALOG_ARTIFACT = "plan_catalog"
+CHECKPOINT_PATH = os.path.join("data", ".cache", "plan_catalog.partial.json")
+CHECKPOINT_INTERVAL = 60.0  # seconds
+CHECK_INTERVAL = 5.0        # seconds between registry / CSV change checks when serving
+
+# Daily per-person budget grid (₱)
+MIN_DAILY_BUDGET = 14.0
+MAX_DAILY_BUDGET = 400.0
+STEP_PCT = 2.0
+
+
+def allergy_key(allergies):
+    """Order- and case-insensitive key of an allergy set"""
+    return '|'.join(sorted({allergy.lower() for allergy in allergies or ()}))
+
+
+def budget_grid(low=MIN_DAILY_BUDGET, high=MAX_DAILY_BUDGET, step_pct=STEP_PCT):
+    """Daily budgets in centavos, geometric from low to high"""
+    steps = int(math.log(high / low) / math.log(1 + step_pct / 100)) + 1
+    return sorted({int(round(low * (1 + step_pct / 100) ** i * 100)) for i in range(steps)})
+
+
+def _quiet_planner():
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        from module2_meal_planner_optimized import AIWeeklyMealPlannerWithML
+        return AIWeeklyMealPlannerWithML()
+
+
+def recipe_pools(planner, allergens):
+    """
+    Map every subset of allergens to the recipe pool it leaves
+
+    Returns:
+        tuple: ({allergy_key: pool_id}, {pool_id: smallest allergy set with that pool})
+    """
+    catalog = get_catalog()
+    sets, pools = {}, {}
+    for size in range(len(allergens) + 1):
+        for allergies in itertools.combinations(allergens, size):
+            with contextlib.redirect_stdout(open(os.devnull, 'w')):
+                recipes = planner.get_recipes(list(allergies))
+            ids = sorted(catalog.id_of(name) for name in recipes['recipe'])
+            pool_id = hashlib.sha256(json.dumps(ids).encode()).hexdigest()[:12]
+            sets[allergy_key(allergies)] = pool_id
+            pools.setdefault(pool_id, list(allergies))
+    return sets, pools
+
+
+def requested_allergy_sets(limit, engine=None):
+    """The most common allergy sets of saved plans, most common first"""
+    from sqlalchemy import text
+
+    if engine is None:
+        from db import engine
+
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT COALESCE(allergies, '') AS allergies, COUNT(*) AS plans
+            FROM meal_plans GROUP BY 1 ORDER BY plans DESC LIMIT :limit
+        """), {"limit": limit}).fetchall()
+    return [[a.strip() for a in row.allergies.split(',') if a.strip()] for row in rows]
+
+
+# ========================================================================
+# BUILD
+# ========================================================================
+
+_planner = None
+
+
+def _init_worker():
+    global _planner
+    sys.stdout = open(os.devnull, 'w')
+    _planner = _quiet_planner()
+
+
+def _plan_rows(pool_id, allergies, daily_c):
+    """Compact day rows of the planner's plan for one pool and daily budget (None: no plan)"""
+    plan = _planner.generate_weekly_meal_plan(
+        {'income': 0, 'family_size': 1, 'region': None},
+        custom_weekly_budget=daily_c * 7 / 100, allergies=allergies)
+    compact = encode_plan(plan) if 'error' not in plan else None
+    return pool_id, daily_c, compact['d'] if compact else None
+
+
+def _previous_builds(recipes_sha256, catalog_version, checkpoint_path):
+    """
+    (pool, budget) -> rows already computed against the same recipes, from the
+    current catalog and an interrupted build's checkpoint
+    """
+    done = {}
+    registry = get_registry()
+    if registry.current_version(PLAN_CATALOG_ARTIFACT):
+        artifact = registry.load_artifact(PLAN_CATALOG_ARTIFACT)
+        if (artifact['recipes_sha256'], artifact['recipe_catalog']) == (recipes_sha256, catalog_version):
+            for pool_id, entry in artifact['pools'].items():
+                for daily_c, rows in zip(artifact['budgets_c'], entry['plans']):
+                    done[(pool_id, daily_c)] = rows
+    try:
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if (checkpoint['recipes_sha256'], checkpoint['recipe_catalog']) == (recipes_sha256, catalog_version):
+            done.update(((pool_id, daily_c), rows) for pool_id, daily_c, rows in checkpoint['done'])
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+    return done
+
+
+def _artifact(recipes_sha256, catalog_version, budgets, step_pct, sets, pools, done):
+    return {
+        'recipes_sha256': recipes_sha256,
+        'recipe_catalog': catalog_version,
+        'codec': CODEC_VERSION,
+        'step_pct': step_pct,
+        'budgets_c': budgets,
+        'allergy_sets': {key: pool_id for key, pool_id in sets.items() if pool_id in pools},
+        'pools': {
+            pool_id: {'allergies': allergies,
+                      'plans': [done.get((pool_id, daily_c)) for daily_c in budgets]}
+            for pool_id, allergies in pools.items()
+        },
+    }
+
+
+def _save_checkpoint(path, recipes_sha256, catalog_version, done):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump({'recipes_sha256': recipes_sha256, 'recipe_catalog': catalog_version,
+                   'done': [[pool_id, daily_c, rows] for (pool_id, daily_c), rows in done.items()]},
+                  f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def build_catalog(low=MIN_DAILY_BUDGET, high=MAX_DAILY_BUDGET, step_pct=STEP_PCT, workers=None,
+                  allergy_sets=None, checkpoint_path=CHECKPOINT_PATH):
+    """
+    Compute and publish the plan catalog
+
+    Plans already computed for the same recipes (current catalog or an
+    interrupted build's checkpoint) are reused, so widening the grid only
+    computes the new points.
+
+    Args:
+        allergy_sets (int): Only the pools of the N most common saved allergy
+            sets (plus no allergies); default every pool
+
+    Returns:
+        tuple: (version, plans computed, plans reused)
+    """
+    from module2_meal_planner_optimized import ALLERGENS
+
+    recipes_sha256 = file_sha256(RECIPES_PATH)
+    catalog_version = get_catalog().version
+    sets, pools = recipe_pools(_quiet_planner(), ALLERGENS)
+    if allergy_sets:
+        wanted = {sets[allergy_key(())]}
+        for allergies in requested_allergy_sets(allergy_sets):
+            pool_id = sets.get(allergy_key(allergies))
+            if pool_id is not None:
+                wanted.add(pool_id)
+        pools = {pool_id: allergies for pool_id, allergies in pools.items() if pool_id in wanted}
+
+    budgets = budget_grid(low, high, step_pct)
+    done = _previous_builds(recipes_sha256, catalog_version, checkpoint_path)
+    tasks = [(pool_id, allergies, daily_c) for pool_id, allergies in pools.items()
+             for daily_c in budgets if (pool_id, daily_c) not in done]
+    reused = len(pools) * len(budgets) - len(tasks)
+    print(f"📦 {len(sets)} allergy sets -> {len(pools)} recipe pools x {len(budgets)} budgets "
+          f"(₱{budgets[0] / 100:.2f}-₱{budgets[-1] / 100:.2f}/person/day): "
+          f"{len(tasks)} plans to compute, {reused} reused")
+
+    start = last_checkpoint = time.monotonic()
+    if tasks:
+        with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+            # Most expensive (highest budget) first, so the tail isn't one slow plan
+            futures = [pool.submit(_plan_rows, *task) for task in sorted(tasks, key=lambda t: -t[2])]
+            for completed, future in enumerate(as_completed(futures), 1):
+                pool_id, daily_c, rows = future.result()
+                done[(pool_id, daily_c)] = rows
+                now = time.monotonic()
+                if now - last_checkpoint >= CHECKPOINT_INTERVAL or completed == len(futures):
+                    last_checkpoint = now
+                    _save_checkpoint(checkpoint_path, recipes_sha256, catalog_version, done)
+                    print(f"  ✅ {completed}/{len(futures)} plans ({now - start:.0f}s)")
+
+    artifact = _artifact(recipes_sha256, catalog_version, budgets, step_pct, sets, pools, done)
+    version = publish(PLAN_CATALOG_ARTIFACT, artifact, fmt='json', metadata={
+        'recipe_catalog': catalog_version, 'pools': len(pools), 'budgets': len(budgets),
+        'step_pct': step_pct, 'build_s': round(time.monotonic() - start, 1),
+    })
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(checkpoint_path)
+    invalidate()
+    return version, len(tasks), reused
+
+
+# ========================================================================
+# SERVING
+# ========================================================================
+
+class PlanCatalog:
+    """One published plan catalog, ready for lookups"""
+
+    def __init__(self, version, artifact):
+        self.version = version
+        self.recipe_catalog = artifact['recipe_catalog']
+        self.budgets_c = artifact['budgets_c']
+        # Past one grid step above the top budget the planner's choices differ; generate those
+        self.ceiling_c = self.budgets_c[-1] * (1 + artifact['step_pct'] / 100)
+        self.allergy_sets = artifact['allergy_sets']
+        self.plans = {pool_id: entry['plans'] for pool_id, entry in artifact['pools'].items()}
+
+    def lookup(self, daily_budget, allergies=()):
+        """Compact day rows for the nearest grid budget at or below daily_budget, or None"""
+        plans = self.plans.get(self.allergy_sets.get(allergy_key(allergies)))
+        if plans is None:
+            return None
+        daily_c = daily_budget * 100
+        index = bisect_right(self.budgets_c, daily_c) - 1
+        if index < 0 or daily_c > self.ceiling_c:
+            return None
+        return plans[index]
+
+
+class PlanCatalogCache:
+    """The current plan catalog, reloaded when it or the recipe CSV changes"""
+
+    def __init__(self, recipes_path=RECIPES_PATH, check_interval=CHECK_INTERVAL):
+        self.recipes_path = recipes_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked_at = None
+        self._catalog = None
+        self.hits = 0
+        self.misses = 0
+
+    def _current(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return self._catalog
+        self._checked_at = now
+        registry = get_registry()
+        version = registry.current_version(PLAN_CATALOG_ARTIFACT)
+        try:
+            stat = os.stat(self.recipes_path)
+        except FileNotFoundError:
+            stat = None
+        signature = (version, registry.current_version(CATALOG_ARTIFACT),
+                     stat and (stat.st_mtime_ns, stat.st_size))
+        if signature != self._signature:
+            self._signature = signature
+            self._catalog = None
+            if version is not None and stat is not None:
+                artifact = registry.load_artifact(PLAN_CATALOG_ARTIFACT, version)
+                # Built from these recipes, with ids of the current recipe catalog
+                if artifact['recipes_sha256'] == file_sha256(self.recipes_path) \
+                        and artifact['recipe_catalog'] == signature[1]:
+                    self._catalog = PlanCatalog(version, artifact)
+        return self._catalog
+
+    def plan(self, user_data, weekly_budget=None, allergies=()):
+        """
+        Precomputed plan for a request, shaped like generate_weekly_meal_plan's, or None
+
+        Args:
+            user_data (dict): income, family_size, region, security_level
+            weekly_budget (float): Default 25% of income, as the planner does
+        """
+        if weekly_budget is None:
+            weekly_budget = (user_data['income'] * 0.25) / 4.33
+        family_size = user_data['family_size']
+        with self._lock:
+            catalog = self._current()
+            rows = None
+            if catalog is not None and family_size and weekly_budget > 0:
+                rows = catalog.lookup(weekly_budget / 7 / family_size, allergies)
+            if rows is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return decode_plan(
+            {'v': CODEC_VERSION, 'cat': catalog.recipe_catalog, 'd': rows},
+            household_header(user_data['income'], family_size, user_data['region'],
+                             user_data.get('security_level', 'Unknown'), weekly_budget))
+
+    def invalidate(self):
+        with self._lock:
+            self._signature = None
+            self._checked_at = None
+            self._catalog = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'version': self._catalog.version if self._catalog else None,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+_cache = PlanCatalogCache()
+
+
+def cached_plan(user_data, weekly_budget=None, allergies=()):
+    return _cache.plan(user_data, weekly_budget, allergies)
+
+
+def plan_for(planner, user_data, custom_weekly_budget=None, allergies=[]):
+    """The catalog's plan when it has one, else planner.generate_weekly_meal_plan"""
+    plan = cached_plan(user_data, custom_weekly_budget, allergies)
+    if plan is None:
+        plan = planner.generate_weekly_meal_plan(user_data, custom_weekly_budget=custom_weekly_budget,
+                                                 allergies=allergies)
+    return plan
+
+
+def catalog_stats():
+    return _cache.stats()
+
+
+def invalidate():
+    _cache.invalidate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precomputed plan catalog")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Compute and publish the catalog")
+    build.add_argument("--min", type=float, default=MIN_DAILY_BUDGET, help="Lowest daily budget per person (₱)")
+    build.add_argument("--max", type=float, default=MAX_DAILY_BUDGET, help="Highest daily budget per person (₱)")
+    build.add_argument("--step-pct", type=float, default=STEP_PCT, help="Grid step (%% of budget)")
+    build.add_argument("--workers", type=int, help="Planner processes (default: CPU count)")
+    build.add_argument("--allergy-sets", type=int, help="Only pools of the N most common saved allergy sets")
+    sub.add_parser("info", help="Show the current catalog")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        version, computed, reused = build_catalog(args.min, args.max, args.step_pct, args.workers,
+                                                  args.allergy_sets)
+        print(f"✅ {PLAN_CATALOG_ARTIFACT} {version}: {computed} plans computed, {reused} reused")
+        print(f"⏱️ Done in {time.perf_counter() - start:.2f}s")
+        return
+
+    registry = get_registry()
+    version = registry.current_version(PLAN_CATALOG_ARTIFACT)
+    if version is None:
+        print(f"⚠️ No {PLAN_CATALOG_ARTIFACT} published. Run: python plan_catalog.py build")
+        return
+    artifact = registry.load_artifact(PLAN_CATALOG_ARTIFACT, version)
+    budgets = artifact['budgets_c']
+    fresh = artifact['recipes_sha256'] == file_sha256(RECIPES_PATH) \
+        and artifact['recipe_catalog'] == registry.current_version(CATALOG_ARTIFACT)
+    print(f"📦 {PLAN_CATALOG_ARTIFACT} {version} ({'current' if fresh else '⚠️ stale, rebuild'})")
+    print(f"   {len(budgets)} budgets ₱{budgets[0] / 100:.2f}-₱{budgets[-1] / 100:.2f}/person/day, "
+          f"{artifact['step_pct']}% steps; {len(artifact['allergy_sets'])} allergy sets")
+    for pool_id, entry in artifact['pools'].items():
+        planned = sum(rows is not None for rows in entry['plans'])
+        print(f"   pool {pool_id} (e.g. {entry['allergies'] or 'no allergies'}): {planned}/{len(budgets)} plans")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+plan_codec.py
+Compact, versioned encoding of generated meal plans (Module 2)
+
+A full plan dict repeats the user profile, the budget block, every recipe
+name and per-day totals that are all derivable. The compact form keeps only
+what can't be derived:
+
+    {"v": 1,                                   codec version
+     "cat": "<catalog version>",               see recipe_catalog.py
+     "p": [income_c, family_size, region, security_level],
+     "w": weekly_budget_c,
+     "d": [[day, b_id, b_c, l_id, l_c, d_id, d_c], ...]}
+
+Money is integer centavos, recipes are catalog ids (-1 = slot not planned),
+day is 0-6 (Monday first). decode_plan() rebuilds today's dict shape
+exactly as AIWeeklyMealPlannerWithML.generate_weekly_meal_plan returns it,
+so the detail views and export buttons don't change. Dicts that aren't
+compact (plans saved before this codec) pass through decode_plan unchanged.
+
+"p" and "w" (the household header) duplicate meal_plans columns. dumps()
+leaves them out when given the row's header, so identical plans for
+different households serialize identically and share one plan_bodies row;
+decode_plan() takes the header back from the row.
+"""
+
+import json
+
+from recipe_catalog import get_catalog, to_centavos
+
+CODEC_VERSION = 1
+NO_RECIPE = -1
+NOT_PLANNED = 'Not planned (budget limit)'
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+SLOTS = ["breakfast", "lunch", "dinner"]
+
+
+def is_compact(data):
+    return isinstance(data, dict) and data.get('v') == CODEC_VERSION and 'cat' in data
+
+
+def household_header(income, family_size, region, security_level, weekly_budget):
+    """The "p"/"w" part of a compact plan, from a household's meal_plans columns"""
+    # household_size is a DOUBLE PRECISION column; keep whole sizes ints as the planner has them
+    if isinstance(family_size, float) and family_size.is_integer():
+        family_size = int(family_size)
+    return {
+        'p': [to_centavos(income or 0), family_size, region, security_level],
+        'w': to_centavos(weekly_budget),
+    }
+
+
+def encode_plan(plan, catalog=None):
+    """
+    Compact form of a generated plan
+
+    Returns:
+        dict: The compact plan, or None if it can't be encoded (error plan,
+        recipe missing from the catalog); callers then store the full dict.
+    """
+    if 'meal_plan' not in plan or 'user_profile' not in plan:
+        return None
+    catalog = catalog or get_catalog()
+    profile = plan['user_profile']
+
+    days = []
+    for day_name, day_plan in plan['meal_plan'].items():
+        row = [DAYS.index(day_name)]
+        for slot in SLOTS:
+            meal = day_plan.get(slot) or {'name': NOT_PLANNED, 'cost': 0.0}
+            if meal['name'] == NOT_PLANNED:
+                row += [NO_RECIPE, 0]
+                continue
+            recipe_id = catalog.id_of(meal['name'])
+            if recipe_id is None:
+                return None
+            row += [recipe_id, to_centavos(meal['cost'])]
+        days.append(row)
+
+    return {
+        'v': CODEC_VERSION,
+        'cat': catalog.version,
+        **household_header(profile['income'], profile['family_size'], profile['region'],
+                           profile['security_level'], plan['budget']['weekly']),
+        'd': days,
+    }
+
+
+def decode_plan(data, household=None):
+    """
+    Full plan dict from a compact plan (other dicts are returned as is)
+
+    Args:
+        household (dict): household_header() of the plan's row, for bodies
+            stored without it; a header inside data takes precedence
+    """
+    if isinstance(data, str):
+        data = json.loads(data)
+    if not is_compact(data):
+        return data
+    if household is not None:
+        data = {**household, **data}
+
+    catalog = get_catalog(data['cat'])
+    income_c, family_size, region, security_level = data['p']
+    weekly_budget = data['w'] / 100
+    daily_budget = weekly_budget / 7 / family_size
+
+    meal_plan = {}
+    total_weekly_cost = 0.0
+    distribution = {'3_meals': 0, '2_meals': 0, '1_meal': 0}
+    for row in data['d']:
+        day_plan = {}
+        recipes_used = []
+        total_c = 0
+        for slot, (recipe_id, cost_c) in zip(SLOTS, zip(row[1::2], row[2::2])):
+            if recipe_id == NO_RECIPE:
+                day_plan[slot] = {'name': NOT_PLANNED, 'cost': 0.0}
+                continue
+            name = catalog.names[recipe_id]
+            day_plan[slot] = {'name': name, 'cost': cost_c / 100}
+            recipes_used.append(name)
+            total_c += cost_c
+
+        day_total = total_c / 100
+        day_plan.update({
+            'day_total_per_person': day_total,
+            'day_total_family': day_total * family_size,
+            'recipes_used': recipes_used,
+            'meal_count': len(recipes_used),
+            'budget_utilization_percent': (day_total / daily_budget) * 100,
+        })
+        meal_plan[DAYS[row[0]]] = day_plan
+        total_weekly_cost += day_plan['day_total_family']
+        distribution[{3: '3_meals', 2: '2_meals'}.get(len(recipes_used), '1_meal')] += 1
+
+    return {
+        'user_profile': {
+            'income': income_c / 100,
+            'family_size': family_size,
+            'region': region,
+            'security_level': security_level,
+        },
+        'budget': {
+            'weekly': weekly_budget,
+            'daily_per_person': daily_budget,
+            'actual_spent': total_weekly_cost,
+            'utilization_percent': (total_weekly_cost / weekly_budget) * 100 if weekly_budget > 0 else 0,
+            'target_utilization': '85-90%',
+        },
+        'meal_plan': meal_plan,
+        'summary': {
+            'total_meals': distribution['3_meals'] * 3 + distribution['2_meals'] * 2 + distribution['1_meal'],
+            'total_cost': total_weekly_cost,
+            'avg_cost_per_day': total_weekly_cost / 7 if meal_plan else 0,
+            'days_planned': len(meal_plan),
+            'meal_distribution': distribution,
+        },
+    }
+
+
+def dumps(plan, household=None):
+    """
+    Serialized plan for storage: compact JSON when possible, else the full dict
+
+    The household header is left out when it matches household, so the
+    result is shareable between households (decode with the same header).
+    """
+    try:
+        compact = encode_plan(plan)
+    except FileNotFoundError:  # no catalog published
+        compact = None
+    if compact is not None:
+        if household is not None and all(compact[key] == value for key, value in household.items()):
+            compact = {key: value for key, value in compact.items() if key not in household}
+        return json.dumps(compact, separators=(',', ':'))
+    return json.dumps(plan, default=str)
@@ -0,0 +1,317 @@
+"""
+plan_writer.py
+Write-behind queue for generated meal plans
+
+The meal planner page used to wait for the INSERT and commit before showing
+the plan. submit() now only enqueues the plan and returns a provisional id;
+a background writer thread drains the queue in batches (one
+insert_meal_plans call, i.e. a few multi-row statements per batch), retries
+transient database errors with backoff, and maps each provisional id to the
+real meal_plans.id once committed (resolve(), status()). The dashboard caches of the
+affected users are invalidated after the commit, not at submit time, so a
+reader can't cache the pre-write state.
+
+A plan that fails for a non-transient reason (constraint violation, bad
+data) fails only itself: the batch is retried plan by plan and the failure
+is logged, counted and reported by status(), so the page can tell the user.
+
+The queue is flushed on interpreter shutdown (atexit). Plans still queued
+when the process is killed outright are lost, which is the trade made for
+not blocking the page.
+
+Usage:
+    provisional_id = submit(security_id=..., meal_plan_data=plan, user_id=...)
+    resolve(provisional_id)     # meal_plans.id once written, else None
+    status(provisional_id)      # {'state': 'pending' | 'saved' | 'failed' | 'unknown', ...}
+    writer_stats()              # queue depth, flush latency, failures
+"""
+
+import atexit
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+from meal_plan_store import insert_meal_plans
+from query_cache import MEAL_PLAN_QUERIES, invalidate
+
+BATCH_SIZE = 100
+MAX_WAIT = 0.2          # seconds a plan may wait for more to batch with
+MAX_RETRIES = 5
+RETRY_BACKOFF = 0.5     # seconds, doubled per attempt
+SHUTDOWN_TIMEOUT = 10   # seconds to flush at exit
+RESOLVED_IDS = 10_000   # provisional -> real id mappings (and failures) kept
+RECENT_FLUSHES = 1_000  # flush latencies kept for percentiles
+
+PROVISIONAL_PREFIX = "pending-"
+
+logger = logging.getLogger("plan_writer")
+
+
+def _is_transient(error):
+    """Errors worth retrying as is: lost connections, server restarts, serialization failures"""
+    if isinstance(error, OperationalError):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+class PlanWriter:
+    """Background writer draining submitted plans into meal_plans in batches"""
+
+    def __init__(self, engine=None, batch_size=BATCH_SIZE, max_wait=MAX_WAIT,
+                 max_retries=MAX_RETRIES, retry_backoff=RETRY_BACKOFF):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue = queue.Queue()
+        self._ids = itertools.count(1)
+        self._resolved = OrderedDict()
+        self._failed = OrderedDict()   # provisional id -> error message
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._flush_ms = deque(maxlen=RECENT_FLUSHES)
+        self.submitted = 0
+        self.written = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    def submit(self, **plan):
+        """
+        Queue one plan for writing
+
+        Args:
+            **plan: insert_meal_plan keyword arguments
+
+        Returns:
+            str: Provisional id, see resolve()
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("PlanWriter is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="plan-writer", daemon=True)
+                self._thread.start()
+            provisional_id = f"{PROVISIONAL_PREFIX}{next(self._ids)}"
+            self._pending.add(provisional_id)
+            self.submitted += 1
+        self._queue.put((provisional_id, time.monotonic(), plan))
+        return provisional_id
+
+    def resolve(self, provisional_id):
+        """meal_plans.id of a submitted plan once committed, else None (see status())"""
+        with self._lock:
+            return self._resolved.get(provisional_id)
+
+    def status(self, provisional_id):
+        """
+        Where a submitted plan is
+
+        Returns:
+            dict: {'state': 'pending'} while queued or being written,
+                  {'state': 'saved', 'id': meal_plans.id},
+                  {'state': 'failed', 'error': message} once given up on, or
+                  {'state': 'unknown'} for ids this writer never issued or no
+                  longer remembers (more than RESOLVED_IDS outcomes ago)
+        """
+        with self._lock:
+            if provisional_id in self._resolved:
+                return {'state': 'saved', 'id': self._resolved[provisional_id]}
+            if provisional_id in self._failed:
+                return {'state': 'failed', 'error': self._failed[provisional_id]}
+            if provisional_id in self._pending:
+                return {'state': 'pending'}
+        return {'state': 'unknown'}
+
+    def flush(self, timeout=None):
+        """Block until everything submitted so far is written (or failed); False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=SHUTDOWN_TIMEOUT):
+        """Stop accepting plans and flush the queue"""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is None:
+            return True
+        flushed = self.flush(timeout)
+        if not flushed:
+            logger.error("plan writer: %d plans not written at shutdown", self._queue.qsize())
+        return flushed
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.exception("plan writer: unexpected error, %d plans dropped", len(batch))
+                for entry in batch:
+                    with self._lock:
+                        settled = entry[0] in self._resolved or entry[0] in self._failed
+                    if not settled:
+                        self._fail(entry, e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _engine(self):
+        if self.engine is None:
+            from db import engine
+            self.engine = engine
+        return self.engine
+
+    def _insert(self, entries):
+        """Insert entries in one transaction, retrying transient errors; returns their ids"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._engine().begin() as conn:
+                    return insert_meal_plans(conn, [plan for _, _, plan in entries])
+            except DBAPIError as e:
+                if not _is_transient(e) or attempt == self.max_retries:
+                    raise
+                with self._lock:
+                    self.retries += 1
+                logger.warning("plan writer: transient error (attempt %d): %s", attempt + 1, e)
+                time.sleep(self.retry_backoff * 2 ** attempt)
+
+    def _write(self, batch):
+        started = time.monotonic()
+        # Only the insert is retried: once it has committed, the plans exist
+        # whatever happens in the bookkeeping after it
+        try:
+            plan_ids = self._insert(batch)
+        except Exception as e:
+            if len(batch) == 1 or (isinstance(e, DBAPIError) and _is_transient(e)):
+                for entry in batch:
+                    self._fail(entry, e)
+            else:
+                # Isolate the bad plan(s); the rest of the batch still gets written
+                for entry in batch:
+                    try:
+                        entry_ids = self._insert([entry])
+                    except Exception as entry_error:
+                        self._fail(entry, entry_error)
+                    else:
+                        self._commit([entry], entry_ids)
+        else:
+            self._commit(batch, plan_ids)
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._lock:
+            self.batches += 1
+            self._flush_ms.append(elapsed_ms)
+
+    def _commit(self, entries, plan_ids):
+        with self._lock:
+            for (provisional_id, _, _), plan_id in zip(entries, plan_ids):
+                self._resolved[provisional_id] = plan_id
+                self._pending.discard(provisional_id)
+            while len(self._resolved) > RESOLVED_IDS:
+                self._resolved.popitem(last=False)
+            self.written += len(entries)
+        for user_id in {plan.get('user_id') for _, _, plan in entries} - {None}:
+            try:
+                invalidate(user_id, *MEAL_PLAN_QUERIES)
+            except Exception:
+                logger.exception("plan writer: cache invalidation failed for user %s", user_id)
+
+    def _fail(self, entry, error):
+        provisional_id, queued_at, plan = entry
+        logger.error("plan writer: %s (security_id=%s, queued %.1fs ago) not written: %s",
+                     provisional_id, plan.get('security_id'), time.monotonic() - queued_at, error)
+        with self._lock:
+            self._failed[provisional_id] = str(error)
+            self._pending.discard(provisional_id)
+            while len(self._failed) > RESOLVED_IDS:
+                self._failed.popitem(last=False)
+            self.failed += 1
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def stats(self):
+        with self._lock:
+            recent = sorted(self._flush_ms)
+            counters = {
+                'submitted': self.submitted,
+                'written': self.written,
+                'failed': self.failed,
+                'retries': self.retries,
+                'batches': self.batches,
+            }
+
+        def pct(q):
+            return round(recent[min(len(recent) - 1, int(q * len(recent)))], 3) if recent else 0.0
+
+        return {
+            'queue_depth': self._queue.qsize(),
+            'in_flight': self._queue.unfinished_tasks,
+            **counters,
+            'flush_p50_ms': pct(0.50),
+            'flush_p95_ms': pct(0.95),
+            'flush_max_ms': round(recent[-1], 3) if recent else 0.0,
+        }
+
+
+_writer = PlanWriter()
+atexit.register(_writer.close)
+
+
+def get_plan_writer():
+    """The process-wide writer"""
+    return _writer
+
+
+def submit(**plan):
+    return _writer.submit(**plan)
+
+
+def resolve(provisional_id):
+    return _writer.resolve(provisional_id)
+
+
+def status(provisional_id):
+    return _writer.status(provisional_id)
+
+
+def flush(timeout=None):
+    return _writer.flush(timeout)
+
+
+def writer_stats():
+    return _writer.stats()
@@ -0,0 +1,313 @@
+"""
+planning_service.py
+Headless HTTP API for meal planning and food security scoring
+
+Exposes the planner and the Module 1 predictor without Streamlit, for
+partner systems and batch jobs:
+
+    GET  /health              worker pool and database status
+    POST /plans               generate a weekly plan (optionally queue it for saving)
+    POST /plans/swap          replace one meal of a plan
+    POST /plans/feasibility   meals per day a budget can cover
+    POST /assessments/score   food security level, confidence and decile
+
+Plan generation is CPU-bound (select_meals_for_day walks every meal
+combination), so planner calls run in a process pool and never block the
+event loop. Each worker builds one AIWeeklyMealPlannerWithML at start-up and
+keeps it; the recipe catalog it reads comes from data_assets' memory-mapped
+Arrow file, so the workers share those pages through the OS page cache
+instead of each holding a parsed copy. Workers are started from a
+forkserver (preloaded with the planner modules) rather than forked from the
+threaded server process.
+
+Plans the precomputed catalog (plan_catalog.py) covers are answered from it
+in the server process; only misses go to the pool.
+
+Every pooled call has a deadline (PLANNER_TIMEOUT); past it the request gets
+504. A call that is already running can't be interrupted, so its worker
+stays busy until the plan finishes and the result is dropped. Scoring is a
+grid lookup and runs in the server process.
+
+Saved plans go through plan_writer (the same write-behind queue as the
+meal planner page), against the database configured in db.py.
+
+Usage:
+    uvicorn planning_service:app --port 8000
+    python planning_service.py --port 8000 --workers 4
+
+    PLANNER_WORKERS=4 PLANNER_TIMEOUT=30 DB_PORT=5432 uvicorn planning_service:app
+"""
+
+import argparse
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Literal, Optional
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
+
+from data_assets import load_table
+from food_security import LEVEL_NAMES, compute_decile, load_predictor
+from plan_catalog import cached_plan, catalog_stats
+from plan_codec import DAYS, SLOTS
+
+WORKERS = int(os.getenv("PLANNER_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+TIMEOUT = float(os.getenv("PLANNER_TIMEOUT", 30))  # seconds per planner call, queueing included
+
+RECIPES_PATH = "REAL_RECIPE_COSTS_REALISTIC_2026.csv"
+
+
+# ========================================================================
+# WORKER PROCESSES
+# ========================================================================
+
+_planner = None
+
+
+def _init_worker():
+    """Build the worker's planner once; its progress prints go nowhere"""
+    global _planner
+    sys.stdout = open(os.devnull, 'w')
+    from module2_meal_planner_optimized import AIWeeklyMealPlannerWithML
+    _planner = AIWeeklyMealPlannerWithML()
+
+
+def _generate(user_data, weekly_budget, allergies):
+    return _planner.generate_weekly_meal_plan(user_data, custom_weekly_budget=weekly_budget,
+                                              allergies=allergies)
+
+
+def _swap(plan, day, slot, allergies):
+    return _planner.swap_meal(plan, day, slot, allergies)
+
+
+def _feasibility(weekly_budget, family_size, allergies):
+    return _planner.check_feasibility(weekly_budget, family_size, allergies)
+
+
+def _warm_up():
+    return os.getpid()
+
+
+class PlannerPool:
+    """Process pool of planners with per-call deadlines; rebuilt if a worker dies"""
+
+    def __init__(self, workers=WORKERS, timeout=TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor = None
+        self.calls = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload(['module2_meal_planner_optimized', 'data_assets'])
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=context,
+                                                     initializer=_init_worker)
+            return self._executor
+
+    def start(self):
+        """Start the workers now rather than on the first request"""
+        load_table(RECIPES_PATH)  # convert the catalog once, before the workers map it
+        pool = self._pool()
+        for future in [pool.submit(_warm_up) for _ in range(self.workers)]:
+            future.result()
+
+    async def run(self, fn, *args):
+        """
+        Run fn(*args) in a worker
+
+        Raises:
+            HTTPException: 504 past the deadline, 503 if the pool broke
+        """
+        self.calls += 1
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(pool, fn, *args), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise HTTPException(504, f"Planner timed out after {self.timeout:.0f}s")
+        except BrokenProcessPool:
+            with self._lock:
+                if self._executor is pool:
+                    self._executor = None
+                    self.restarts += 1
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise HTTPException(503, "Planner worker died; the pool is restarting")
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self):
+        return {'workers': self.workers, 'running': self._executor is not None,
+                'timeout_s': self.timeout, 'calls': self.calls,
+                'timeouts': self.timeouts, 'restarts': self.restarts}
+
+
+# ========================================================================
+# API
+# ========================================================================
+
+class PlanRequest(BaseModel):
+    income: float = Field(ge=0, description="Monthly household income (₱)")
+    family_size: int = Field(ge=1, le=50)
+    region: str
+    security_level: str = 'Unknown'
+    weekly_budget: Optional[float] = Field(None, gt=0, description="Default: 25% of income")
+    allergies: List[str] = []
+    save: bool = False
+    security_id: Optional[int] = Field(None, description="security_survey row the plan is for (needed to save)")
+    user_id: Optional[int] = None
+
+
+class SwapRequest(BaseModel):
+    plan: dict = Field(description="A plan returned by POST /plans")
+    day: Literal[tuple(DAYS)]
+    slot: Literal[tuple(SLOTS)]
+    allergies: List[str] = []
+
+
+class FeasibilityRequest(BaseModel):
+    weekly_budget: float = Field(gt=0)
+    family_size: int = Field(ge=1, le=50)
+    allergies: List[str] = []
+
+
+class ScoreRequest(BaseModel):
+    region: str
+    household_size: float = Field(gt=0)
+    monthly_income: float = Field(ge=0)
+
+
+planner_pool = PlannerPool()
+_predictor = None
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global _predictor
+    _predictor = load_predictor()
+    await asyncio.get_running_loop().run_in_executor(None, planner_pool.start)
+    yield
+    planner_pool.shutdown()
+    from plan_writer import get_plan_writer
+    get_plan_writer().close()
+
+
+app = FastAPI(title="NutriScope PH planning service", lifespan=lifespan)
+
+
+@app.get("/health")
+def health():
+    from db import ping
+    from plan_writer import writer_stats
+
+    database = ping()
+    return {'status': 'ok' if database else 'degraded', 'database': database,
+            'planner': planner_pool.stats(), 'plan_catalog': catalog_stats(),
+            'plan_writer': writer_stats()}
+
+
+@app.post("/plans")
+async def create_plan(request: PlanRequest):
+    if request.save and request.security_id is None:
+        raise HTTPException(422, "security_id is required to save a plan")
+    user_data = {'income': request.income, 'family_size': request.family_size,
+                 'region': request.region, 'security_level': request.security_level}
+    plan = cached_plan(user_data, request.weekly_budget, request.allergies)
+    if plan is None:
+        plan = await planner_pool.run(_generate, user_data, request.weekly_budget, request.allergies)
+    if 'error' in plan:
+        raise HTTPException(422, plan['error'])
+
+    plan_id = None
+    if request.save:
+        from plan_writer import submit
+
+        plan_id = submit(
+            security_id=request.security_id, security_level=request.security_level,
+            region=request.region, household_size=request.family_size,
+            monthly_income=request.income, weekly_budget=plan['budget']['weekly'],
+            total_weekly_cost=plan['summary']['total_cost'], allergies=request.allergies,
+            meal_plan_data=plan, user_id=request.user_id
+        )
+    return {'plan_id': plan_id, 'plan': plan}
+
+
+@app.get("/plans/pending/{provisional_id}")
+def resolve_plan(provisional_id: str):
+    """Save status of a plan from POST /plans: pending, saved (with its meal_plans.id) or failed"""
+    from plan_writer import status
+
+    result = status(provisional_id)
+    if result['state'] == 'unknown':
+        raise HTTPException(404, f"No save status for '{provisional_id}'")
+    return {'plan_id': provisional_id, **result}
+
+
+@app.post("/plans/swap")
+async def swap_meal(request: SwapRequest):
+    for key in ('meal_plan', 'budget', 'summary', 'user_profile'):
+        if key not in request.plan:
+            raise HTTPException(422, f"plan is missing '{key}'")
+    try:
+        plan = await planner_pool.run(_swap, request.plan, request.day, request.slot, request.allergies)
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(422, str(e))
+    return {'plan': plan}
+
+
+@app.post("/plans/feasibility")
+async def feasibility(request: FeasibilityRequest):
+    return await planner_pool.run(_feasibility, request.weekly_budget, request.family_size,
+                                  request.allergies)
+
+
+@app.post("/assessments/score")
+def score(request: ScoreRequest):
+    income_pp = request.monthly_income / request.household_size
+    try:
+        level, confidence = _predictor.predict_one(income_pp, request.household_size, request.region)
+    except ValueError:
+        raise HTTPException(422, f"Unknown region '{request.region}'")
+    return {
+        'security_level_num': level,
+        'security_level': LEVEL_NAMES[level],
+        'ml_confidence': round(confidence, 1),
+        'income_per_person_monthly': income_pp,
+        'income_per_person_daily': income_pp / 30,
+        'decile': compute_decile(income_pp),
+    }
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the planning service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Planner processes")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help="Seconds per planner call")
+    args = parser.parse_args()
+
+    planner_pool.workers = args.workers
+    planner_pool.timeout = args.timeout
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
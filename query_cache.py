@@ -0,0 +1,138 @@
+"""
+query_cache.py
+Per-user TTL cache for dashboard read queries
+
+Streamlit re-runs the whole page script on every widget interaction, so the
+dashboards would otherwise re-execute the same SELECTs when the user only
+switches a tab. Results are cached per (user_id, query name) for a TTL in
+this process (shared by all sessions), and the pages that write
+(assessment, meal planner) invalidate the affected keys right after their
+INSERT, so readers never see stale data for longer than the write path
+allows. Each key also has a generation that invalidation bumps; a load that
+started before an invalidation (and so may have read the old rows) is
+returned to its caller but not cached.
+
+Usage:
+    stats = cached(user_id, USER_STATS, lambda: conn.execute(...).fetchone())
+    invalidate(user_id, *ASSESSMENT_QUERIES)
+"""
+
+import threading
+import time
+
+DEFAULT_TTL = 300  # seconds; writes invalidate explicitly, the TTL only bounds drift
+MAX_ENTRIES = 10_000
+
+# Query names (keys) used by the pages
+USER_STATS = "user_stats"
+QUICK_STATS = "quick_stats"
+USER_REGIONS = "user_regions"
+ASSESSMENT_HISTORY = "assessment_history"
+RECENT_PLANS = "recent_plans"
+PLAN_TRENDS = "plan_trends"
+
+# Keys a write can make stale
+ASSESSMENT_QUERIES = (USER_STATS, QUICK_STATS, USER_REGIONS, ASSESSMENT_HISTORY)
+MEAL_PLAN_QUERIES = (QUICK_STATS, RECENT_PLANS, PLAN_TRENDS)
+
+
+class QueryCache:
+    """Thread-safe {(user_id, name): (expires_at, value)} with hit-rate counters"""
+
+    def __init__(self, default_ttl=DEFAULT_TTL, max_entries=MAX_ENTRIES):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        # Bumped by invalidate(); (user_id, None) covers all of a user's keys
+        self._generations = {}
+        self._epoch = 0  # bumped by clear()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, user_id, name, loader, ttl=None):
+        """
+        Cached value for (user_id, name), calling loader() on a miss or expiry
+
+        Exceptions from loader propagate and nothing is cached.
+        """
+        key = (user_id, name)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation(key)
+
+        value = loader()
+        with self._lock:
+            if self._generation(key) != generation:
+                return value  # invalidated while loading; the value may predate the write
+            if len(self._entries) >= self.max_entries:
+                self._evict(now)
+            self._entries[key] = (now + (self.default_ttl if ttl is None else ttl), value)
+        return value
+
+    def _generation(self, key):
+        return self._epoch, self._generations.get(key, 0), self._generations.get((key[0], None), 0)
+
+    def _evict(self, now):
+        expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+        if not expired:
+            # Nothing expired: drop the entries closest to expiry
+            expired = sorted(self._entries, key=lambda key: self._entries[key][0])[:len(self._entries) // 10 + 1]
+        for key in expired:
+            del self._entries[key]
+        self.evictions += len(expired)
+
+    def invalidate(self, user_id, *names):
+        """Drop the given query names for a user (all of the user's keys if none given)"""
+        with self._lock:
+            for key in [(user_id, name) for name in names] or [(user_id, None)]:
+                self._generations[key] = self._generations.get(key, 0) + 1
+            keys = ([(user_id, name) for name in names] if names
+                    else [key for key in self._entries if key[0] == user_id])
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._generations.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'invalidations': self.invalidations,
+            'evictions': self.evictions,
+        }
+
+
+_cache = QueryCache()
+
+
+def get_query_cache():
+    """The process-wide cache"""
+    return _cache
+
+
+def cached(user_id, name, loader, ttl=None):
+    return _cache.get(user_id, name, loader, ttl)
+
+
+def invalidate(user_id, *names):
+    _cache.invalidate(user_id, *names)
+
+
+def cache_stats():
+    return _cache.stats()
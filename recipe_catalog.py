@@ -0,0 +1,88 @@
+"""
+recipe_catalog.py
+Versioned recipe catalog (Module 2)
+
+The meal planner picks recipes from REAL_RECIPE_COSTS_REALISTIC_2026.csv.
+The catalog assigns each recipe a small integer id and its cost per person
+in integer centavos, and is published to the model registry as a JSON
+artifact, so its version is the content hash. Stored meal plans reference
+recipes by (catalog version, id) and are resolved against that exact
+catalog at read time, even after the CSV changes and a new catalog is
+published.
+
+Usage:
+    python recipe_catalog.py          # publish the catalog for the current CSV
+"""
+
+from data_assets import load_csv
+from model_registry import get_registry, publish
+
+CATALOG_ARTIFACT = "recipe_catalog"
+RECIPES_PATH = "REAL_RECIPE_COSTS_REALISTIC_2026.csv"
+
+
+def to_centavos(pesos):
+    return int(round(float(pesos) * 100))
+
+
+class RecipeCatalog:
+    """Recipe names and costs (centavos) by id for one catalog version"""
+
+    def __init__(self, version, recipes):
+        self.version = version
+        self.names = [name for name, _ in recipes]
+        self.costs = [cost for _, cost in recipes]
+        self._ids = {name: recipe_id for recipe_id, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def id_of(self, name):
+        """Recipe id for a name, or None if the catalog doesn't have it"""
+        return self._ids.get(name)
+
+
+def build_catalog(path=RECIPES_PATH):
+    """Catalog artifact for a recipe CSV (ids follow CSV row order)"""
+    recipes = load_csv(path, columns=['recipe', 'cost_per_person'])
+    return {
+        'source': path,
+        'recipes': [[name, to_centavos(cost)] for name, cost in recipes.itertuples(index=False)],
+    }
+
+
+def publish_catalog(path=RECIPES_PATH):
+    """Publish the catalog for path; unchanged content maps to the existing version"""
+    catalog = build_catalog(path)
+    return publish(CATALOG_ARTIFACT, catalog, fmt='json',
+                   metadata={'recipes': len(catalog['recipes']), 'source': path})
+
+
+_catalogs = {}
+
+
+def get_catalog(version=None):
+    """
+    Catalog by version (default: current), cached per process
+
+    Raises:
+        FileNotFoundError: If no catalog (or that version) is published
+    """
+    registry = get_registry()
+    version = version or registry.current_version(CATALOG_ARTIFACT)
+    if version is None:
+        raise FileNotFoundError(f"No '{CATALOG_ARTIFACT}' published. Run: python recipe_catalog.py")
+    catalog = _catalogs.get(version)
+    if catalog is None:
+        artifact = registry.load_artifact(CATALOG_ARTIFACT, version)
+        catalog = _catalogs[version] = RecipeCatalog(version, artifact['recipes'])
+    return catalog
+
+
+def main():
+    version = publish_catalog()
+    print(f"✅ {CATALOG_ARTIFACT} {version} ({len(get_catalog(version))} recipes from {RECIPES_PATH})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+regional_context.py
+Process-level cache of the regional context views behind dashboard.py's charts
+
+The poverty and food-price tabs show the same 17-row CSV sorted two ways,
+with an Altair bar chart each. Streamlit re-runs the page on every
+interaction, so they used to reload the file, sort it and rebuild and
+serialize both chart specs each time. Here each metric's sorted frame,
+display table, summary numbers and Vega-Lite spec (already a dict, for
+st.vega_lite_chart) are built once per process and shared by all
+sessions. They are rebuilt when the CSV changes, checked by mtime/size at
+most every CHECK_INTERVAL seconds, so a rerun does no file I/O or sorting.
+
+Views are shared: treat the frames as read-only.
+
+Usage:
+    view = regional_view('poverty_pct')
+    st.vega_lite_chart(view.chart_spec, use_container_width=True)
+    view.sorted.iloc[0]['region'], view.mean, view.table
+"""
+
+import os
+import threading
+import time
+
+import altair as alt
+
+from data_assets import load_csv
+
+REGIONAL_CONTEXT_PATH = "data/module1_regional_context.csv"
+CHECK_INTERVAL = 5.0  # seconds between file change checks
+
+# Metric column -> chart and table labels
+METRICS = {
+    'poverty_pct': {'axis': 'Poverty Rate (%)', 'legend': 'Poverty %', 'scheme': 'reds',
+                    'column': 'Poverty Rate (%)'},
+    'food_cpi_ave': {'axis': 'Food Price Index (CPI)', 'legend': 'CPI', 'scheme': 'oranges',
+                     'column': 'Food CPI'},
+}
+
+
+class RegionalView:
+    """One metric's precomputed view of the regional context"""
+
+    __slots__ = ('metric', 'sorted', 'table', 'mean', 'chart_spec')
+
+    def __init__(self, data, metric):
+        labels = METRICS[metric]
+        self.metric = metric
+        # Highest first
+        self.sorted = data.sort_values(metric, ascending=False).reset_index(drop=True)
+        self.table = self.sorted[['region', metric]].set_axis(['Region', labels['column']], axis=1)
+        self.mean = float(data[metric].mean())
+        self.chart_spec = alt.Chart(self.sorted).mark_bar().encode(
+            y=alt.Y('region:N', title='Region', sort='-x'),
+            x=alt.X(f'{metric}:Q', title=labels['axis']),
+            color=alt.Color(f'{metric}:Q',
+                            scale=alt.Scale(scheme=labels['scheme']),
+                            title=labels['legend']),
+            tooltip=['region:N', alt.Tooltip(f'{metric}:Q', format='.1f')]
+        ).properties(
+            height=500,
+            width=800
+        ).to_dict()
+
+
+class RegionalContextCache:
+    """Views of one regional context CSV, rebuilt when the file changes"""
+
+    def __init__(self, path=REGIONAL_CONTEXT_PATH, check_interval=CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked_at = 0.0
+        self._views = {}
+        self.builds = 0
+
+    def _current(self):
+        now = time.monotonic()
+        if self._views and now - self._checked_at < self.check_interval:
+            return self._views
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature != self._signature:
+            data = load_csv(self.path)
+            self._views = {metric: RegionalView(data, metric) for metric in METRICS}
+            self._signature = signature
+            self.builds += 1
+        self._checked_at = now
+        return self._views
+
+    def view(self, metric):
+        """
+        Precomputed view for one metric column
+
+        Raises:
+            FileNotFoundError: If the CSV doesn't exist
+        """
+        with self._lock:
+            return self._current()[metric]
+
+    def invalidate(self):
+        with self._lock:
+            self._signature = None
+            self._views = {}
+
+
+_cache = RegionalContextCache()
+
+
+def regional_view(metric):
+    return _cache.view(metric)
+
+
+def invalidate():
+    _cache.invalidate()
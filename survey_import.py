@@ -0,0 +1,291 @@
+"""
+survey_import.py
+Bulk import of partner survey datasets into security_survey (Module 1)
+
+Instead of replaying the assessment form row by row, the CSV is streamed
+through COPY into a session-local staging table (every column as text, so a
+malformed value is reported instead of aborting the load). One set-based
+statement then validates the rows and derives what the form computes:
+income_per_person_monthly, income_per_person_daily and decile (width_bucket
+over the same thresholds as food_security.compute_decile). Valid rows are
+merged into security_survey in row-ordered batches, one transaction each, so
+locks and WAL per commit stay bounded and an interrupted import can be
+resumed with --resume-after. The user_stats rollup is updated once per merge
+statement, not per row (statement-level trigger, migrations/0008), so a
+batch for a single --user-id doesn't queue on that user's rollup row.
+
+Client memory is one read buffer whatever the file size; all row work
+happens in Postgres. Imported rows are left unscored (ml_predicted_at NULL);
+--score runs bulk_scoring's database backlog right after.
+
+Usage:
+    python survey_import.py partner.csv
+    python survey_import.py partner.csv --user-id 12 --batch-size 50000 --score
+    python survey_import.py partner.csv --resume-after 400000
+
+Input CSV columns: region, household_size, monthly_income
+Optional: user_id, worried_food, healthy_food, skip_meals, created_at
+(other columns are loaded into staging and ignored)
+"""
+
+import argparse
+import csv
+import time
+
+from sqlalchemy import text
+
+from bulk_scoring import REQUIRED_COLUMNS
+from food_security import DECILE_THRESHOLDS
+
+DEFAULT_BATCH_SIZE = 50_000
+COPY_CHUNK_BYTES = 1 << 20
+
+STAGING_TABLE = "survey_import_staging"
+ROWS_TABLE = "survey_import_rows"
+
+_NUMBER = r'^\s*[0-9]+(\.[0-9]+)?\s*$'
+_INTEGER = r'^\s*[0-9]+\s*$'
+
+# NULL instead of an error for text that isn't a timestamp, so one bad
+# created_at rejects its row rather than aborting the derive statement
+_TRY_TIMESTAMP = """
+    CREATE OR REPLACE FUNCTION pg_temp.survey_import_timestamp(value TEXT) RETURNS TIMESTAMP AS $$
+    BEGIN
+        RETURN CAST(value AS TIMESTAMP);
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql STABLE
+"""
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def read_header(path, delimiter=','):
+    """CSV header, checked for the required columns"""
+    if len(delimiter) != 1 or delimiter in "'\"\r\n":
+        raise ValueError(f"Unsupported delimiter: {delimiter!r}")
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        header = next(csv.reader(f, delimiter=delimiter), [])
+    header = [column.strip() for column in header]
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    if len(set(header)) != len(header):
+        raise ValueError("Duplicate column names in header")
+    return header
+
+
+def copy_to_staging(conn, path, header, delimiter=','):
+    """
+    Stream the CSV into a TEMP staging table with COPY
+
+    Returns:
+        int: Rows loaded
+    """
+    conn.execute(text(f"DROP TABLE IF EXISTS {STAGING_TABLE}"))
+    conn.execute(text(
+        f"CREATE TEMP TABLE {STAGING_TABLE} (row_no BIGSERIAL, "
+        + ", ".join(f"{_quote(column)} TEXT" for column in header) + ")"
+    ))
+    copy_sql = (
+        f"COPY {STAGING_TABLE} ({', '.join(_quote(column) for column in header)}) "
+        f"FROM STDIN WITH (FORMAT csv, HEADER true, DELIMITER '{delimiter}')"
+    )
+
+    cursor = conn.connection.cursor()
+    try:
+        with open(path, encoding='utf-8-sig') as f:
+            if hasattr(cursor, 'copy_expert'):  # psycopg2 reads the file in chunks itself
+                cursor.copy_expert(copy_sql, f, size=COPY_CHUNK_BYTES)
+            else:                               # psycopg 3
+                with cursor.copy(copy_sql) as copy:
+                    while chunk := f.read(COPY_CHUNK_BYTES):
+                        copy.write(chunk)
+    finally:
+        cursor.close()
+    return conn.execute(text(f"SELECT COUNT(*) FROM {STAGING_TABLE}")).scalar()
+
+
+def derive_rows(conn, header, default_user_id=None):
+    """
+    Validate staged rows and derive the form's computed columns in one statement
+
+    Returns:
+        tuple: (valid_rows, rejected_rows)
+    """
+    def optional(column, cast, pattern=None):
+        if column not in header:
+            return "NULL"
+        value = f"NULLIF(btrim(s.{_quote(column)}), '')"
+        if pattern:
+            value = f"CASE WHEN {value} ~ '{pattern}' THEN {value} END"
+        return f"CAST({value} AS {cast})"
+
+    user_id = optional('user_id', 'integer', _INTEGER)
+    created_at_text, created_at = "CAST(NULL AS text)", "CAST(NULL AS timestamp)"
+    if 'created_at' in header:
+        conn.exec_driver_sql(_TRY_TIMESTAMP, execution_options={"no_parameters": True})
+        created_at_text = "NULLIF(btrim(s.created_at), '')"
+        created_at = f"pg_temp.survey_import_timestamp({created_at_text})"
+    conn.execute(text(f"DROP TABLE IF EXISTS {ROWS_TABLE}"))
+    conn.execute(text(f"""
+        CREATE TEMP TABLE {ROWS_TABLE} AS
+        SELECT v.row_no, v.user_id, v.region, v.household_size, v.monthly_income,
+               v.monthly_income / NULLIF(v.household_size, 0) AS income_pp,
+               v.monthly_income / NULLIF(v.household_size, 0) / 30 AS income_daily,
+               width_bucket(v.monthly_income / NULLIF(v.household_size, 0), CAST(:thresholds AS float8[])) + 1
+                   AS decile,
+               v.worried_food, v.healthy_food, v.skip_meals, v.created_at,
+               COALESCE(v.region IS NOT NULL AND v.household_size > 0 AND v.monthly_income IS NOT NULL
+                        AND (v.created_at_text IS NULL OR v.created_at IS NOT NULL)
+                        AND (v.user_id IS NULL OR EXISTS (SELECT 1 FROM users u WHERE u.id = v.user_id)),
+                        false) AS valid
+        FROM (
+            SELECT s.row_no,
+                   COALESCE({user_id}, CAST(:default_user_id AS integer)) AS user_id,
+                   NULLIF(btrim(s.region), '') AS region,
+                   CASE WHEN s.household_size ~ '{_NUMBER}' THEN CAST(s.household_size AS float8) END
+                       AS household_size,
+                   CASE WHEN s.monthly_income ~ '{_NUMBER}' THEN CAST(s.monthly_income AS numeric(12, 2)) END
+                       AS monthly_income,
+                   {optional('worried_food', 'text')} AS worried_food,
+                   {optional('healthy_food', 'text')} AS healthy_food,
+                   {optional('skip_meals', 'text')} AS skip_meals,
+                   {created_at_text} AS created_at_text,
+                   {created_at} AS created_at
+            FROM {STAGING_TABLE} s
+        ) v
+    """), {"thresholds": [float(t) for t in DECILE_THRESHOLDS], "default_user_id": default_user_id})
+    conn.execute(text(f"CREATE INDEX ON {ROWS_TABLE} (row_no) WHERE valid"))
+    conn.execute(text(f"ANALYZE {ROWS_TABLE}"))
+    counts = conn.execute(text(f"""
+        SELECT COUNT(*) FILTER (WHERE valid), COUNT(*) FILTER (WHERE NOT valid) FROM {ROWS_TABLE}
+    """)).fetchone()
+    return int(counts[0]), int(counts[1])
+
+
+def rejected_rows(conn, limit=10):
+    """First rejected staging rows (row number and raw values), for the report"""
+    return conn.execute(text(f"""
+        SELECT s.row_no, s.region, s.household_size, s.monthly_income, r.created_at_text
+        FROM {ROWS_TABLE} r JOIN {STAGING_TABLE} s ON s.row_no = r.row_no
+        WHERE NOT r.valid ORDER BY r.row_no LIMIT :limit
+    """), {"limit": limit}).fetchall()
+
+
+def merge_batch(conn, after_row, batch_size):
+    """
+    Insert the next batch of valid rows into security_survey
+
+    Returns:
+        tuple: (rows_inserted, last row_no merged, or None when done)
+    """
+    last_row = conn.execute(text(f"""
+        SELECT MAX(row_no) FROM (
+            SELECT row_no FROM {ROWS_TABLE} WHERE valid AND row_no > :after ORDER BY row_no LIMIT :limit
+        ) batch
+    """), {"after": after_row, "limit": batch_size}).scalar()
+    if last_row is None:
+        return 0, None
+    result = conn.execute(text(f"""
+        INSERT INTO security_survey (
+            user_id, region, household_size, monthly_income,
+            income_per_person_monthly, income_per_person_daily,
+            worried_food, healthy_food, skip_meals, decile, created_at
+        )
+        SELECT user_id, region, household_size, monthly_income,
+               income_pp, income_daily,
+               worried_food, healthy_food, skip_meals, decile, COALESCE(created_at, now())
+        FROM {ROWS_TABLE}
+        WHERE valid AND row_no > :after AND row_no <= :last
+        ORDER BY row_no
+    """), {"after": after_row, "last": last_row})
+    return result.rowcount, last_row
+
+
+def import_surveys(path, engine=None, batch_size=DEFAULT_BATCH_SIZE, default_user_id=None,
+                   resume_after=0, delimiter=','):
+    """
+    Load a survey CSV into security_survey
+
+    Args:
+        resume_after (int): Skip CSV data rows up to this row number (1-based),
+            as printed by an interrupted run
+
+    Returns:
+        dict: loaded / inserted / rejected counts and per-phase seconds
+    """
+    if engine is None:
+        from db import engine
+
+    header = read_header(path, delimiter)
+    timings = {}
+    with engine.connect() as conn:
+        start = time.perf_counter()
+        loaded = copy_to_staging(conn, path, header, delimiter)
+        conn.commit()
+        timings['copy_s'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        valid, rejected = derive_rows(conn, header, default_user_id)
+        conn.commit()
+        timings['derive_s'] = time.perf_counter() - start
+        print(f"  📥 Staged {loaded:,} rows ({valid:,} valid, {rejected:,} rejected)")
+        for row in rejected_rows(conn):
+            print(f"  ⚠️ row {row.row_no}: region={row.region!r} household_size={row.household_size!r} "
+                  f"monthly_income={row.monthly_income!r}"
+                  + (f" created_at={row.created_at_text!r}" if row.created_at_text is not None else ""))
+
+        start = time.perf_counter()
+        inserted = 0
+        after_row = resume_after
+        while True:
+            count, last_row = merge_batch(conn, after_row, batch_size)
+            if last_row is None:
+                break
+            conn.commit()
+            inserted += count
+            after_row = last_row
+            print(f"  ✅ Merged {inserted:,} rows (through row {after_row:,})")
+        timings['merge_s'] = time.perf_counter() - start
+
+        conn.execute(text(f"DROP TABLE IF EXISTS {ROWS_TABLE}, {STAGING_TABLE}"))
+        conn.commit()
+
+    return {'loaded': loaded, 'inserted': inserted, 'rejected': rejected,
+            **{key: round(value, 2) for key, value in timings.items()}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk survey import via COPY")
+    parser.add_argument("csv", help="Survey CSV to import")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per merge transaction")
+    parser.add_argument("--user-id", type=int, help="user_id for rows without one")
+    parser.add_argument("--resume-after", type=int, default=0, help="Skip rows already merged by a previous run")
+    parser.add_argument("--delimiter", default=',')
+    parser.add_argument("--score", action="store_true", help="Score the imported rows afterwards")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    print(f"📥 Importing {args.csv}...")
+    result = import_surveys(args.csv, batch_size=args.batch_size, default_user_id=args.user_id,
+                            resume_after=args.resume_after, delimiter=args.delimiter)
+    print(f"✅ Imported {result['inserted']:,} of {result['loaded']:,} rows"
+          + (f", ⚠️ {result['rejected']:,} rejected" if result['rejected'] else "")
+          + f" (copy {result['copy_s']}s, derive {result['derive_s']}s, merge {result['merge_s']}s)")
+
+    if args.score:
+        from bulk_scoring import score_database_backlog
+
+        print("📥 Scoring imported rows...")
+        scored, skipped = score_database_backlog()
+        print(f"✅ Scored {scored:,} rows" + (f", ⚠️ {skipped:,} skipped (unknown region)" if skipped else ""))
+
+    print(f"⏱️ Done in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+test_migrations.py
+Apply the migrations to a scratch schema and check the pages' hot queries use their indexes
+
+Needs a local Postgres (TEST_DATABASE_URL, else db.DATABASE_URL); skipped otherwise.
+Run: python -m pytest test_migrations.py -q
+"""
+
+import os
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from migrate import discover, migrate
+
+SEED_USERS = 2_000
+SEED_SURVEYS_PER_USER = 25
+
+HOT_QUERIES = {
+    'login': ("users", "users_username_key", """
+        SELECT id, username FROM users WHERE username = 'user42' AND password_hash = 'x'
+    """),
+    'register_duplicate_check': ("users", "users_email_key", """
+        SELECT 1 FROM users WHERE username = 'user42' OR email = 'user42@example.com'
+    """),
+    'assessment_history': ("security_survey", "security_survey_user_created_id_idx", """
+        SELECT id, security_level, region, income_per_person_monthly, household_size,
+               decile, ml_predicted_at, created_at
+        FROM security_survey WHERE user_id = 42 ORDER BY created_at DESC, id DESC LIMIT 11
+    """),
+    'assessment_history_seek': ("security_survey", "security_survey_user_created_id_idx", """
+        SELECT id, security_level, region, income_per_person_monthly, household_size,
+               decile, ml_predicted_at, created_at
+        FROM security_survey
+        WHERE user_id = 42 AND (created_at, id) < (now() - interval '12 days', 2147483647)
+        ORDER BY created_at DESC, id DESC LIMIT 11
+    """),
+    'dashboard_user_stats': ("security_survey", "security_survey_user_created_id_idx", """
+        SELECT COUNT(*), AVG(income_per_person_monthly)
+        FROM security_survey WHERE user_id = 42
+    """),
+    'unscored_backlog': ("security_survey", "security_survey_unscored_idx", """
+        SELECT id, region, household_size, monthly_income FROM security_survey
+        WHERE ml_predicted_at IS NULL AND id > 0 ORDER BY id LIMIT 1000
+    """),
+    'quick_stats': ("user_stats", "user_stats_pkey", """
+        SELECT assessments, meal_plans, income_pp_sum / NULLIF(income_pp_count, 0), secure_count
+        FROM user_stats WHERE user_id = 42
+    """),
+    'recent_meal_plans': ("meal_plans", "meal_plans_security_week_idx", """
+        SELECT id, week_start, region, household_size, weekly_budget, total_weekly_cost, created_at
+        FROM meal_plans
+        WHERE security_id IN (SELECT id FROM security_survey WHERE user_id = 42)
+        ORDER BY week_start DESC LIMIT 3
+    """),
+    'meal_plan_history_seek': ("meal_plans", "meal_plans_user_week_idx", """
+        SELECT id, week_start, region, household_size, weekly_budget, total_weekly_cost, created_at
+        FROM meal_plans
+        WHERE user_id = 42 AND (week_start, id) < (current_date - 12, 2147483647)
+        ORDER BY week_start DESC, id DESC LIMIT 4
+    """),
+}
+
+
+@pytest.fixture(scope="module")
+def scratch_engine():
+    schema = f"migration_test_{uuid.uuid4().hex[:8]}"
+    try:
+        from db import DATABASE_URL
+
+        url = os.getenv("TEST_DATABASE_URL", DATABASE_URL)
+        admin = create_engine(url)
+        with admin.begin() as conn:
+            conn.execute(text(f"CREATE SCHEMA {schema}"))
+    except Exception as e:
+        pytest.skip(f"Postgres not available: {e}")
+
+    engine = create_engine(url, connect_args={"options": f"-csearch_path={schema}"})
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        admin.dispose()
+
+
+@pytest.fixture(scope="module")
+def seeded_engine(scratch_engine):
+    migrate(scratch_engine)
+    with scratch_engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO users (username, email, password_hash)
+            SELECT 'user' || g, 'user' || g || '@example.com', md5(g::text)
+            FROM generate_series(1, :n) g
+        """), {"n": SEED_USERS})
+        conn.execute(text("""
+            INSERT INTO security_survey (user_id, region, household_size, monthly_income,
+                                         income_per_person_monthly, security_level, ml_predicted_at,
+                                         created_at)
+            SELECT u, 'Region ' || (u % 17), 4, 20000, 5000, 'Secure',
+                   CASE WHEN s % 10 = 0 THEN NULL ELSE now() END,
+                   now() - s * interval '1 day'
+            FROM generate_series(1, :users) u, generate_series(1, :per_user) s
+        """), {"users": SEED_USERS, "per_user": SEED_SURVEYS_PER_USER})
+        conn.execute(text("""
+            INSERT INTO meal_plans (user_id, security_id, region, household_size, week_start,
+                                    weekly_budget, total_weekly_cost, status)
+            SELECT user_id, id, region, household_size, created_at::date, 2000, 1800, 'Generated'
+            FROM security_survey
+        """))
+    with scratch_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE users, security_survey, meal_plans"))
+    return scratch_engine
+
+
+def test_migrations_apply_once(scratch_engine):
+    migrate(scratch_engine)
+    assert migrate(scratch_engine) == []
+    with scratch_engine.connect() as conn:
+        versions = [row[0] for row in conn.execute(text("SELECT version FROM schema_migrations ORDER BY version"))]
+    assert versions == [m.version for m in discover()]
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(seeded_engine, name):
+    table, index, query = HOT_QUERIES[name]
+    with seeded_engine.connect() as conn:
+        plan = "\n".join(row[0] for row in conn.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + query)))
+    assert f"Seq Scan on {table}" not in plan, plan
+    assert index in plan, plan
+
+
+def test_user_stats_rollup_matches_history(seeded_engine):
+    with seeded_engine.begin() as conn:
+        # Re-score one assessment and drop one plan: both must be reflected
+        conn.execute(text("""
+            UPDATE security_survey SET security_level = 'Severely Insecure'
+            WHERE id = (SELECT MIN(id) FROM security_survey WHERE user_id = 42)
+        """))
+        conn.execute(text("""
+            DELETE FROM meal_plans WHERE id = (
+                SELECT MAX(m.id) FROM meal_plans m JOIN security_survey s ON s.id = m.security_id
+                WHERE s.user_id = 42
+            )
+        """))
+        expected = conn.execute(text("""
+            SELECT s.user_id, COUNT(*),
+                   COUNT(*) FILTER (WHERE s.security_level = 'Secure'),
+                   COUNT(*) FILTER (WHERE s.security_level = 'Severely Insecure'),
+                   SUM(s.income_per_person_monthly),
+                   (SELECT COUNT(*) FROM meal_plans m JOIN security_survey x ON x.id = m.security_id
+                    WHERE x.user_id = s.user_id)
+            FROM security_survey s WHERE s.user_id IN (1, 42, 1999)
+            GROUP BY s.user_id ORDER BY s.user_id
+        """)).fetchall()
+        rollup = conn.execute(text("""
+            SELECT user_id, assessments, secure_count, severely_count, income_pp_sum, meal_plans
+            FROM user_stats WHERE user_id IN (1, 42, 1999) ORDER BY user_id
+        """)).fetchall()
+    assert [tuple(row) for row in rollup] == [tuple(row) for row in expected]
+
+
+def test_user_stats_counts_bulk_inserts_once_per_user(seeded_engine):
+    # Never committed: closing the connection rolls everything back
+    with seeded_engine.connect() as conn:
+        before = dict(conn.execute(text(
+            "SELECT user_id, assessments FROM user_stats WHERE user_id IN (3, 4)")).fetchall())
+        conn.execute(text("""
+            INSERT INTO security_survey (user_id, region, household_size, monthly_income,
+                                         income_per_person_monthly, security_level)
+            SELECT 3 + g % 2, 'Region 1', 4, 8000, 2000, 'Mildly Insecure' FROM generate_series(1, 101) g
+        """))
+        after = conn.execute(text("""
+            SELECT user_id, assessments, mildly_count, last_security_id FROM user_stats
+            WHERE user_id IN (3, 4) ORDER BY user_id
+        """)).fetchall()
+        last_ids = dict(conn.execute(text(
+            "SELECT user_id, MAX(id) FROM security_survey WHERE user_id IN (3, 4) GROUP BY user_id")).fetchall())
+    assert [tuple(row) for row in after] == [
+        (3, before[3] + 50, 50, last_ids[3]),
+        (4, before[4] + 51, 51, last_ids[4]),
+    ]
+
+
+def test_user_stats_repoints_last_plan_to_plans_without_a_survey(seeded_engine):
+    # Never committed: closing the connection rolls everything back
+    with seeded_engine.connect() as conn:
+        def add_plan(week_start):
+            return conn.execute(text("""
+                INSERT INTO meal_plans (user_id, security_id, week_start, status)
+                VALUES (7, NULL, :w, 'Generated') RETURNING id
+            """), {"w": week_start}).scalar()
+
+        older, newer = add_plan('2100-01-01'), add_plan('2100-01-08')
+        plans_before = conn.execute(text("SELECT meal_plans FROM user_stats WHERE user_id = 7")).scalar()
+        conn.execute(text("DELETE FROM meal_plans WHERE id = :id"), {"id": newer})
+        row = conn.execute(text("SELECT meal_plans, last_plan_id FROM user_stats WHERE user_id = 7")).fetchone()
+        # Removing a survey of a user without a rollup row must not create one
+        conn.execute(text("DELETE FROM user_stats WHERE user_id = 8"))
+        conn.execute(text("DELETE FROM security_survey WHERE id = (SELECT MIN(id) FROM security_survey WHERE user_id = 8)"))
+        orphan = conn.execute(text("SELECT COUNT(*) FROM user_stats WHERE user_id = 8")).scalar()
+    assert tuple(row) == (plans_before - 1, older)
+    assert orphan == 0
+
+
+def test_meal_plan_items_aggregate_like_plan_json(seeded_engine):
+    from meal_plan_store import daily_totals, insert_meal_plan
+
+    plan = {
+        'budget': {'weekly': 700.0, 'daily_per_person': 25.0},
+        'meal_plan': {
+            'Monday': {'breakfast': {'name': 'Champorado', 'cost': 8.5},
+                       'lunch': {'name': 'Adobong Kangkong', 'cost': 12.25},
+                       'dinner': {'name': 'Not planned (budget limit)', 'cost': 0.0}},
+            'Tuesday': {'breakfast': {'name': 'Lugaw', 'cost': 6.0},
+                        'lunch': {'name': 'Ginisang Monggo', 'cost': 10.0},
+                        'dinner': {'name': 'Tortang Talong', 'cost': 7.75}},
+        },
+    }
+    with seeded_engine.begin() as conn:
+        security_id = conn.execute(text("SELECT MIN(id) FROM security_survey WHERE user_id = 7")).scalar()
+        plan_id = insert_meal_plan(conn, security_id, 'Secure', 'Region 7', 4, 20000, 700, 400, [], plan)
+        totals = {row.day: float(row.cost_per_person) for row in daily_totals(conn, [plan_id])}
+        stored = conn.execute(text("""
+            SELECT jsonb_typeof(b.body) FROM meal_plans m JOIN plan_bodies b ON b.hash = m.plan_hash
+            WHERE m.id = :id
+        """), {"id": plan_id}).scalar()
+    assert totals == {1: 20.75, 2: 23.75}
+    assert stored == 'object'
+
+
+def test_identical_plans_share_one_body(seeded_engine):
+    from meal_plan_store import insert_meal_plan
+
+    plan = {'meal_plan': {'Monday': {'breakfast': {'name': 'Lugaw', 'cost': 6.0}}}}
+    with seeded_engine.begin() as conn:
+        bodies_before = conn.execute(text("SELECT COUNT(*) FROM plan_bodies")).scalar()
+        security_ids = conn.execute(text("SELECT id FROM security_survey WHERE user_id = 9 LIMIT 2")).scalars().all()
+        plan_ids = [insert_meal_plan(conn, sid, 'Secure', 'Region 9', 4, 20000 + sid, 700, 24, [], plan)
+                    for sid in security_ids]
+        hashes = conn.execute(text("SELECT DISTINCT plan_hash FROM meal_plans WHERE id = ANY(:ids)"),
+                              {"ids": plan_ids}).scalars().all()
+        bodies_after = conn.execute(text("SELECT COUNT(*) FROM plan_bodies")).scalar()
+    assert len(hashes) == 1
+    assert bodies_after == bodies_before + 1
+
+
+def test_plan_writer_batches_and_resolves(seeded_engine):
+    from plan_writer import PlanWriter
+
+    writer = PlanWriter(engine=seeded_engine, max_wait=0.5)
+    with seeded_engine.connect() as conn:
+        security_ids = conn.execute(text("SELECT id FROM security_survey WHERE user_id = 11 LIMIT 5")).scalars().all()
+    plan = {'meal_plan': {'Monday': {'breakfast': {'name': 'Lugaw', 'cost': 6.0}}}}
+    provisional = [writer.submit(security_id=sid, security_level='Secure', region='Region 11', household_size=4,
+                                 monthly_income=20000, weekly_budget=700, total_weekly_cost=6,
+                                 allergies=[], meal_plan_data=plan, user_id=11)
+                   for sid in security_ids]
+    assert writer.close(timeout=30)
+    plan_ids = [writer.resolve(p) for p in provisional]
+    assert None not in plan_ids
+    with seeded_engine.connect() as conn:
+        items = conn.execute(text("SELECT COUNT(*) FROM meal_plan_items WHERE plan_id = ANY(:ids)"),
+                             {"ids": plan_ids}).scalar()
+    assert items == len(security_ids)
+    assert writer.stats()['batches'] == 1
+
+
+def test_survey_import_matches_form_derivation(seeded_engine, tmp_path):
+    from food_security import compute_decile
+    from survey_import import import_surveys
+
+    path = tmp_path / "partner.csv"
+    path.write_text(
+        "region,household_size,monthly_income,skip_meals,extra\n"
+        "Region 1,4,3999.99,No,x\n"
+        "Region 2,3,30000,Yes,x\n"
+        "Region 3,0,1000,No,x\n"        # rejected: household_size 0
+        "Region 4,two,1000,No,x\n"      # rejected: not a number
+        "Region 5,5,50000,No,x\n"
+    )
+    result = import_surveys(str(path), engine=seeded_engine, batch_size=2, default_user_id=5)
+    assert (result['loaded'], result['inserted'], result['rejected']) == (5, 3, 2)
+    with seeded_engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT household_size, monthly_income, income_per_person_monthly, income_per_person_daily, decile
+            FROM security_survey WHERE user_id = 5 AND region IN ('Region 1', 'Region 2', 'Region 5')
+              AND skip_meals IS NOT NULL ORDER BY id
+        """)).fetchall()
+    assert len(rows) == 3
+    for size, income, income_pp, income_daily, decile in rows:
+        assert income_pp == pytest.approx(float(income) / size)
+        assert income_daily == pytest.approx(float(income) / size / 30)
+        assert decile == compute_decile(float(income) / size)
+
+
+def test_survey_import_rejects_malformed_created_at(seeded_engine, tmp_path):
+    from survey_import import import_surveys
+
+    path = tmp_path / "dated.csv"
+    path.write_text(
+        "region,household_size,monthly_income,created_at\n"
+        "Region 1,4,4000,2024-03-01 08:30\n"
+        "Region 1,4,4000,\n"               # no date: defaults to now()
+        "Region 1,4,4000,2024-02-30\n"     # rejected: no such day
+        "Region 1,4,4000,last tuesday\n"   # rejected: not a timestamp
+    )
+    result = import_surveys(str(path), engine=seeded_engine, default_user_id=6)
+    assert (result['loaded'], result['inserted'], result['rejected']) == (4, 2, 2)
+
+
+def test_export_streams_and_resumes(seeded_engine, tmp_path):
+    import gzip
+    import json
+
+    from data_export import export, read_cursor
+
+    path = str(tmp_path / "plans.jsonl.gz")
+    first, last_id = export('meal_plans', path, region='Region 3', batch_size=500, engine=seeded_engine)
+    assert read_cursor(path)['complete']
+    with seeded_engine.connect() as conn:
+        expected = conn.execute(text("SELECT COUNT(*), MAX(id) FROM meal_plans WHERE region = 'Region 3'")).fetchone()
+    assert (first, last_id) == tuple(expected)
+
+    # Resuming mid-way appends only the rows after the saved keyset position
+    half = str(tmp_path / "half.jsonl.gz")
+    export('meal_plans', half, region='Region 3', engine=seeded_engine)
+    with gzip.open(half, 'rt') as f:
+        ids = [json.loads(line)['id'] for line in f]
+    with gzip.open(half, 'wt') as f:
+        f.writelines(json.dumps({'id': i}) + "\n" for i in ids[:100])
+    cursor = {'kind': 'meal_plans', 'filters': {'region': 'Region 3', 'since': None, 'until': None},
+              'fmt': 'jsonl', 'compress': True, 'with_plan': False,
+              'last_id': ids[99], 'rows': 100, 'offset': os.path.getsize(half), 'complete': False}
+    with open(half + ".cursor", 'w') as f:
+        json.dump(cursor, f)
+    with open(half, 'ab') as f:
+        f.write(gzip.compress(b'{"id": -1}\n{"id"')[:-5])  # a batch torn by a crash
+    with pytest.raises(ValueError):
+        export('meal_plans', half, region='Region 3', resume=True, with_plan=True, engine=seeded_engine)
+    export('meal_plans', half, region='Region 3', resume=True, engine=seeded_engine)
+    with gzip.open(half, 'rt') as f:
+        assert [json.loads(line)['id'] for line in f] == ids
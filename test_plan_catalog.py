@@ -0,0 +1,49 @@
+"""
+test_plan_catalog.py
+Precomputed plan lookups: nearest lower budget, allergy sets, fallbacks
+
+Run: python -m pytest test_plan_catalog.py -q
+"""
+
+from plan_catalog import PlanCatalog, allergy_key, budget_grid
+
+
+def _catalog():
+    budgets = [2000, 3000, 4000]
+    return PlanCatalog('test', {
+        'recipe_catalog': 'cat',
+        'step_pct': 10.0,
+        'budgets_c': budgets,
+        'allergy_sets': {'': 'all', 'fish': 'nofish', 'fish|soy': 'nofish'},
+        'pools': {
+            'all': {'allergies': [], 'plans': [[[0, 1, 1900, -1, 0, -1, 0]], None, [[0, 2, 3900, -1, 0, -1, 0]]]},
+            'nofish': {'allergies': ['Fish'], 'plans': [None, None, None]},
+        },
+    })
+
+
+def test_budget_grid_is_geometric_and_covers_the_range():
+    grid = budget_grid(10, 20, 10)
+    assert grid[0] == 1000 and grid[-1] <= 2000
+    assert all(b / a >= 1.09 for a, b in zip(grid, grid[1:]))
+
+
+def test_allergy_key_ignores_order_and_case():
+    assert allergy_key(['Soy', 'fish']) == allergy_key(['FISH', 'soy']) == 'fish|soy'
+    assert allergy_key([]) == allergy_key(None) == ''
+
+
+def test_lookup_uses_nearest_lower_budget():
+    catalog = _catalog()
+    assert catalog.lookup(20.00) == [[0, 1, 1900, -1, 0, -1, 0]]
+    assert catalog.lookup(29.99) == [[0, 1, 1900, -1, 0, -1, 0]]
+    assert catalog.lookup(30.00) is None         # no plan at that budget
+    assert catalog.lookup(43.99) == [[0, 2, 3900, -1, 0, -1, 0]]
+
+
+def test_lookup_misses_outside_the_grid_and_for_unknown_allergies():
+    catalog = _catalog()
+    assert catalog.lookup(19.99) is None
+    assert catalog.lookup(44.01) is None         # more than one step above the top budget
+    assert catalog.lookup(25.0, ['Celery']) is None
+    assert catalog.lookup(25.0, ['soy', 'Fish']) is None
@@ -0,0 +1,98 @@
+"""
+test_plan_codec.py
+Compact plan encoding round-trips to the planner's dict shape
+
+Run: python -m pytest test_plan_codec.py -q
+"""
+
+import json
+
+import pytest
+
+from plan_codec import NOT_PLANNED, decode_plan, dumps, encode_plan, household_header
+from recipe_catalog import get_catalog
+
+
+def _plan(catalog, family_size=4, weekly=1200.0, income=15000.0):
+    """Plan dict shaped like AIWeeklyMealPlannerWithML.generate_weekly_meal_plan output"""
+    daily = weekly / 7 / family_size
+    days = {}
+    total = 0.0
+    for day_idx, day in enumerate(["Monday", "Tuesday", "Wednesday"]):
+        meals = {}
+        used = []
+        for slot_idx, slot in enumerate(["breakfast", "lunch", "dinner"]):
+            if day_idx == 2 and slot == "dinner":
+                meals[slot] = {'name': NOT_PLANNED, 'cost': 0.0}
+                continue
+            recipe_id = day_idx * 3 + slot_idx
+            meals[slot] = {'name': catalog.names[recipe_id], 'cost': catalog.costs[recipe_id] / 100}
+            used.append(catalog.names[recipe_id])
+        day_total = sum(m['cost'] for m in meals.values())
+        meals.update({'day_total_per_person': day_total, 'day_total_family': day_total * family_size,
+                      'recipes_used': used, 'meal_count': len(used),
+                      'budget_utilization_percent': day_total / daily * 100})
+        days[day] = meals
+        total += meals['day_total_family']
+    return {
+        'user_profile': {'income': income, 'family_size': family_size, 'region': 'NCR',
+                         'security_level': 'Mildly Insecure'},
+        'budget': {'weekly': weekly, 'daily_per_person': daily, 'actual_spent': total,
+                   'utilization_percent': total / weekly * 100, 'target_utilization': '85-90%'},
+        'meal_plan': days,
+        'summary': {'total_meals': 8, 'total_cost': total, 'avg_cost_per_day': total / 7,
+                    'days_planned': 3, 'meal_distribution': {'3_meals': 2, '2_meals': 1, '1_meal': 0}},
+    }
+
+
+def _assert_same(a, b, path=""):
+    if isinstance(a, dict):
+        assert list(a) == list(b), path
+        for key in a:
+            _assert_same(a[key], b[key], f"{path}/{key}")
+    elif isinstance(a, list):
+        assert len(a) == len(b), path
+        for x, y in zip(a, b):
+            _assert_same(x, y, path)
+    elif isinstance(a, float) or isinstance(b, float):
+        assert a == pytest.approx(b), path
+    else:
+        assert a == b, path
+
+
+def test_round_trip_matches_planner_shape():
+    plan = _plan(get_catalog())
+    stored = dumps(plan)
+    assert len(stored) * 5 < len(json.dumps(plan))
+    _assert_same(plan, decode_plan(stored))
+
+
+def test_unknown_recipe_falls_back_to_full_dict():
+    plan = _plan(get_catalog())
+    plan['meal_plan']['Monday']['lunch']['name'] = "Not in the catalog"
+    assert encode_plan(plan) is None
+    assert decode_plan(dumps(plan)) == json.loads(json.dumps(plan))
+
+
+def test_households_share_the_plan_body():
+    catalog = get_catalog()
+    plans = [_plan(catalog, income=income) for income in (12000.0, 18500.0)]
+    headers = [household_header(income, 4, 'NCR', 'Mildly Insecure', 1200.0) for income in (12000.0, 18500.0)]
+    bodies = [dumps(plan, header) for plan, header in zip(plans, headers)]
+    assert bodies[0] == bodies[1]
+    for plan, header in zip(plans, headers):
+        _assert_same(plan, decode_plan(bodies[0], header))
+
+
+def test_household_header_keeps_whole_family_sizes_integral():
+    header = household_header(15000.0, 4.0, 'NCR', 'Mildly Insecure', 1200.0)
+    assert header == household_header(15000.0, 4, 'NCR', 'Mildly Insecure', 1200.0)
+    assert type(header['p'][1]) is int
+    assert household_header(15000.0, 4.5, 'NCR', 'Mildly Insecure', 1200.0)['p'][1] == 4.5
+
+
+def test_mismatched_household_keeps_its_header():
+    plan = _plan(get_catalog())
+    header = household_header(99999.0, 4, 'NCR', 'Mildly Insecure', 1200.0)
+    assert '"p":' in dumps(plan, header)
+    _assert_same(plan, decode_plan(dumps(plan, header), header))
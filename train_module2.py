@@ -1,13 +1,16 @@
 # module2_train_FIXED.py
 # Complete training script with region mapping for Module 2
 
+import time
+
 import pandas as pd
-import joblib
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
 import numpy as np
+from data_assets import load_csv
+from model_registry import publish
 
 # ============================================================================
 # STEP 1: REGION MAPPING DICTIONARY (FIES → Recipe Regions)
@@ -154,156 +157,172 @@ REGION_MAP_FIES_TO_RECIPE = {
 # STEP 2: LOAD & PROCESS DATA
 # ============================================================================
 
-print("📊 Loading datasets...")
-
-# Load recipe costs dataset
-recipe_df = pd.read_csv('data/module2_recipe_costs_by_region.csv')
-print(f"✅ Recipe dataset loaded: {recipe_df.shape[0]} rows, {recipe_df.shape[1]} columns")
-print(f"   Regions in recipe data: {recipe_df['region'].unique().tolist()}")
-
-# Display dataset preview
-print("\n📋 Recipe Dataset Preview:")
-print(recipe_df.head())
-
-# ============================================================================
-# STEP 3: PREPARE FEATURES & TARGETS
-# ============================================================================
-
-print("\n🔧 Preparing features and targets...")
-
-# Drop unnecessary columns
-X = recipe_df[['region', 'category', 'type', 'serves']].copy()
-y = recipe_df['cost_per_person'].copy()
-
-print(f"Features shape: {X.shape}")
-print(f"Target shape: {y.shape}")
-
-# Encode categorical variables
-print("\n🔐 Encoding categorical variables...")
-
-le_region = LabelEncoder()
-le_category = LabelEncoder()
-le_type = LabelEncoder()
+DATA_PATH = 'data/module2_recipe_costs_by_region_EXPANDED.csv'
 
-X['region'] = le_region.fit_transform(X['region'])
-X['category'] = le_category.fit_transform(X['category'])
-X['type'] = le_type.fit_transform(X['type'])
-
-print(f"✅ Region classes: {le_region.classes_.tolist()}")
-print(f"✅ Category classes: {le_category.classes_.tolist()}")
-print(f"✅ Type classes: {le_type.classes_.tolist()}")
-
-# ============================================================================
-# STEP 4: TRAIN RANDOM FOREST MODEL
-# ============================================================================
-
-print("\n🤖 Training Random Forest model...")
-
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
-)
-
-model = RandomForestRegressor(
-    n_estimators=100,
-    max_depth=15,
-    min_samples_split=5,
-    min_samples_leaf=2,
-    random_state=42,
-    n_jobs=-1
-)
-
-model.fit(X_train, y_train)
-
-# ============================================================================
-# STEP 5: EVALUATE MODEL
-# ============================================================================
-
-print("\n📈 Model Evaluation:")
-
-y_pred = model.predict(X_test)
-r2 = r2_score(y_test, y_pred)
-mae = mean_absolute_error(y_test, y_pred)
-rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-
-print(f"✅ R² Score: {r2:.4f}")
-print(f"✅ MAE: ₱{mae:.2f}")
-print(f"✅ RMSE: ₱{rmse:.2f}")
-
-# Feature importance
-feature_names = ['region', 'category', 'type', 'serves']
-feature_importance = pd.DataFrame({
-    'feature': feature_names,
-    'importance': model.feature_importances_
-}).sort_values('importance', ascending=False)
-
-print("\n📊 Feature Importance:")
-print(feature_importance)
-
-# ============================================================================
-# STEP 6: SAVE ARTIFACTS & MAPPING
-# ============================================================================
-
-print("\n💾 Saving artifacts...")
-
-# Save model
-joblib.dump(model, 'recipe_cost_model.pkl')
-print("✅ Model saved: recipe_cost_model.pkl")
-
-# Save encoders
-encoders = {
-    'region': le_region,
-    'category': le_category,
-    'type': le_type,
-    'map_fies_to_recipe': REGION_MAP_FIES_TO_RECIPE
+# Recipe data uses short region names; the FIES map above targets these
+RECIPE_REGION_ALIASES = {
+    "NCR": "National Capital region",
 }
-joblib.dump(encoders, 'encoders_mapping.pkl')
-print("✅ Encoders saved: encoders_mapping.pkl")
 
-# Save region mapping as JSON for reference
-import json
-with open('region_mapping.json', 'w') as f:
-    json.dump(REGION_MAP_FIES_TO_RECIPE, f, indent=2)
-print("✅ Region mapping saved: region_mapping.json")
-
-# ============================================================================
-# STEP 7: TEST PREDICTIONS
-# ============================================================================
+FEATURES = ['region', 'category', 'type', 'serves']
+TARGET = 'cost_per_person'
 
-print("\n🧪 Testing predictions with various FIES regions...")
+PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 15,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+    'random_state': 42,
+    'n_jobs': -1,
+}
 
-test_recipes = [
-    ("Quezon City", "chicken", "dinner", 6),          # NCR city
-    ("PHILIPPINES", "beef", "lunch", 8),              # National
-    ("Tarlac", "pork", "breakfast", 4),              # Region III
-    ("Cebu", "fish", "dinner", 6),                   # Region VII
-    ("Albay", "gulay", "lunch", 6),                  # Region V
-]
 
-for fies_region, category, meal_type, serves in test_recipes:
-    # Map FIES region to recipe region
-    mapped_region = REGION_MAP_FIES_TO_RECIPE.get(fies_region, "National Capital region")
-    
-    # Encode
-    region_enc = le_region.transform([mapped_region])[0]
-    category_enc = le_category.transform([category])[0]
-    type_enc = le_type.transform([meal_type])[0]
-    
-    # Predict
-    prediction = model.predict([[region_enc, category_enc, type_enc, serves]])[0]
-    
-    print(f"\n📌 Input: {fies_region} ({category}, {meal_type}, serves {serves})")
-    print(f"   → Mapped to: {mapped_region}")
-    print(f"   → Predicted cost: ₱{prediction:.2f}/person")
-
-print("\n" + "="*70)
-print("✨ TRAINING COMPLETE! Module 2 is ready.")
-print("="*70)
-print("\n📝 Summary:")
-print(f"   • Model: Random Forest (100 estimators)")
-print(f"   • Performance: R² = {r2:.4f}, MAE = ₱{mae:.2f}")
-print(f"   • Region mapping: {len(REGION_MAP_FIES_TO_RECIPE)} FIES→Recipe mappings")
-print(f"   • Saved files:")
-print(f"     - recipe_cost_model.pkl")
-print(f"     - encoders_mapping.pkl")
-print(f"     - region_mapping.json")
-print("\n✅ Ready for Streamlit integration!")
\ No newline at end of file
+def load_data(path=DATA_PATH):
+    """Load recipe costs and encode categorical variables"""
+    recipe_df = load_csv(path)
+    recipe_df['region'] = recipe_df['region'].replace(RECIPE_REGION_ALIASES)
+
+    encoders = {
+        'region': LabelEncoder(),
+        'category': LabelEncoder(),
+        'type': LabelEncoder(),
+        'map_fies_to_recipe': REGION_MAP_FIES_TO_RECIPE
+    }
+    X = recipe_df[FEATURES].copy()
+    for col in ['region', 'category', 'type']:
+        X[col] = encoders[col].fit_transform(X[col])
+    return recipe_df, X, recipe_df[TARGET].copy(), encoders
+
+
+def train(X, y, params=PARAMS):
+    """
+    Train and evaluate the recipe cost RandomForest
+
+    Returns:
+        tuple: (model, metrics dict)
+    """
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42
+    )
+    model = RandomForestRegressor(**params)
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    train_seconds = time.perf_counter() - start
+
+    y_pred = model.predict(X_test)
+    metrics = {
+        'r2': round(float(r2_score(y_test, y_pred)), 4),
+        'mae': round(float(mean_absolute_error(y_test, y_pred)), 2),
+        'rmse': round(float(np.sqrt(mean_squared_error(y_test, y_pred))), 2),
+        'train_seconds': round(train_seconds, 3),
+    }
+    return model, metrics
+
+
+def publish_artifacts(model, encoders, metadata=None):
+    """Publish model, encoders, region mapping and the precomputed cost table"""
+    from cost_table import build_cost_table, publish_cost_table
+
+    return {
+        'recipe_cost_model': publish("recipe_cost_model", model, metadata=metadata),
+        'recipe_cost_encoders': publish("recipe_cost_encoders", encoders),
+        'fies_region_map': publish("fies_region_map", REGION_MAP_FIES_TO_RECIPE, fmt='json'),
+        # Every (region, category, type, serves) prediction for O(1) lookups
+        'recipe_cost_table': publish_cost_table(build_cost_table(model, encoders)),
+    }
+
+
+def main():
+    print("📊 Loading datasets...")
+    recipe_df, X, y, encoders = load_data()
+    print(f"✅ Recipe dataset loaded: {recipe_df.shape[0]} rows, {recipe_df.shape[1]} columns")
+    print(f"   Regions in recipe data: {recipe_df['region'].unique().tolist()}")
+
+    # Display dataset preview
+    print("\n📋 Recipe Dataset Preview:")
+    print(recipe_df.head())
+
+    # ========================================================================
+    # STEP 3: PREPARE FEATURES & TARGETS
+    # ========================================================================
+
+    print("\n🔧 Preparing features and targets...")
+    print(f"Features shape: {X.shape}")
+    print(f"Target shape: {y.shape}")
+
+    print("\n🔐 Encoding categorical variables...")
+    print(f"✅ Region classes: {encoders['region'].classes_.tolist()}")
+    print(f"✅ Category classes: {encoders['category'].classes_.tolist()}")
+    print(f"✅ Type classes: {encoders['type'].classes_.tolist()}")
+
+    # ========================================================================
+    # STEP 4-5: TRAIN & EVALUATE RANDOM FOREST MODEL
+    # ========================================================================
+
+    print("\n🤖 Training Random Forest model...")
+    model, metrics = train(X, y)
+
+    print("\n📈 Model Evaluation:")
+    print(f"✅ R² Score: {metrics['r2']:.4f}")
+    print(f"✅ MAE: ₱{metrics['mae']:.2f}")
+    print(f"✅ RMSE: ₱{metrics['rmse']:.2f}")
+
+    # Feature importance
+    feature_importance = pd.DataFrame({
+        'feature': FEATURES,
+        'importance': model.feature_importances_
+    }).sort_values('importance', ascending=False)
+
+    print("\n📊 Feature Importance:")
+    print(feature_importance)
+
+    # ========================================================================
+    # STEP 6: PUBLISH ARTIFACTS & MAPPING
+    # ========================================================================
+
+    print("\n💾 Publishing artifacts...")
+    versions = publish_artifacts(model, encoders, metadata=metrics)
+    for name, version in versions.items():
+        print(f"✅ Published: {name} {version}")
+
+    # ========================================================================
+    # STEP 7: TEST PREDICTIONS
+    # ========================================================================
+
+    print("\n🧪 Testing predictions with various FIES regions...")
+    from cost_table import RecipeCostLookup, build_cost_table
+    lookup = RecipeCostLookup(build_cost_table(model, encoders), REGION_MAP_FIES_TO_RECIPE)
+
+    test_recipes = [
+        ("Quezon City", "dinner", "chicken", 6),         # NCR city
+        ("PHILIPPINES", "lunch", "beef", 8),             # National
+        ("Tarlac", "breakfast", "pork", 4),              # Region III
+        ("Cebu", "dinner", "fish", 6),                   # Region VII
+        ("Albay", "lunch", "vegetables", 6),             # Region V
+    ]
+
+    for fies_region, category, meal_type, serves in test_recipes:
+        # Map FIES region to recipe region
+        mapped_region = REGION_MAP_FIES_TO_RECIPE.get(fies_region, "National Capital region")
+        prediction = lookup.lookup(fies_region, category, meal_type, serves)
+
+        print(f"\n📌 Input: {fies_region} ({category}, {meal_type}, serves {serves})")
+        print(f"   → Mapped to: {mapped_region}")
+        print(f"   → Predicted cost: ₱{prediction:.2f}/person" if prediction is not None else "   → Not in training data")
+
+    print("\n" + "="*70)
+    print("✨ TRAINING COMPLETE! Module 2 is ready.")
+    print("="*70)
+    print("\n📝 Summary:")
+    print(f"   • Model: Random Forest ({PARAMS['n_estimators']} estimators)")
+    print(f"   • Performance: R² = {metrics['r2']:.4f}, MAE = ₱{metrics['mae']:.2f}")
+    print(f"   • Region mapping: {len(REGION_MAP_FIES_TO_RECIPE)} FIES→Recipe mappings")
+    print(f"   • Published artifacts (models/manifest.json):")
+    for name, version in versions.items():
+        print(f"     - {name} {version}")
+    print("\n✅ Ready for Streamlit integration!")
+
+
+if __name__ == "__main__":
+    main()
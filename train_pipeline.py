@@ -0,0 +1,183 @@
+"""
+train_pipeline.py
+Single entry point for (re)training the project's models
+
+Each job fingerprints its inputs (sha256 of every training data file plus the
+hyperparameters) and compares that with the fingerprint recorded on the
+registry's current version of the job's primary artifact. On a match the job
+is skipped, so scheduled retrains cost nothing when the data hasn't changed.
+
+Hyperparameters default to the ones recorded on the current version, so a
+configuration promoted by model_search.py --promote stays in place across
+scheduled runs. --default-params goes back to the module's PARAMS (after
+editing them, or to undo a promotion).
+
+Trained models are published to the model registry (models/manifest.json)
+with train time, model size and predict latency recorded next to
+accuracy / R².
+
+Usage:
+    python train_pipeline.py                  # every job
+    python train_pipeline.py food_security    # one job
+    python train_pipeline.py --force          # retrain even if unchanged
+    python train_pipeline.py --default-params # retrain with module1_train / train_module2 PARAMS
+"""
+
+import argparse
+import hashlib
+import json
+import time
+
+import numpy as np
+
+import module1_train
+import train_module2
+from model_registry import file_sha256, get_registry
+
+
+# ========================================================================
+# FINGERPRINTS & MEASUREMENTS
+# ========================================================================
+
+def fingerprint(job_name, data_paths, params):
+    """Hash of the job's training data and hyperparameters"""
+    payload = {
+        'job': job_name,
+        'data': {path: file_sha256(path) for path in data_paths},
+        'params': params,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def measure_latency(model, X, single_runs=50, batch_rows=1000):
+    """
+    Predict latency of a fitted model
+
+    Returns:
+        dict: median single-row latency (ms) and per-row latency of one batch call (µs)
+    """
+    one = X.iloc[:1]
+    timings = []
+    for _ in range(single_runs):
+        start = time.perf_counter()
+        model.predict(one)
+        timings.append(time.perf_counter() - start)
+
+    batch = X.sample(batch_rows, replace=True, random_state=0)
+    start = time.perf_counter()
+    model.predict(batch)
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        'predict_ms_single': round(float(np.median(timings)) * 1000, 3),
+        'predict_us_per_row_batch': round(batch_seconds / batch_rows * 1e6, 3),
+    }
+
+
+# ========================================================================
+# JOBS
+# ========================================================================
+
+def _run_food_security(params):
+    fies_ml, le = module1_train.load_data()
+    model, metrics, (X_test, _) = module1_train.train(fies_ml, params)
+    metrics.update(measure_latency(model, X_test))
+    return model, metrics, lambda metadata: module1_train.publish_artifacts(model, le, metadata)
+
+
+def _run_recipe_cost(params):
+    _, X, y, encoders = train_module2.load_data()
+    model, metrics = train_module2.train(X, y, params)
+    metrics.update(measure_latency(model, X))
+    return model, metrics, lambda metadata: train_module2.publish_artifacts(model, encoders, metadata)
+
+
+JOBS = {
+    'food_security': {
+        'artifact': 'food_security_rf',
+        'data': [module1_train.DATA_PATH],
+        'params': module1_train.PARAMS,
+        'run': _run_food_security,
+    },
+    'recipe_cost': {
+        'artifact': 'recipe_cost_model',
+        'data': [train_module2.DATA_PATH],
+        'params': train_module2.PARAMS,
+        'run': _run_recipe_cost,
+    },
+}
+
+
+def current_params(name):
+    """Hyperparameters of the job's current version, or the module defaults if none are recorded"""
+    job = JOBS[name]
+    registry = get_registry()
+    if registry.current_version(job['artifact']):
+        recorded = registry.resolve(job['artifact']).get('params')
+        if recorded:
+            return recorded
+    return job['params']
+
+
+def run_job(name, force=False, params=None, metadata=None):
+    """
+    Train one job unless its fingerprint matches the current artifact
+
+    Args:
+        name (str): Key of JOBS
+        force (bool): Retrain even when nothing changed
+        params (dict): Hyperparameters (default: the current version's, see current_params)
+        metadata (dict): Extra fields recorded on the published model version
+
+    Returns:
+        dict: {'job', 'status': 'skipped'|'trained', 'fingerprint', 'versions', 'metrics'}
+    """
+    job = JOBS[name]
+    params = params or current_params(name)
+    fp = fingerprint(name, job['data'], params)
+
+    registry = get_registry()
+    if not force and registry.current_version(job['artifact']):
+        current = registry.resolve(job['artifact'])
+        if current.get('fingerprint') == fp:
+            return {'job': name, 'status': 'skipped', 'fingerprint': fp,
+                    'versions': {job['artifact']: current['version']}, 'metrics': {}}
+
+    model, metrics, publish_fn = job['run'](params)
+    versions = publish_fn(dict(metrics, fingerprint=fp, params=params, **(metadata or {})))
+    metrics['model_bytes'] = registry.resolve(job['artifact'])['bytes']
+    return {'job': name, 'status': 'trained', 'fingerprint': fp,
+            'versions': versions, 'metrics': metrics}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train models (skips unchanged data/params)")
+    parser.add_argument("jobs", nargs="*", help=f"Jobs to run: {', '.join(sorted(JOBS))} (default: all)")
+    parser.add_argument("--force", action="store_true", help="Retrain even if the fingerprint matches")
+    parser.add_argument("--default-params", action="store_true",
+                        help="Use the modules' PARAMS instead of the current version's (e.g. a promoted search result)")
+    args = parser.parse_args()
+
+    unknown = set(args.jobs) - set(JOBS)
+    if unknown:
+        parser.error(f"unknown job(s): {', '.join(sorted(unknown))}")
+
+    for name in args.jobs or sorted(JOBS):
+        print(f"\n🤖 {name}...")
+        result = run_job(name, force=args.force,
+                         params=JOBS[name]['params'] if args.default_params else None)
+        if result['status'] == 'skipped':
+            version = result['versions'][JOBS[name]['artifact']]
+            print(f"⏭️ Unchanged data and params (fingerprint {result['fingerprint'][:12]}), "
+                  f"keeping {JOBS[name]['artifact']} {version}")
+            continue
+
+        for artifact, version in result['versions'].items():
+            print(f"✅ Published: {artifact} {version}")
+        print("📈 Metrics:")
+        for key, value in result['metrics'].items():
+            print(f"   {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()